@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmarks for the protocol and debug report processing in main.py.
+
+Usage: ./benchmark.py [NAME ...]
+
+Runs all benchmarks if no NAME is given. The input data is generated
+synthetically, so no uploaded files are needed.
+"""
+
+import io
+import os
+import re
+import sys
+import time
+import json
+import math
+from datetime import datetime, timezone
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import main
+from tests import reference
+
+
+def _timed(func, *args, repeat=3):
+    """Return (best wall time in seconds, result of the last call)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _peak_memory(func, *args):
+    """Return the peak of memory allocated while running func(*args), in MB."""
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def bench_timestamps(rows=500_000):
+    """convert_millis_to_real_time(): per-value loop vs. vectorized."""
+    # One row every ~100 ms, starting one day after boot
+    rng = np.random.default_rng(1)
+    millis = 86_400_000 + np.cumsum(rng.integers(97, 104, rows))
+    timestamp_info = main.extract_real_timestamp('2024-05-10 14:23:11,123 evse: start', int(millis[0]))
+
+    for label, info in (('fake timestamps', None), ('real timestamps', timestamp_info)):
+        slow_time, slow = _timed(main._convert_millis_to_real_time_slow, millis.tolist(), info, repeat=1)
+        fast_time, fast = _timed(main.convert_millis_to_real_time, millis, info)
+        assert fast.tolist() == slow, 'labels differ'
+        print(f'{label:>16}: {rows} rows, loop {slow_time * 1000:8.1f} ms, '
+              f'vectorized {fast_time * 1000:6.1f} ms ({slow_time / fast_time:.0f}x)')
+
+
+def _columns_to_json_boxed(columns):
+    """Previous serialization: box every value, replace NaN/inf, then json.dumps()."""
+    return json.dumps({name: [None if not math.isfinite(v) else v for v in values.tolist()]
+                       for name, values in columns.items()}, separators=(',', ':'))
+
+
+def bench_column_json(rows=200_000, column_count=40):
+    """Column payload serialization: boxed lists + json.dumps() vs. columns_to_json()."""
+    rng = np.random.default_rng(1)
+    columns = {}
+    for i in range(column_count):
+        values = rng.integers(0, 16000, rows).astype(np.float64)
+        values[rng.random(rows) < 0.01] = np.nan
+        columns[f'column_{i}'] = values
+
+    assert json.loads(main.columns_to_json(columns)) == json.loads(_columns_to_json_boxed(columns)), 'JSON differs'
+    slow_time, _ = _timed(_columns_to_json_boxed, columns, repeat=1)
+    fast_time, _ = _timed(main.columns_to_json, columns)
+    slow_memory = _peak_memory(_columns_to_json_boxed, columns)
+    fast_memory = _peak_memory(main.columns_to_json, columns)
+    print(f'{column_count} columns x {rows} rows: boxed {slow_time * 1000:.0f} ms / {slow_memory:.0f} MB peak, '
+          f'columns_to_json {fast_time * 1000:.0f} ms / {fast_memory:.0f} MB peak ({slow_time / fast_time:.1f}x)')
+
+
+def _synthetic_protocol(rows):
+    """Return the text of a protocol with a dropped lines message and *rows* CSV rows."""
+    header = ('millis,STATE,iec61851_state,vehicle_state,contactor_state,allowed_charging_current,'
+              'cp_pwm_duty_cycle,VOLTAGES,CP/PE,PP/PE,RESISTANCES,CP/PE,PP/PE,GPIOs,'
+              + ','.join(f'gpio_{i}' for i in range(16)))
+    rng = np.random.default_rng(1)
+    values = rng.integers(0, 2, (rows, len(header.split(','))))
+    values[:, 0] = 86_400_000 + np.arange(rows) * 100
+    values[:, 5] = rng.integers(6000, 32000, rows)
+    lines = [','.join(map(str, row)) for row in values.tolist()]
+    json_block = json.dumps({'evse': {'state': {'iec61851_state': 0}}})
+    log = '\n'.join(f'2024-05-10 14:23:{i % 60:02d},123 evse: line {i}' for i in range(200))
+    return '\n\n'.join([json_block, log, '1234 lines have been dropped from the following table.',
+                        '\n'.join([header] + lines), json_block, log])
+
+
+def _parse_csv_whole(protocol_csv):
+    """Previous CSV parsing: rewrite the header by splitting all lines, then read from a StringIO."""
+    lines = protocol_csv.split('\n')
+    lines[0] = main._disambiguate_csv_header(lines[0])
+    return pd.read_csv(io.StringIO('\n'.join(lines)))
+
+
+def bench_protocol_read(rows=300_000):
+    """Protocol reading: whole-file read + re.sub + split vs. ProtocolBlockReader, CSV copies vs. buffer."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, 'protocol')
+        with open(file_path, 'w') as fh:
+            fh.write(_synthetic_protocol(rows))
+        size = os.path.getsize(file_path) / 1e6
+
+        assert reference.read_protocol_whole(file_path) == main.read_and_preprocess_protocol(file_path), 'blocks differ'
+        slow_time, _ = _timed(reference.read_protocol_whole, file_path, repeat=1)
+        fast_time, _ = _timed(main.read_and_preprocess_protocol, file_path, repeat=1)
+        slow_memory = _peak_memory(reference.read_protocol_whole, file_path)
+        fast_memory = _peak_memory(main.read_and_preprocess_protocol, file_path)
+        print(f'read {size:.1f} MB file: whole {slow_time * 1000:.0f} ms / {slow_memory:.0f} MB peak, '
+              f'streaming {fast_time * 1000:.0f} ms / {fast_memory:.0f} MB peak')
+
+        # From the compressed file, like the protocol views do
+        gz_path = os.path.join(tmp_dir, 'protocol.gz')
+        index = main._compress_protocol(file_path, gz_path, os.path.join(tmp_dir, 'blocks.npz'))
+        blocks = main.ProtocolBlocks(gz_path, index['starts'].tolist(), index['ends'].tolist(),
+                                     index['member_starts'].tolist(), index['member_offsets'].tolist())
+        assert _parse_csv_whole(blocks[2]).equals(main._read_protocol_csv(blocks.buffer(2))), 'CSV differs'
+        slow_time, _ = _timed(lambda: _parse_csv_whole(blocks[2]), repeat=1)
+        fast_time, _ = _timed(lambda: main._read_protocol_csv(blocks.buffer(2)), repeat=1)
+        slow_memory = _peak_memory(lambda: _parse_csv_whole(blocks[2]))
+        fast_memory = _peak_memory(lambda: main._read_protocol_csv(blocks.buffer(2)))
+        print(f'parse {rows} CSV rows: decoded copies {slow_time * 1000:.0f} ms / {slow_memory:.0f} MB peak, '
+              f'buffer {fast_time * 1000:.0f} ms / {fast_memory:.0f} MB peak')
+
+
+def bench_protocol_csv(rows=300_000):
+    """Protocol CSV parsing: pd.read_csv() vs. parse_protocol_csv() with compact integer columns."""
+    buf = _synthetic_protocol(rows).split('\n\n')[3].encode('utf-8')
+
+    slow, fast = reference.parse_csv_pandas(buf), main.parse_protocol_csv(buf)
+    assert list(slow) == list(fast), 'columns differ'
+    assert all(np.array_equal(slow[name], fast[name]) for name in slow), 'values differ'
+    slow_time, _ = _timed(reference.parse_csv_pandas, buf)
+    fast_time, _ = _timed(main.parse_protocol_csv, buf)
+    slow_memory = _peak_memory(reference.parse_csv_pandas, buf)
+    fast_memory = _peak_memory(main.parse_protocol_csv, buf)
+    slow_size = sum(values.nbytes for values in slow.values()) / 1e6
+    fast_size = sum(values.nbytes for values in fast.values()) / 1e6
+    print(f'{len(buf) / 1e6:.1f} MB, {rows} rows: pandas {slow_time * 1000:.0f} ms / {slow_memory:.0f} MB peak / '
+          f'{slow_size:.0f} MB columns, parse_protocol_csv {fast_time * 1000:.0f} ms / {fast_memory:.0f} MB peak / '
+          f'{fast_size:.1f} MB columns ({slow_time / fast_time:.1f}x)')
+
+
+def _synthetic_cm_trace(iterations):
+    """Return a charge_manager trace in the layout of the firmware with *iterations* iterations."""
+    rng = np.random.default_rng(1)
+    header = ('PM    PV | L1 | L2 | L3\n'
+              'mtr(W) bat(W) avl(W) raw max min spread'
+              + ' | meter preprc error adjust raw min spread' * 3)
+    lines = ['__begin_charge_manager__']
+    for i in range(iterations):
+        lines.append(f'2024-05-10 {14 + i // 3600 % 10}:{i // 60 % 60:02d}:{i % 60:02d},{i % 1000:03d}')
+        lines.append(header)
+        for row in rng.integers(-500, 16000, (3, 28)).tolist():
+            groups = [row[:7], row[7:14], row[14:21], row[21:]]
+            lines.append(' | '.join(' '.join(map(str, group)) for group in groups))
+        lines.append('1: Wnd min 3 max 5')
+        lines.append('      ca 1 (3p): 32000 -> 16000')
+        for step in (0, 9):
+            raw, low, spread = (rng.integers(0, 100000, 4).tolist() for _ in range(3))
+            lines.append(f'{step}: raw({" ".join(map(str, raw))}) min({" ".join(map(str, low))}) '
+                         f'spread({" ".join(map(str, spread))}) max_pv {rng.integers(0, 11000)}')
+        lines.append(f'9: [0 {rng.integers(6, 33) * 1000}@{rng.choice((1, 3))}p]')
+        lines.append(f'Hysteresis {rng.integers(0, 2)}')
+        if i % 20 == 0:
+            lines.append(f'RECV {i % 4} 32000 3p')
+    lines.append('__end_charge_manager__')
+    return '\n'.join(lines)
+
+
+def bench_cm_trace(iterations=20_000):
+    """charge_manager trace parsing: regex per line vs. prefix dispatch, in MB/s."""
+    content = _synthetic_cm_trace(iterations)
+    # Table-less traces (PV excess charging disabled) use the iteration based result
+    table_less = '\n'.join(line for line in content.split('\n') if '|' not in line)
+    for label, trace in (('table', content), ('table-less', table_less)):
+        size = len(trace.encode('utf-8')) / 1e6
+        slow, fast = reference.parse_charge_manager_trace_regex(trace), main.parse_charge_manager_trace(trace)
+        assert reference.cm_trace_pairs(fast) == slow, 'results differ'
+        slow_time, _ = _timed(reference.parse_charge_manager_trace_regex, trace)
+        fast_time, _ = _timed(main.parse_charge_manager_trace, trace)
+        slow_memory = _peak_memory(reference.parse_charge_manager_trace_regex, trace)
+        fast_memory = _peak_memory(main.parse_charge_manager_trace, trace)
+        print(f'{label:>10}: {size:.1f} MB, {fast["row_count"]} rows: regex {size / slow_time:5.1f} MB/s / '
+              f'{slow_memory:.0f} MB peak, dispatch {size / fast_time:5.1f} MB/s / {fast_memory:.0f} MB peak '
+              f'({slow_time / fast_time:.1f}x)')
+
+
+def _synthetic_trace(modules, lines=40, terminated=True):
+    """Return a trace log of *modules* modules, without end markers if not *terminated*."""
+    sections = []
+    for i in range(modules):
+        body = '\n'.join(f'2024-05-10 14:23:{j % 60:02d},123 module {i} line {j}' for j in range(lines))
+        end = f'\n__end_module_{i}__' if terminated else ''
+        sections.append(f'__begin_module_{i}__\n{body}{end}')
+    return '\n\n'.join(sections)
+
+
+def bench_trace_split(modules=100):
+    """Trace module splitting: backreference regex vs. split_trace_modules() on unterminated modules."""
+    trace = _synthetic_trace(modules) + '\n\n' + _synthetic_cm_trace(1000)
+    assert reference.split_trace_modules_regex(trace) == reference.split_trace_modules_text(trace), 'modules differ'
+    slow_time, _ = _timed(reference.split_trace_modules_regex, trace)
+    fast_time, _ = _timed(main.split_trace_modules, trace)
+    print(f'{len(trace) / 1e6:.1f} MB, {modules + 1} modules: regex {slow_time * 1000:.1f} ms, '
+          f'split_trace_modules {fast_time * 1000:.1f} ms')
+
+    # A truncated report where every end marker is missing
+    for scale in (1, 2, 4):
+        trace = _synthetic_trace(modules * scale, terminated=False)
+        slow_time, _ = _timed(reference.split_trace_modules_regex, trace, repeat=1)
+        fast_time, _ = _timed(main.split_trace_modules, trace)
+        print(f'{len(trace) / 1e6:.1f} MB, {modules * scale} unterminated modules: '
+              f'regex {slow_time * 1000:7.1f} ms, split_trace_modules {fast_time * 1000:5.1f} ms')
+
+
+def _synthetic_report(log_lines):
+    """Return the text of a debug report with an event log of *log_lines* lines."""
+    log = '\n'.join(f'2024-05-10 14:23:{i % 60:02d},{i % 1000:03d} charge_manager: '
+                    f'Allocated {6000 + i % 26000} mA to charger {i % 32} (line {i})' for i in range(log_lines))
+    trace = _synthetic_trace(20)
+    return '\n\n'.join(['Scroll down for event log!', json.dumps({'uptime': 1234}), log, trace])
+
+
+def _read_log_lines_whole(blocks, start, count):
+    """Previous log access: decode and split the whole event log."""
+    return blocks[2].split('\n')[start:start + count]
+
+
+def bench_log_lines(log_lines=500_000, count=500):
+    """Event log windows: splitting the whole log vs. read_log_lines() on the chunked log index."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            os.makedirs(main.PROTOCOL_DIR)
+            main.app.config['MAX_CONTENT_LENGTH'] = None
+            client = main.app.test_client()
+            content = _synthetic_report(log_lines).encode('utf-8')
+            location = client.post('/en/', data={'file': (io.BytesIO(content), 'report.txt')},
+                                   content_type='multipart/form-data').headers['Location']
+            uuid = location.rstrip('/').split('/')[-1]
+            file_path = main._protocol_file_path(uuid)
+            blocks, _, _ = main.open_protocol_blocks(uuid, file_path)
+
+            build_time, _ = _timed(main.build_log_index, uuid, file_path, repeat=1)
+            starts = np.random.default_rng(1).integers(0, log_lines, 20).tolist()
+            for start in starts[:3]:
+                expected = _read_log_lines_whole(blocks, start, count)
+                assert main.read_log_lines(uuid, file_path, 'log', start, count)[1] == expected, 'lines differ'
+            slow_time, _ = _timed(lambda: [_read_log_lines_whole(blocks, start, count) for start in starts[:3]],
+                                  repeat=1)
+            fast_time, _ = _timed(lambda: [main.read_log_lines(uuid, file_path, 'log', start, count)
+                                           for start in starts])
+            slow_memory = _peak_memory(_read_log_lines_whole, blocks, starts[0], count)
+            fast_memory = _peak_memory(main.read_log_lines, uuid, file_path, 'log', starts[0], count)
+            print(f'{len(content) / 1e6:.1f} MB report, {log_lines} log lines, index built in '
+                  f'{build_time * 1000:.0f} ms')
+            print(f'window of {count} lines: whole log {slow_time / 3 * 1000:.0f} ms / {slow_memory:.0f} MB peak, '
+                  f'read_log_lines {fast_time / len(starts) * 1000:.1f} ms / {fast_memory:.1f} MB peak')
+        finally:
+            os.chdir(cwd)
+
+
+def _search_log_indexed(uuid, file_path, query, regex):
+    """Search the event log like api_search() does."""
+    log = main.LogIndex(uuid, file_path)
+    filters = main.load_search_index(uuid, log, ['log'])
+    candidates = {'log': main.search_chunks(filters['log'], query, regex)}
+    pattern = re.compile(query if regex else re.escape(query), re.MULTILINE | re.IGNORECASE)
+    return [line for _, line in main.search_logs(log, candidates, pattern)]
+
+
+def bench_log_search(log_lines=500_000):
+    """Event log search: matching every line vs. the trigram filtered chunks of the search index."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            os.makedirs(main.PROTOCOL_DIR)
+            main.app.config['MAX_CONTENT_LENGTH'] = None
+            client = main.app.test_client()
+            content = _synthetic_report(log_lines)
+            lines = content.split('\n')
+            for line in (1000, log_lines // 2, log_lines - 1000):
+                lines[line] += ' Watchdog timeout in meter task'
+            content = '\n'.join(lines).encode('utf-8')
+            location = client.post('/en/', data={'file': (io.BytesIO(content), 'report.txt')},
+                                   content_type='multipart/form-data').headers['Location']
+            uuid = location.rstrip('/').split('/')[-1]
+            file_path = main._protocol_file_path(uuid)
+            blocks, _, _ = main.open_protocol_blocks(uuid, file_path)
+
+            build_time, _ = _timed(lambda: main.build_search_index(uuid, main.LogIndex(uuid, file_path)), repeat=1)
+            print(f'{len(content) / 1e6:.1f} MB report, {log_lines} log lines, search index built in '
+                  f'{build_time * 1000:.0f} ms')
+            for query, regex in (('watchdog timeout', False), (r'watchdog\s+timeout in (meter|evse)', True),
+                                 ('timeout|brownout', True)):
+                pattern = re.compile(query if regex else re.escape(query), re.IGNORECASE)
+                expected = reference.search_log_whole(blocks, pattern)
+                assert _search_log_indexed(uuid, file_path, query, regex) == expected, 'matches differ'
+                slow_time, _ = _timed(reference.search_log_whole, blocks, pattern, repeat=1)
+                fast_time, _ = _timed(_search_log_indexed, uuid, file_path, query, regex)
+                print(f'{query!r}: {len(expected)} matches, whole log {slow_time * 1000:.0f} ms, '
+                      f'indexed {fast_time * 1000:.1f} ms')
+        finally:
+            os.chdir(cwd)
+
+
+def _transitions_loop(df, names):
+    """Change points by walking the rows of each column."""
+    transitions = {}
+    for name in names:
+        rows = []
+        previous = None
+        for row, value in df[name].items():
+            if row > 0 and value != previous:
+                rows.append(row)
+            previous = value
+        transitions[name] = rows
+    return transitions
+
+
+def bench_transitions(rows=1_000_000):
+    """State transition index: walking the rows vs. _change_points() on the column arrays."""
+    content = _synthetic_protocol(rows)
+    df = pd.read_csv(io.StringIO(content.split('\n\n')[3]))
+    names = [name for name in main.TRANSITION_COLUMNS if name in df.columns]
+    columns = {name: df[name].to_numpy() for name in names}
+
+    expected = _transitions_loop(df, names)
+    assert {name: main._change_points(values).tolist() for name, values in columns.items()} == expected, \
+        'transitions differ'
+    slow_time, _ = _timed(_transitions_loop, df, names, repeat=1)
+    fast_time, _ = _timed(lambda: {name: main._change_points(values) for name, values in columns.items()})
+    count = sum(len(rows) for rows in expected.values())
+    print(f'{len(names)} columns x {rows} rows, {count} transitions: rows {slow_time * 1000:.0f} ms, '
+          f'_change_points {fast_time * 1000:.1f} ms')
+
+
+_EVENT_LINE_RE = re.compile(r'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) ', re.MULTILINE)
+
+
+def _events_whole(blocks, start, end):
+    """Events of a window without an index: parse every timestamp of the decoded event log."""
+    events = []
+    for match in _EVENT_LINE_RE.finditer(blocks[2]):
+        x = datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc).timestamp() * 1000
+        x += int(match.group(2))
+        if start <= x <= end:
+            events.append(x)
+    return events
+
+
+def bench_log_events(log_lines=500_000, count=200):
+    """Chart event markers: parsing the whole event log per window vs. api_events() on the event index."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            os.makedirs(main.PROTOCOL_DIR)
+            main.app.config['MAX_CONTENT_LENGTH'] = None
+            client = main.app.test_client()
+            content = _synthetic_report(log_lines).encode('utf-8')
+            location = client.post('/en/', data={'file': (io.BytesIO(content), 'report.txt')},
+                                   content_type='multipart/form-data').headers['Location']
+            uuid = location.rstrip('/').split('/')[-1]
+            file_path = main._protocol_file_path(uuid)
+            blocks, _, _ = main.open_protocol_blocks(uuid, file_path)
+
+            log = main.LogIndex(uuid, file_path)
+            build_time, _ = _timed(main.build_event_index, uuid, file_path, log, repeat=1)
+            # The synthetic log repeats one minute, so the events of a window are spread
+            # over all chunks of the log, the worst case for reading their lines
+            start = datetime(2024, 5, 10, 14, 23, 10, tzinfo=timezone.utc).timestamp() * 1000
+            end = start + 5000
+
+            def fetch():
+                # Past the response cache of cached_response()
+                with main.app.test_request_context(f'/api/{uuid}/events?start={start}&end={end}&count={count}'):
+                    return json.loads(main.api_events.__wrapped__(uuid=uuid).get_data())
+
+            expected = _events_whole(blocks, start, end)
+            result = fetch()
+            assert result['total'] == len(expected), 'event counts differ'
+            slow_time, _ = _timed(_events_whole, blocks, start, end, repeat=1)
+            fast_time, _ = _timed(fetch)
+            print(f'{len(content) / 1e6:.1f} MB report, {log_lines} log lines, event index built in '
+                  f'{build_time * 1000:.0f} ms')
+            print(f'window of {len(expected)} events ({count} returned): whole log {slow_time * 1000:.0f} ms, '
+                  f'api_events {fast_time * 1000:.1f} ms')
+        finally:
+            os.chdir(cwd)
+
+
+_STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+{preload}
+import main
+{postload}
+imported = time.perf_counter()
+response = main.app.test_client().get({path!r})
+print(imported - start, time.perf_counter() - imported, response.status_code)
+"""
+
+# What importing main.py did before pandas, NumPy, shortuuid and the API
+# constants were loaded on first use
+_EAGER_PRELOAD = 'import numpy, pandas, shortuuid'
+_EAGER_POSTLOAD = 'main.get_api_constants()'
+
+
+def _startup_times(path, preload='', postload='', repeat=5):
+    """Return the best (import time, time to first response) in seconds of fresh interpreters."""
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(main.__file__)))
+    script = _STARTUP_SCRIPT.format(preload=preload, postload=postload, path=path)
+    best = None
+    with tempfile.TemporaryDirectory() as work_dir:
+        for _ in range(repeat):
+            result = subprocess.run([sys.executable, '-c', script], cwd=work_dir, env=env,
+                                    capture_output=True, text=True, check=True)
+            import_time, response_time, status = result.stdout.split()
+            assert int(status) < 400, f'{path} answered {status}'
+            times = (float(import_time), float(response_time))
+            best = times if best is None else min(best, times, key=sum)
+    return best
+
+
+def bench_startup():
+    """Startup: import time and time to first response, eager vs. lazy heavy imports."""
+    for path in ('/', '/de/', '/static/vislog.js'):
+        eager = _startup_times(path, _EAGER_PRELOAD, _EAGER_POSTLOAD)
+        lazy = _startup_times(path)
+        print(f'{path:>18}: eager import {eager[0] * 1000:4.0f} ms + first response {eager[1] * 1000:3.0f} ms, '
+              f'lazy import {lazy[0] * 1000:4.0f} ms + first response {lazy[1] * 1000:3.0f} ms '
+              f'({sum(eager) / sum(lazy):.1f}x)')
+
+
+BENCHMARKS = {
+    'timestamps': bench_timestamps,
+    'column_json': bench_column_json,
+    'protocol_read': bench_protocol_read,
+    'protocol_csv': bench_protocol_csv,
+    'startup': bench_startup,
+    'cm_trace': bench_cm_trace,
+    'trace_split': bench_trace_split,
+    'log_lines': bench_log_lines,
+    'log_search': bench_log_search,
+    'log_events': bench_log_events,
+    'transitions': bench_transitions,
+}
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f'Unknown benchmark {name}, available: {", ".join(BENCHMARKS)}')
+            sys.exit(1)
+
+    for name in names:
+        print(f'--- {name}: {BENCHMARKS[name].__doc__}')
+        BENCHMARKS[name]()
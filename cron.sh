@@ -42,5 +42,10 @@ fi
 
 # --- Restart service if either repo was updated ---
 if [ "$NEEDS_RESTART" = "1" ]; then
+    # Prebuild the API constants cache, so that the restarted service
+    # doesn't have to import all api_doc_generator modules
+    su -s /bin/sh vislog -c "cd /home/vislog/vislog.warp-charger.com && ./venv/bin/flask --app main build-api-constants"
+    # Write the fingerprinted and precompressed static files
+    su -s /bin/sh vislog -c "cd /home/vislog/vislog.warp-charger.com && ./venv/bin/flask --app main build-static"
     /usr/bin/systemctl restart vislog.warp-charger.com
 fi
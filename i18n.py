@@ -59,6 +59,25 @@ TRANSLATIONS = {
         # --- common ---
         'toggle_theme': 'Dunkel-/Hellmodus umschalten',
         'switch_language': 'Switch to English',
+        'loading': 'Wird geladen\u2026',
+
+        # --- log search ---
+        'search': 'Suchen',
+        'log_search_placeholder': 'Log durchsuchen',
+        'search_regex': 'Regex',
+        'search_case': 'Gro\u00df-/Kleinschreibung',
+        'search_matches': '${count} Treffer',
+        'search_matches_more': 'Mehr als ${count} Treffer',
+        'search_more': 'Weitere laden',
+
+        # --- state transitions ---
+        'transitions': 'Zustandswechsel',
+        'transitions_all': 'Alle',
+        'transition_prev': 'Vorheriger',
+        'transition_prev_title': 'Zum vorherigen Zustandswechsel springen',
+        'transition_next': 'N\u00e4chster',
+        'transition_next_title': 'Zum n\u00e4chsten Zustandswechsel springen',
+        'transition_none': 'Keine weiteren Zustandswechsel',
 
         # --- JSON viewer (used in JS) ---
         'search_placeholder': 'Konfigurationen durchsuchen... (Enter: n\u00e4chster, Shift+Enter: vorheriger)',
@@ -208,6 +227,25 @@ TRANSLATIONS = {
         # --- common ---
         'toggle_theme': 'Toggle dark/light mode',
         'switch_language': 'Auf Deutsch wechseln',
+        'loading': 'Loading\u2026',
+
+        # --- log search ---
+        'search': 'Search',
+        'log_search_placeholder': 'Search log',
+        'search_regex': 'Regex',
+        'search_case': 'Match case',
+        'search_matches': '${count} matches',
+        'search_matches_more': 'More than ${count} matches',
+        'search_more': 'Load more',
+
+        # --- state transitions ---
+        'transitions': 'State changes',
+        'transitions_all': 'All',
+        'transition_prev': 'Previous',
+        'transition_prev_title': 'Jump to the previous state change',
+        'transition_next': 'Next',
+        'transition_next_title': 'Jump to the next state change',
+        'transition_none': 'No further state changes',
 
         # --- JSON viewer (used in JS) ---
         'search_placeholder': 'Search configurations... (Enter: next, Shift+Enter: previous)',
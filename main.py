@@ -1,22 +1,74 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from flask import Flask, request, render_template, abort, redirect, url_for
+from flask import Flask, request, render_template, abort, redirect, url_for, send_from_directory
+from jinja2.utils import htmlsafe_json_dumps
+from markupsafe import Markup
 from werkzeug.exceptions import RequestEntityTooLarge
-import shortuuid
+import click
 import os
 import sys
 import json
 import datetime
 import logging
-import pandas as pd
-from io import StringIO
+import importlib
+from io import RawIOBase
 import urllib.parse
 import re
-import math
 import socket
+import zipfile
+import mmap
+import gzip
+import zlib
+import bisect
+import posixpath
+import mimetypes
+import shutil
+import contextlib
+import hashlib
+import functools
+import threading
+import itertools
+import multiprocessing
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
 from i18n import get_translations, SUPPORTED_LANGUAGES, DEFAULT_LANGUAGE
 
+try:
+    import brotli
+except ImportError:
+    brotli = None  # optional, responses are gzip compressed only
+
+try:
+    from re import _parser as _regex_parser
+except ImportError:
+    try:
+        import sre_parse as _regex_parser  # Python < 3.11
+    except ImportError:
+        _regex_parser = None  # regex searches read all chunks
+
+class _LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    The imported module then replaces the stand-in in the globals of this
+    file, so that later accesses don't go through it.
+    """
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+# Only uploads and protocol/report views need these, redirects, the index
+# page and static files are served without importing them.
+pd = _LazyModule('pandas', 'pd')
+np = _LazyModule('numpy', 'np')
+shortuuid = _LazyModule('shortuuid', 'shortuuid')
+
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB upload limit
 
@@ -186,8 +238,86 @@ def _build_api_constants(locale='de'):
     return result
 
 
-# Build API constants for both locales at startup
-api_constants = {lang: _build_api_constants(lang) for lang in SUPPORTED_LANGUAGES}
+# Building the API constants imports and walks all api_doc_generator
+# modules, which takes seconds. The result is kept in a cache file that is
+# valid as long as the api_doc_generator sources are unchanged.
+
+# Bump whenever _build_api_constants() changes.
+API_CONSTANTS_CACHE_VERSION = 1
+API_CONSTANTS_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_constants.cache.json')
+
+def _api_doc_sources_hash():
+    """Hash of all api_doc_generator sources (None if they are missing)."""
+    api_doc_dir = os.path.join(os.path.dirname(__file__), 'api_doc_generator')
+    if not os.path.isdir(api_doc_dir):
+        return None
+
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(api_doc_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith('.py'):
+                continue
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, api_doc_dir).encode('utf-8') + b'\0')
+            with open(path, 'rb') as fh:
+                digest.update(fh.read())
+    return digest.hexdigest()
+
+def load_api_constants(cache_path=API_CONSTANTS_CACHE, rebuild=False):
+    """Return the API constants of all languages, from the cache file if it is up to date.
+
+    Otherwise they are built and the cache file is written.
+    """
+    sources_hash = _api_doc_sources_hash()
+    key = {'version': API_CONSTANTS_CACHE_VERSION, 'sources': sources_hash, 'languages': list(SUPPORTED_LANGUAGES)}
+
+    if not rebuild:
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as fh:
+                cached = json.load(fh)
+            if cached.get('key') == key:
+                return cached['constants']
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable API constants cache {cache_path}: {e}")
+
+    constants = {lang: _build_api_constants(lang) for lang in SUPPORTED_LANGUAGES}
+    if sources_hash is None:
+        return constants  # nothing worth caching without api_doc_generator
+
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump({'key': key, 'constants': constants}, fh)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write API constants cache {cache_path}: {e}")
+    return constants
+
+_api_constants = None
+
+def get_api_constants():
+    """Return the API constants of both locales, loaded (or built) on first use."""
+    global _api_constants
+    if _api_constants is None:
+        _api_constants = load_api_constants()
+    return _api_constants
+
+@app.cli.command('build-api-constants')
+@click.option('--force', is_flag=True, help='Rebuild even if the cache file is up to date.')
+def build_api_constants_command(force):
+    """Prebuild the API constants cache file, e.g. during deploy."""
+    global _api_constants
+    if force:
+        _api_constants = load_api_constants(rebuild=True)
+    # Without --force, get_api_constants() rebuilds a stale cache file
+    if _api_doc_sources_hash() is None:
+        print("Warning: api_doc_generator not found, there is nothing to cache")
+        return
+    paths = sum(len(constants) for constants in get_api_constants().values())
+    print(f"API constants cache {API_CONSTANTS_CACHE} is up to date ({paths} API paths)")
 
 DEFAULT_PORT = 5001
 
@@ -204,7 +334,7 @@ def get_chart_config(t):
     }, {
         'csv_title': 'cp_pwm_duty_cycle',
         'label':     t['chart_cp_pwm_duty_cycle'],
-        'edit_func':  lambda df: list(map(lambda v: v/10.0, df)),
+        'edit_func':  lambda values: values / 10.0,
     }, {
         'csv_title': 'iec61851_state',
         'label':     t['chart_iec61851_state'],
@@ -232,7 +362,7 @@ def get_chart_config(t):
         'csv_title': 'resistance_pp_pe',
         'label':     t['chart_resistance_pp_pe'],
         'hidden':    True
-    }, { # new title (disambiguated by _disambiguate_csv_columns)
+    }, { # new title (disambiguated by _disambiguate_csv_header)
         'csv_title': 'RESISTANCES PP/PE',
         'label':     t['chart_resistance_pp_pe'],
         'hidden':    True
@@ -282,48 +412,122 @@ def get_chart_config(t):
         'hidden':    True
     }]
 
-def read_and_preprocess_protocol(file_path):
+@functools.lru_cache(maxsize=None)
+def _chart_edit_funcs():
+    """Return {csv_title: edit_func} for all chart_config columns with a value transform.
+
+    The transforms don't depend on the language, so this is built once.
     """
-    Read a protocol file and preprocess it to handle truncated CSV data.
+    chart_config = get_chart_config(get_translations(DEFAULT_LANGUAGE))
+    return {cc['csv_title']: cc['edit_func'] for cc in chart_config if 'edit_func' in cc}
+
+_DROPPED_LINES_TEXT_RE = re.compile(r'\n\n(\d+) lines have been dropped from the following table\.')
+
+class ProtocolBlockReader:
+    """Iterate over the '\n\n'-separated blocks of a text file in a single pass.
 
     When the charge log gets too long, a message like
     "105636 lines have been dropped from the following table."
-    is inserted before the CSV data. This function removes that message
-    and returns the number of dropped lines (if any).
+    is inserted before the CSV data. These messages are removed while
+    reading, together with the separator in front of them, and the number
+    of the first one is kept in dropped_lines_count. The blocks are the
+    same as removing the messages from the whole content and splitting it
+    afterwards, but only the blocks themselves are held in memory.
+    """
+    CHUNK_SIZE = 1 << 20
+    # Messages are recognized across chunk boundaries up to this length
+    MESSAGE_MAX_LEN = 128
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.dropped_lines_count = None
+
+    def _pieces(self):
+        """Yield the content of the file in pieces, without dropped lines messages."""
+        carry = ''
+        while True:
+            chunk = self.fh.read(self.CHUNK_SIZE)
+            buf = carry + chunk
+            # Keep the tail, it might be the start of a message
+            cut = max(len(buf) - self.MESSAGE_MAX_LEN, 0) if chunk else len(buf)
+            pos = 0
+            for match in _DROPPED_LINES_TEXT_RE.finditer(buf):
+                if match.start() >= cut:
+                    break
+                yield buf[pos:match.start()]
+                pos = match.end()
+                if self.dropped_lines_count is None:
+                    self.dropped_lines_count = int(match.group(1))
+
+            keep = max(cut, pos)
+            yield buf[pos:keep]
+            if not chunk:
+                return
+            carry = buf[keep:]
+
+    def __iter__(self):
+        parts = []
+        for piece in self._pieces():
+            if not piece:
+                continue
+            pos = 0
+            if piece[0] == '\n' and parts and parts[-1][-1] == '\n':
+                # Separator across two pieces
+                parts[-1] = parts[-1][:-1]
+                yield ''.join(parts)
+                parts = []
+                pos = 1
+            while True:
+                end = piece.find('\n\n', pos)
+                if end == -1:
+                    break
+                parts.append(piece[pos:end])
+                yield ''.join(parts)
+                parts = []
+                pos = end + 2
+            if pos < len(piece):
+                parts.append(piece[pos:])
+        yield ''.join(parts)
+
+def read_and_preprocess_protocol(file_path):
+    """
+    Read a protocol file and preprocess it to handle truncated CSV data.
+
+    Dropped lines messages are removed (see ProtocolBlockReader) and the
+    number of dropped lines is returned (if any).
 
     Returns:
         tuple: (data_blocks, dropped_lines_count)
             - data_blocks: list of strings split by '\n\n'
             - dropped_lines_count: int or None if no lines were dropped
     """
-    with open(file_path, 'r') as fh:
-        content = fh.read()
-
-    # Check for "X lines have been dropped from the following table." message
-    dropped_lines_match = re.search(r'\n\n(\d+) lines have been dropped from the following table\.', content)
-    dropped_lines_count = None
-
-    if dropped_lines_match:
-        dropped_lines_count = int(dropped_lines_match.group(1))
-        # Remove the message from content
-        content = re.sub(r'\n\n\d+ lines have been dropped from the following table\.', '', content)
-
-    data = content.split('\n\n')
-    return data, dropped_lines_count
+    with open_protocol_file(file_path, 'rt') as fh:
+        reader = ProtocolBlockReader(fh)
+        data = list(reader)
+    return data, reader.dropped_lines_count
+
+_LOG_TIMESTAMP_RE = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3})')
+
+def _last_log_timestamp(log):
+    """Return the groups of the last _LOG_TIMESTAMP_RE match in *log*, scanning the lines backwards."""
+    end = len(log)
+    while end >= 0:
+        start = log.rfind('\n', 0, end) + 1
+        matches = _LOG_TIMESTAMP_RE.findall(log, start, end)
+        if matches:
+            return matches[-1]
+        end = start - 1
+    return None
 
 def extract_real_timestamp(before_protocol_log, first_millis):
     if not before_protocol_log or first_millis is None:
         return None
 
-    # Find the last timestamp before CSV data starts
-    timestamp_pattern = r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3})'
-    matches = re.findall(timestamp_pattern, before_protocol_log)
-
-    if not matches:
+    # Use the last timestamp before CSV data starts
+    last_match = _last_log_timestamp(before_protocol_log)
+    if last_match is None:
         return None
 
-    # Use the last timestamp found (closest to CSV start)
-    last_match = matches[-1]
     timestamp_str = f"{last_match[0]}.{last_match[1]}"
 
     try:
@@ -343,7 +547,24 @@ def extract_real_timestamp(before_protocol_log, first_millis):
     except ValueError:
         return None
 
-def convert_millis_to_real_time(millis_values, timestamp_info):
+# All 86400 'HH:MM:SS' labels, indexed by second of day. Built on first use.
+_TIME_OF_DAY_LABELS = None
+
+def _time_of_day_labels():
+    global _TIME_OF_DAY_LABELS
+    if _TIME_OF_DAY_LABELS is None:
+        _TIME_OF_DAY_LABELS = np.array([f'{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}'
+                                        for s in range(24 * 60 * 60)])
+    return _TIME_OF_DAY_LABELS
+
+def _local_utc_offset(seconds):
+    """Return the UTC offset of the local timezone in seconds at the given Unix time."""
+    local = datetime.datetime.fromtimestamp(seconds)
+    utc = datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=seconds)
+    return round((local - utc).total_seconds())
+
+def _convert_millis_to_real_time_slow(millis_values, timestamp_info):
+    """Per-value reference implementation of convert_millis_to_real_time()."""
     if not timestamp_info:
         # Fallback to original behavior (fake timestamps)
         return [datetime.datetime.fromtimestamp(v/1000).strftime('%H:%M:%S') for v in millis_values]
@@ -357,14 +578,545 @@ def convert_millis_to_real_time(millis_values, timestamp_info):
 
     return real_timestamps
 
+def convert_millis_to_real_time(millis_values, timestamp_info):
+    """Convert millis values to 'HH:MM:SS' labels.
+
+    Without *timestamp_info* the millis are formatted as local time since the
+    Unix epoch (fake timestamps), otherwise the real time offset is added.
+    Integer millis are converted vectorized: the offset is applied to the
+    whole array at once and the labels are looked up by second of day.
+    Returns an ndarray of str.
+    """
+    millis = np.asarray(millis_values)
+    if millis.dtype.kind not in 'iu' or len(millis) == 0:
+        return np.array(_convert_millis_to_real_time_slow(millis.tolist(), timestamp_info), dtype=str)
+
+    millis = millis.astype(np.int64)
+    first_second = int(millis.min()) // 1000
+    last_second = int(millis.max()) // 1000
+    utc_offset = _local_utc_offset(first_second)
+    if utc_offset != _local_utc_offset(last_second):
+        # The local UTC offset changes within the protocol (DST), don't
+        # bother to handle this vectorized.
+        return np.array(_convert_millis_to_real_time_slow(millis.tolist(), timestamp_info), dtype=str)
+
+    # Microseconds between the Unix epoch and the naive local/real datetime
+    # of millis == 0. fromtimestamp() of whole millis is exact to the µs.
+    base_us = utc_offset * 1_000_000
+    if timestamp_info:
+        base_us += timestamp_info['offset'] // datetime.timedelta(microseconds=1)
+
+    seconds = (millis * 1000 + base_us) // 1_000_000
+    return _time_of_day_labels()[seconds % (24 * 60 * 60)]
+
+# ---------------------------------------------------------------------------
+# Static assets
+# ---------------------------------------------------------------------------
+# `flask --app main build-static` copies the files in static/ to static/dist/
+# under content hashed names, next to precompressed .gz and (if brotli is
+# installed) .br variants, and lists them in static/dist/manifest.json.
+# url_for('static', filename=...) resolves to the hashed names, which are
+# served with immutable cache headers. Files without an up to date build are
+# served under their plain names as before.
+
+STATIC_DIST_DIR = 'dist'
+STATIC_MANIFEST_VERSION = 1
+STATIC_COMPRESSIBLE = ('.css', '.js', '.json', '.svg')
+_CSS_URL_RE = re.compile(r'url\((["\']?)([^"\')?#]+)([?#][^"\')]*)?\1\)')
+
+def _static_sources(static_dir):
+    """Return the '/' separated paths of the files in *static_dir*, without the build output."""
+    names = []
+    for root, dirs, files in os.walk(static_dir):
+        if root == static_dir and STATIC_DIST_DIR in dirs:
+            dirs.remove(STATIC_DIST_DIR)
+        rel = os.path.relpath(root, static_dir)
+        for name in files:
+            names.append(name if rel == '.' else f'{rel}/{name}'.replace(os.sep, '/'))
+    return sorted(names)
+
+def _rewrite_css_urls(name, content, files):
+    """Point url() references of the stylesheet *name* to the hashed names in *files*."""
+    base = posixpath.dirname(name)
+
+    def replace(match):
+        quote, target, suffix = match.groups()
+        entry = files.get(posixpath.normpath(posixpath.join(base, target)))
+        if entry is None:
+            return match.group(0)
+        # The hash replaces cache busting query strings, fragments are kept
+        fragment = suffix[suffix.index('#'):] if suffix and '#' in suffix else ''
+        hashed = posixpath.relpath(entry['path'], posixpath.join(STATIC_DIST_DIR, base))
+        return f'url({quote}{hashed}{fragment}{quote})'
+
+    return _CSS_URL_RE.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+def _write_file_atomic(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(content)
+    os.replace(tmp_path, path)
+
+def build_static_assets(static_dir):
+    """Write the hashed and precompressed static files and the manifest, return the manifest files."""
+    dist_dir = os.path.join(static_dir, STATIC_DIST_DIR)
+    manifest_path = os.path.join(dist_dir, 'manifest.json')
+    previous = _read_static_manifest(manifest_path)
+
+    files = {}
+    # Stylesheets refer to other files (e.g. fonts), so they are hashed last
+    for name in sorted(_static_sources(static_dir), key=lambda name: name.endswith('.css')):
+        with open(os.path.join(static_dir, name), 'rb') as fh:
+            source = fh.read()
+        content = _rewrite_css_urls(name, source, files) if name.endswith('.css') else source
+
+        root, ext = posixpath.splitext(name)
+        path = f'{STATIC_DIST_DIR}/{root}.{hashlib.sha256(content).hexdigest()[:12]}{ext}'
+        variants = {path: content}
+        encodings = []
+        if name.endswith(STATIC_COMPRESSIBLE):
+            if brotli is not None:
+                variants[path + '.br'] = brotli.compress(content, quality=11)
+                encodings.append('br')
+            variants[path + '.gz'] = gzip.compress(content, compresslevel=9, mtime=0)
+            encodings.append('gzip')
+
+        for variant, data in variants.items():
+            variant_path = os.path.join(static_dir, variant)
+            if not os.path.exists(variant_path):
+                _write_file_atomic(variant_path, data)
+
+        files[name] = {'path': path, 'source_hash': hashlib.sha256(source).hexdigest(), 'encodings': encodings}
+
+    manifest = {'version': STATIC_MANIFEST_VERSION, 'files': files}
+    _write_file_atomic(manifest_path, json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+
+    # Keep the previous build, pages rendered before a restart still refer to it
+    keep = set()
+    for entry in list(files.values()) + list((previous or {}).values()):
+        keep.add(entry['path'])
+        keep.update(f"{entry['path']}{'.br' if encoding == 'br' else '.gz'}" for encoding in entry['encodings'])
+    for name in _static_sources(dist_dir):
+        if name != 'manifest.json' and f'{STATIC_DIST_DIR}/{name}' not in keep:
+            os.remove(os.path.join(dist_dir, name))
+
+    return files
+
+def _read_static_manifest(manifest_path):
+    """Return the files of the static manifest, or None if there is no usable one."""
+    try:
+        with open(manifest_path, encoding='utf-8') as fh:
+            manifest = json.load(fh)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read static manifest {manifest_path}: {e}")
+        return None
+    if manifest.get('version') != STATIC_MANIFEST_VERSION:
+        return None
+    return manifest['files']
+
+def load_static_assets(static_dir):
+    """Return the manifest entries whose source file is unchanged since build-static."""
+    files = _read_static_manifest(os.path.join(static_dir, STATIC_DIST_DIR, 'manifest.json')) or {}
+    assets = {}
+    for name, entry in files.items():
+        try:
+            with open(os.path.join(static_dir, name), 'rb') as fh:
+                source_hash = hashlib.sha256(fh.read()).hexdigest()
+        except OSError:
+            continue
+        if source_hash != entry['source_hash']:
+            print(f"Warning: static/{name} changed since the last build-static, serving it unversioned")
+            continue
+        assets[name] = entry
+    return assets
+
+static_assets = load_static_assets(app.static_folder)
+_static_encodings = {entry['path']: entry['encodings'] for entry in static_assets.values()}
+
+@app.url_defaults
+def _static_url_defaults(endpoint, values):
+    """Make url_for('static', filename=...) resolve to the hashed file name."""
+    if endpoint == 'static':
+        entry = static_assets.get(values.get('filename'))
+        if entry is not None:
+            values['filename'] = entry['path']
+
+def static_file(filename):
+    """Serve a static file, hashed ones with immutable cache headers and precompressed."""
+    if not filename.startswith(STATIC_DIST_DIR + '/'):
+        return app.send_static_file(filename)
+
+    suffix, encoding = '', None
+    for candidate in _static_encodings.get(filename, ()):
+        if request.accept_encodings[candidate]:
+            suffix, encoding = ('.br' if candidate == 'br' else '.gz'), candidate
+            break
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(app.static_folder, filename + suffix, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+app.view_functions['static'] = static_file
+
+@app.cli.command('build-static')
+def build_static_command():
+    """Write fingerprinted and precompressed copies of the static files, e.g. during deploy."""
+    files = build_static_assets(app.static_folder)
+    compressed = sum(1 for entry in files.values() if entry['encodings'])
+    print(f"Built {len(files)} static files ({compressed} precompressed) into static/{STATIC_DIST_DIR}")
+
+# ---------------------------------------------------------------------------
+# HTTP caching
+# ---------------------------------------------------------------------------
+# Uploads never change once stored, so pages and data responses only depend
+# on the URL and on the app itself (code, templates, translations, API
+# constants). They get a strong ETag derived from both and are kept
+# compressed in memory and, if RESPONSE_CACHE_DIR is set in the environment,
+# on disk, so that a response is rendered and compressed once.
+
+CACHE_MAX_AGE = 7 * 24 * 60 * 60
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+RESPONSE_CACHE_BYTES = 64 * 1024 * 1024
+RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR') or None
+RESPONSE_CACHE_DISK_BYTES = int(os.environ.get('RESPONSE_CACHE_DISK_BYTES', 1024 * 1024 * 1024))
+# The server writes the counters of its response cache here, at most every
+# RESPONSE_CACHE_STATS_INTERVAL seconds, for "flask --app main cache-stats"
+RESPONSE_CACHE_STATS_PATH = os.path.join(PROTOCOL_DIR, 'response_cache_stats.json')
+RESPONSE_CACHE_STATS_INTERVAL = 60
+# Smaller bodies are not worth compressing
+COMPRESS_MIN_BYTES = 1024
+
+_APP_FINGERPRINT = None
+
+def _app_fingerprint():
+    """Hash of everything besides the upload that goes into a response. Built on first use."""
+    global _APP_FINGERPRINT
+    if _APP_FINGERPRINT is None:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        template_dir = os.path.join(base_dir, 'templates')
+        paths = [os.path.join(base_dir, 'main.py'), os.path.join(base_dir, 'i18n.py')]
+        paths += sorted(os.path.join(template_dir, name) for name in os.listdir(template_dir))
+
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, 'rb') as fh:
+                digest.update(fh.read())
+        digest.update(json.dumps(get_api_constants(), sort_keys=True).encode('utf-8'))
+        # Pages refer to the hashed static file names
+        digest.update(json.dumps(static_assets, sort_keys=True).encode('utf-8'))
+        _APP_FINGERPRINT = digest.hexdigest()[:16]
+    return _APP_FINGERPRINT
+
+class ResponseCache:
+    """Least recently used cache of response bodies, bounded by their total size.
+
+    Entries are (body, content_type, content_encoding) tuples. With
+    *disk_dir*, entries are also written there (up to *disk_max_bytes*,
+    least recently used files are removed first) and survive restarts.
+    With *stats_path*, stats() is written there every now and then.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, disk_max_bytes=0, stats_path=None):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_size = None  # unknown until the directory was scanned
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stats_path = stats_path
+        self.stats_written = None
+
+    def get(self, key):
+        """Return (body, content_type, content_encoding) or None."""
+        self._write_stats()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+
+        entry = self._disk_get(key)
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._memory_put(key, entry)
+        return entry
+
+    def put(self, key, body, content_type, content_encoding):
+        entry = (body, content_type, content_encoding)
+        self._memory_put(key, entry)
+        self._disk_put(key, entry)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_entries': len(self.entries),
+                'memory_bytes': self.size,
+                'memory_max_bytes': self.max_bytes,
+                'disk_bytes': self.disk_size,
+                'disk_max_bytes': self.disk_max_bytes if self.disk_dir else None,
+            }
+
+    def _write_stats(self):
+        """Write stats() to *stats_path* if RESPONSE_CACHE_STATS_INTERVAL has passed since the last time."""
+        if self.stats_path is None:
+            return
+        now = time.monotonic()
+        with self.lock:
+            if self.stats_written is not None and now - self.stats_written < RESPONSE_CACHE_STATS_INTERVAL:
+                return
+            self.stats_written = now
+
+        stats = dict(self.stats(), pid=os.getpid(), written=datetime.datetime.now().isoformat(timespec='seconds'))
+        tmp_path = f'{self.stats_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w') as fh:
+                json.dump(stats, fh)
+            os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            print(f"Warning: Could not write response cache stats {self.stats_path}: {e}")
+
+    def _memory_put(self, key, entry):
+        body = entry[0]
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self.entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (old_body, _, _) = self.entries.popitem(last=False)
+                self.size -= len(old_body)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _disk_get(self, key):
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as fh:
+                header = json.loads(fh.readline())
+                body = fh.read()
+            os.utime(path)  # the mtime orders the files for eviction
+        except (OSError, ValueError):
+            return None
+        return body, header['content_type'], header['content_encoding']
+
+    def _disk_put(self, key, entry):
+        if self.disk_dir is None:
+            return
+        body, content_type, content_encoding = entry
+        header = json.dumps({'content_type': content_type, 'content_encoding': content_encoding})
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as fh:
+                fh.write(header.encode('utf-8') + b'\n')
+                fh.write(body)
+            try:
+                replaced_size = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced_size = 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write response cache file {path}: {e}")
+            return
+
+        with self.lock:
+            if self.disk_size is not None:
+                self.disk_size += len(header) + 1 + len(body) - replaced_size
+            if self.disk_size is not None and self.disk_size <= self.disk_max_bytes:
+                return
+            self._disk_evict()
+
+    def _disk_evict(self):
+        """Remove the least recently used files until the disk cache is 10% below its limit."""
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        self.disk_size = sum(size for _, size, _ in files)
+        files.sort()
+        for _, size, path in files:
+            if self.disk_size <= self.disk_max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.disk_size -= size
+
+_response_cache = ResponseCache(RESPONSE_CACHE_BYTES, RESPONSE_CACHE_DIR, RESPONSE_CACHE_DISK_BYTES,
+                                RESPONSE_CACHE_STATS_PATH)
+
+def _negotiate_encoding():
+    """Return the preferred content encoding the client accepts ('br', 'gzip' or None)."""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=9)
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+def _set_cache_headers(response, etag, immutable=False):
+    response.set_etag(etag)
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = CACHE_MAX_AGE
+    response.vary.add('Accept-Encoding')
+
+def cached_response(*params, immutable=False):
+    """Serve a view with a strong ETag, Cache-Control and negotiated compression.
+
+    The response may only depend on the path and on the query parameters
+    named in *params*, which make up the cache key together with the app
+    fingerprint. Requests carrying a matching If-None-Match header are
+    answered with 304 without calling the view. Other successful responses
+    are kept in _response_cache, per key and content encoding. Views behind
+    fingerprinted URLs pass *immutable* to be cached by browsers for a year.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if 'uuid' in kwargs:
+                _protocol_file_path(kwargs['uuid'])  # 404 for unknown uploads
+
+            encoding = _negotiate_encoding()
+            query = urllib.parse.urlencode([(name, request.args[name]) for name in params if name in request.args])
+            key = hashlib.sha256(f'{_app_fingerprint()}\0{request.path}?{query}'.encode('utf-8')).hexdigest()[:32]
+            etag = key if encoding is None else f'{key}-{encoding}'
+
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+                _set_cache_headers(response, etag, immutable)
+                return response
+
+            cached = _response_cache.get(etag)
+            if cached is None:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                content_encoding = None
+                if encoding is not None and len(body) >= COMPRESS_MIN_BYTES:
+                    body = _compress(body, encoding)
+                    content_encoding = encoding
+                cached = (body, response.content_type, content_encoding)
+                _response_cache.put(etag, *cached)
+
+            body, content_type, content_encoding = cached
+            response = app.response_class(body, content_type=content_type)
+            if content_encoding is not None:
+                response.headers['Content-Encoding'] = content_encoding
+            _set_cache_headers(response, etag, immutable)
+            return response
+        return wrapper
+    return decorator
+
+@app.cli.command('cache-stats')
+def cache_stats_command():
+    """Print the hit/miss counters and sizes of the response cache of the running server."""
+    try:
+        with open(RESPONSE_CACHE_STATS_PATH, 'r') as fh:
+            stats = json.load(fh)
+    except FileNotFoundError:
+        print("No response cache stats yet, the server writes them when it serves requests")
+        return
+    for name, value in stats.items():
+        print(f"{name}: {value}")
+
+# Translations and API constants are identical for every page of a language,
+# so pages reference them by a content fingerprint instead of inlining them.
+_page_resources = {}
+
+def _page_resource(kind, lang):
+    """Return (fingerprint, JSON body) of the translations or API constants of *lang*."""
+    if (kind, lang) not in _page_resources:
+        value = get_translations(lang) if kind == 'translations' else get_api_constants()[lang]
+        body = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        _page_resources[kind, lang] = (hashlib.sha256(body).hexdigest()[:16], body)
+    return _page_resources[kind, lang]
+
+def page_resource_urls(lang):
+    """Return the fingerprinted translation and API constant URLs for the page data."""
+    return {
+        'translations_url': url_for('api_translations', lang=lang, fingerprint=_page_resource('translations', lang)[0]),
+        'api_constants_url': url_for('api_constants_json', lang=lang, fingerprint=_page_resource('constants', lang)[0]),
+    }
+
+def _page_resource_response(kind, lang, fingerprint):
+    if lang not in SUPPORTED_LANGUAGES:
+        abort(404)
+    current, body = _page_resource(kind, lang)
+    if fingerprint != current:
+        # Stale reference from a page rendered before a deployment
+        return redirect(url_for(request.endpoint, lang=lang, fingerprint=current))
+    return app.response_class(body, mimetype='application/json')
+
+@app.route('/api/translations/<lang>.<fingerprint>.json')
+@cached_response(immutable=True)
+def api_translations(lang, fingerprint):
+    return _page_resource_response('translations', lang, fingerprint)
+
+@app.route('/api/constants/<lang>.<fingerprint>.json')
+@cached_response(immutable=True)
+def api_constants_json(lang, fingerprint):
+    return _page_resource_response('constants', lang, fingerprint)
+
 def _handle_upload(lang):
     """Handle file upload from POST request. Returns redirect response or None."""
     f = request.files.get('file')
     if not f or f.filename == '':
         return redirect(f'/{lang}/')
     uuid = shortuuid.uuid()
-    file_path = os.path.join(PROTOCOL_DIR, uuid)
-    f.save(file_path)
+    upload_path = os.path.join(PROTOCOL_DIR, f'{uuid}.{os.getpid()}.upload')
+
+    # Hash while saving, identical uploads are stored only once
+    digest = hashlib.sha256()
+    with open(upload_path, 'wb') as out:
+        for chunk in iter(lambda: f.stream.read(1 << 20), b''):
+            digest.update(chunk)
+            out.write(chunk)
+    try:
+        store_protocol(uuid, upload_path, digest.hexdigest())
+    finally:
+        os.remove(upload_path)
     return redirect(f'/{lang}/{uuid}')
 
 # Route for the main page
@@ -408,31 +1160,46 @@ def view_id_legacy(uuid):
     return redirect(target)
 
 
-@app.route('/<lang>/<uuid>')
-def view_id(lang, uuid):
-    if lang not in SUPPORTED_LANGUAGES:
-        abort(404)
+def _protocol_file_path(uuid):
+    """Validate *uuid* and return the path of the uploaded file, abort with 404 if there is none."""
     # Validate UUID format to prevent path traversal
     if not UUID_PATTERN.match(uuid):
         abort(404)
-    # Create the file path for the protocol
-    file_path = os.path.join(PROTOCOL_DIR, uuid)
-    if not os.path.exists(file_path):
+    file_path = stored_protocol_path(uuid)
+    if file_path is None:
         abort(404)  # Return a 404 error if the protocol does not exist
+    return file_path
 
-    t = get_translations(lang)
-    data, dropped_lines_count = read_and_preprocess_protocol(file_path)
+def _is_report(data):
+    """Return True if the blocks of an uploaded file belong to a debug report."""
     try:
-        is_report = (len(data[0]) < 100) and ('Scroll down for event log!' in data[0])
+        return (len(data[0]) < 100) and ('Scroll down for event log!' in data[0])
     except (IndexError, TypeError):
         abort(400)
 
+@app.route('/<lang>/<uuid>')
+@cached_response('configuration', 'selected')
+def view_id(lang, uuid):
+    if lang not in SUPPORTED_LANGUAGES:
+        abort(404)
+    file_path = _protocol_file_path(uuid)
+
+    t = get_translations(lang)
+
+    # Protocols that have been viewed before are served from the parse cache
+    # without touching the raw file.
+    protocol = load_protocol_cache(uuid)
+    if protocol is not None:
+        return handle_protocol(uuid, protocol, lang, t)
+
+    data, dropped_lines_count, is_report = open_protocol_blocks(uuid, file_path)
     if is_report:
-        return handle_report(data, lang, t)
+        return handle_report(uuid, data, lang, t)
     else:
         # Old ?configuration= and ?selected= params are converted to hash
         # on the client side for backward compatibility.
-        return handle_protocol(data, lang, t, dropped_lines_count)
+        protocol = build_protocol_cache(uuid, data, dropped_lines_count)
+        return handle_protocol(uuid, protocol, lang, t)
 
 # Legacy /chart route, redirect to base URL, client handles old params via hash
 @app.route('/<lang>/<uuid>/chart')
@@ -448,6 +1215,322 @@ def view_chart(lang, uuid):
         target += f'?{qs}'
     return redirect(target)
 
+def _load_protocol_or_404(uuid, file_path, **kwargs):
+    """Return the parse cache of a protocol, parsing it first if necessary.
+
+    Aborts with 404 if the uploaded file is a debug report. *kwargs* are
+    passed to load_protocol_cache() and select from a fresh parse likewise.
+    """
+    protocol = load_protocol_cache(uuid, **kwargs)
+    if protocol is None:
+        data, dropped_lines_count, is_report = open_protocol_blocks(uuid, file_path)
+        if is_report:
+            abort(404)
+        protocol = select_protocol_cache(build_protocol_cache(uuid, data, dropped_lines_count), **kwargs)
+    return protocol
+
+def _requested_column_names():
+    return [name for name in request.args.get('names', '').split(',') if name]
+
+def _columns_response(columns):
+    """Respond with {'columns': {...}} as JSON, or in binary form with ``?format=bin``."""
+    if request.args.get('format') == 'bin':
+        return app.response_class(columns_to_binary(columns), mimetype='application/octet-stream')
+    return app.response_class(f'{{"columns":{columns_to_json(columns)}}}', mimetype='application/json')
+
+@app.route('/api/<uuid>/columns')
+@cached_response('names', 'format')
+def api_columns(uuid):
+    """Return the full data of protocol columns.
+
+    The columns are selected with ``?names=a,b,c``. Unknown and non-numeric
+    columns are left out of the response.
+    """
+    file_path = _protocol_file_path(uuid)
+    names = _requested_column_names()
+    protocol = _load_protocol_or_404(uuid, file_path, columns=names, axis=False)
+
+    edit_funcs = _chart_edit_funcs()
+    columns = {}
+    for name in names:
+        if name in protocol['columns']:
+            columns[name] = _column_values(protocol['columns'][name], edit_funcs.get(name))
+
+    return _columns_response(columns)
+
+@app.route('/api/<uuid>/downsample')
+@cached_response('names', 'start', 'end', 'points', 'format')
+def api_downsample(uuid):
+    """Return protocol columns reduced to a bounded number of points.
+
+    Query params: ``names`` (comma separated columns), ``start`` and ``end``
+    (millis window, whole protocol if left out) and ``points`` (maximum
+    number of points per column). The chart requests this whenever the zoom
+    window changes, see downsample_protocol().
+    """
+    file_path = _protocol_file_path(uuid)
+    names = _requested_column_names()
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    points = request.args.get('points', DOWNSAMPLE_POINTS, type=int)
+    points = min(max(points, 2), DOWNSAMPLE_POINTS_MAX)
+
+    protocol = _load_protocol_or_404(uuid, file_path, columns=names)
+    view = downsample_protocol(protocol, names, start, end, points)
+    if request.args.get('format') == 'bin':
+        extra = {'labels': view['labels'].tolist(), 'downsampled': view['downsampled']}
+        return app.response_class(columns_to_binary(view['columns'], view['x'], extra),
+                                  mimetype='application/octet-stream')
+
+    body = (f'{{"x":{_json_array(view["x"])},'
+            f'"labels":{htmlsafe_json_dumps(view["labels"].tolist())},'
+            f'"columns":{columns_to_json(view["columns"])},'
+            f'"downsampled":{"true" if view["downsampled"] else "false"}}}')
+    return app.response_class(body, mimetype='application/json')
+
+def _json_values(values):
+    """Return a numeric ndarray as a list of Python numbers, NaN becomes None."""
+    if values.dtype.kind == 'f':
+        return [None if np.isnan(value) else value for value in values.tolist()]
+    return values.tolist()
+
+@app.route('/api/<uuid>/transitions')
+@cached_response('names')
+def api_transitions(uuid):
+    """Return the state transitions of a protocol as a list of events.
+
+    Query params: ``names`` (comma separated columns, all TRANSITION_COLUMNS
+    if left out). Responds with ``{"transitions": [{"column": ..., "x": ...,
+    "label": ..., "from": ..., "to": ..., "window": [start, end]}]}`` in
+    chronological order, *window* being the millis window of
+    TRANSITION_CONTEXT_ROWS rows around the transition.
+    """
+    file_path = _protocol_file_path(uuid)
+    names = [name for name in _requested_column_names() or TRANSITION_COLUMNS if name in TRANSITION_COLUMNS]
+    protocol = _load_protocol_or_404(uuid, file_path, columns=names, transitions=names)
+    x = protocol['x']
+    labels = protocol['labels']
+
+    transitions = []
+    for name, rows in protocol['transitions'].items():
+        rows = rows.astype(np.int64)
+        values = protocol['columns'][name]
+        starts = x[np.maximum(rows - TRANSITION_CONTEXT_ROWS, 0)]
+        ends = x[np.minimum(rows + TRANSITION_CONTEXT_ROWS, len(x) - 1)]
+        for position, label, before, after, start, end in zip(
+                x[rows].tolist(), labels[rows].tolist(), _json_values(values[rows - 1]), _json_values(values[rows]),
+                starts.tolist(), ends.tolist()):
+            transitions.append({'column': name, 'x': position, 'label': label, 'from': before, 'to': after,
+                                'window': [start, end]})
+    transitions.sort(key=lambda transition: transition['x'])
+    body = json.dumps({'transitions': transitions}, separators=(',', ':'))
+    return app.response_class(body, mimetype='application/json')
+
+def _load_report_or_404(uuid, file_path, sections=None):
+    """Return the section cache of a debug report, splitting it first if necessary.
+
+    Aborts with 404 if the uploaded file is a protocol. *sections* is passed
+    to load_report_cache().
+    """
+    report = load_report_cache(uuid, sections)
+    if report is None:
+        data, _, is_report = open_protocol_blocks(uuid, file_path)
+        if not is_report:
+            abort(404)
+        report = build_report_cache(uuid, data)
+    return report
+
+def _load_cm_or_404(uuid, file_path, columns=None):
+    """Return the charge_manager cache of a debug report, parsing its trace first if necessary.
+
+    Aborts with 404 if there is no charge_manager trace with data.
+    """
+    cm_parsed = load_cm_cache(uuid, columns=columns)
+    if cm_parsed is None:
+        report = _load_report_or_404(uuid, file_path, sections=['module:charge_manager'])
+        cm_trace = report['sections'].get('module:charge_manager')
+        cm_parsed = parse_report_cm(cm_trace) if cm_trace is not None else None
+        if cm_parsed is None:
+            abort(404)
+        build_cm_cache(uuid, cm_parsed)
+        cm_parsed = load_cm_cache(uuid, columns=columns)
+    return cm_parsed
+
+@app.route('/api/<uuid>/lines/<section>')
+@cached_response('start', 'count')
+def api_log_lines(uuid, section):
+    """Return a range of lines of a log.
+
+    Sections are ``before_log`` and ``after_log`` of protocols and ``log``,
+    ``trace`` and ``module:NAME`` of debug reports, see build_log_index().
+    Query params: ``start`` (first line) and ``count`` (number of lines, at
+    most LOG_LINES_MAX). Responds with ``{"start": ..., "line_count": ...,
+    "lines": [...]}``, *line_count* being the number of lines of the log.
+    """
+    file_path = _protocol_file_path(uuid)
+    start = max(request.args.get('start', 0, type=int), 0)
+    count = min(max(request.args.get('count', LOG_LINES_DEFAULT, type=int), 0), LOG_LINES_MAX)
+
+    line_count, lines = read_log_lines(uuid, file_path, section, start, count)
+    body = json.dumps({'start': min(start, line_count), 'line_count': line_count, 'lines': lines},
+                      separators=(',', ':'))
+    return app.response_class(body, mimetype='application/json')
+
+@app.route('/api/<uuid>/search')
+@cached_response('q', 'regex', 'case', 'section', 'start', 'count', 'context')
+def api_search(uuid):
+    """Search the logs of an upload for lines matching a text or a regex.
+
+    Query params: ``q``, ``regex=1`` if q is a Python regex, ``case=1`` for
+    a case sensitive search, ``section`` to only search one log (see
+    api_log_lines()), ``start`` and ``count`` to page through the matches
+    and ``context``, the number of lines sent before and after each match.
+    Responds with ``{"start": ..., "total": ..., "complete": ...,
+    "matches": [{"section": ..., "line": ..., "first": ..., "lines": [...]}]}``.
+    *first* is the line number of lines[0]. At most SEARCH_MAX_MATCHES
+    matches are counted, *complete* tells if *total* counts all of them.
+    Queries longer than SEARCH_QUERY_MAX are rejected with 400, regex
+    searches taking longer than SEARCH_REGEX_TIMEOUT seconds with 408.
+    """
+    file_path = _protocol_file_path(uuid)
+    query = request.args.get('q', '')
+    regex = request.args.get('regex') == '1'
+    section = request.args.get('section')
+    start = max(request.args.get('start', 0, type=int), 0)
+    count = min(max(request.args.get('count', SEARCH_RESULTS_DEFAULT, type=int), 0), SEARCH_RESULTS_MAX)
+    context = min(max(request.args.get('context', 0, type=int), 0), SEARCH_CONTEXT_MAX)
+    if not query:
+        return {'error': 'Empty query'}, 400
+    if len(query) > SEARCH_QUERY_MAX:
+        return {'error': f'Query longer than {SEARCH_QUERY_MAX} characters'}, 400
+    try:
+        pattern = re.compile(query if regex else re.escape(query),
+                             re.MULTILINE | (0 if request.args.get('case') == '1' else re.IGNORECASE))
+    except re.error as e:
+        return {'error': f'Invalid regex: {e}'}, 400
+
+    log = LogIndex(uuid, file_path)
+    sections = [section] if section is not None else list(log.sections)
+    for name in sections:
+        log.section(name)  # 404 for unknown sections
+    filters = load_search_index(uuid, log, sections)
+    candidates = {name: search_chunks(packed, query, regex) for name, packed in filters.items()}
+
+    # Escaped text is matched in linear time, regexes can backtrack forever
+    all_matches = itertools.islice(search_logs(log, candidates, pattern), SEARCH_MAX_MATCHES)
+    if regex:
+        all_matches = run_with_deadline(list, (all_matches,), SEARCH_REGEX_TIMEOUT)
+        if all_matches is None:
+            return {'error': f'Regex search took longer than {SEARCH_REGEX_TIMEOUT} seconds'}, 408
+
+    found = []
+    total = 0
+    for match in all_matches:
+        if start <= total < start + count:
+            found.append(match)
+        total += 1
+    complete = total < SEARCH_MAX_MATCHES
+
+    matches = []
+    for name, line in found:
+        first = max(line - context, 0)
+        lines = log.lines(name, first, line - first + context + 1)[1]
+        matches.append({'section': name, 'line': line, 'first': first, 'lines': lines})
+    body = json.dumps({'start': start, 'total': total, 'complete': complete, 'matches': matches},
+                      separators=(',', ':'))
+    return app.response_class(body, mimetype='application/json')
+
+@app.route('/api/<uuid>/events')
+@cached_response('start', 'end', 'count')
+def api_events(uuid):
+    """Return the events of the event logs of an upload inside a time window.
+
+    Query params: ``start`` and ``end`` (window on the x-axis, all events if
+    left out) and ``count`` (at most EVENTS_MAX; events are picked evenly
+    from windows with more). The x-axis of protocols are the millis of the
+    chart, of debug reports the local time in ms since 1970. Responds with
+    ``{"total": ..., "events": [{"x": ..., "section": ..., "line": ...,
+    "module": ..., "message": ..., "text": ...}]}``, *text* being the whole
+    log line and *total* the number of events in the window.
+    """
+    file_path = _protocol_file_path(uuid)
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    count = min(max(request.args.get('count', EVENTS_DEFAULT, type=int), 0), EVENTS_MAX)
+
+    log = LogIndex(uuid, file_path)
+    artifact = _load_artifact(_artifact_path(uuid, 'events'), EVENT_INDEX_VERSION,
+                              only={'order', 'time', 'clock', 'section', 'line', 'module', 'message'})
+    meta, arrays = artifact if artifact is not None else build_event_index(uuid, file_path, log)
+
+    order = arrays['order']
+    x = _event_x(arrays['time'][order], arrays['clock'][order], meta['local_offset'])
+    first = 0 if start is None else int(np.searchsorted(x, start, side='left'))
+    last = len(x) if end is None else int(np.searchsorted(x, end, side='right'))
+    total = max(last - first, 0)
+    if total <= count:
+        picked = np.arange(first, first + total)
+    else:
+        picked = np.unique(np.linspace(first, last - 1, count).round().astype(np.int64))
+    records = order[picked].astype(np.int64)
+
+    # Read the lines of each section in line order
+    lines = {}
+    for section_index, section in enumerate(meta['sections']):
+        numbers = np.unique(arrays['line'][records[arrays['section'][records] == section_index]]).tolist()
+        lines.update(zip(((section_index, n) for n in numbers), log.select(section, numbers)))
+
+    events = []
+    for position, record in zip(x[picked].tolist(), records.tolist()):
+        section_index = int(arrays['section'][record])
+        line = int(arrays['line'][record])
+        module = int(arrays['module'][record])
+        text = lines[section_index, line]
+        events.append({
+            'x': position,
+            'section': meta['sections'][section_index],
+            'line': line,
+            'module': meta['modules'][module] if module >= 0 else None,
+            'message': text[int(arrays['message'][record]):].decode('utf-8', errors='replace'),
+            'text': text.decode('utf-8', errors='replace'),
+        })
+    body = json.dumps({'total': total, 'events': events}, separators=(',', ':'))
+    return app.response_class(body, mimetype='application/json')
+
+@app.route('/api/<uuid>/report/cm')
+@cached_response()
+def api_report_cm(uuid):
+    """Return the charge_manager chart data of a debug report.
+
+    The dense table columns are left out, the chart fetches them from
+    api_cm_table() in binary form.
+    """
+    cm_parsed = _load_cm_or_404(uuid, _protocol_file_path(uuid), columns=())
+    return app.response_class(json.dumps(cm_parsed, separators=(',', ':')), mimetype='application/json')
+
+@app.route('/api/<uuid>/cm_table')
+@cached_response('names', 'format')
+def api_cm_table(uuid):
+    """Return the dense table columns of the charge_manager trace of a debug report.
+
+    All columns are returned unless ``?names=a,b,c`` is given.
+    """
+    names = _requested_column_names() or None
+    cm_parsed = _load_cm_or_404(uuid, _protocol_file_path(uuid), columns=names)
+    return _columns_response(cm_parsed['table_data'])
+
+@app.route('/<lang>/<uuid>/coredump')
+@cached_response()
+def report_coredump(lang, uuid):
+    """Render the coredump tab of a debug report."""
+    if lang not in SUPPORTED_LANGUAGES:
+        abort(404)
+    file_path = _protocol_file_path(uuid)
+    report = _load_report_or_404(uuid, file_path, sections=())
+    data, _, _ = open_protocol_blocks(uuid, file_path)
+    coredump_info = parse_report_coredump(data, report['dump_blocks'])
+    return render_template('report_coredump.html', coredump_info=coredump_info, t=get_translations(lang))
+
 # Coredump parsing constants and helpers (based on esp32-firmware/software/coredump.py)
 TF_COREDUMP_PREFIX = b"___tf_coredump_info_start___"
 TF_COREDUMP_SUFFIX = b"___tf_coredump_info_end___"
@@ -713,150 +1796,187 @@ def _build_cm_columns(has_pv, has_phases, has_bat):
     return columns, col_keys, summary_cols, alloc_cols
 
 
+# Sparse value groups of the charge_manager trace. A summary, allocation or
+# hysteresis line sets all keys of its group at the same row/iteration.
+_CM_SPARSE_GROUPS = {
+    '0': [f's0_{name}' for name in _CM_SUMMARY_NAMES],
+    '9': [f's9_{name}' for name in _CM_SUMMARY_NAMES],
+    'alloc': ['alloc_current', 'alloc_phases'],
+    'hysteresis': ['hysteresis'],
+}
+
+_CM_TIMESTAMP_RE = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})')
+_CM_SUMMARY_RE = re.compile(r'([09]): raw\((-?\d+) (-?\d+) (-?\d+) (-?\d+)\) min\((-?\d+) (-?\d+) (-?\d+) (-?\d+)\) spread\((-?\d+) (-?\d+) (-?\d+) (-?\d+)\) max_pv (-?\d+)')
+_CM_ALLOC_RE = re.compile(r'9: \[(.+)\]')
+_CM_ALLOC_VALUE_RE = re.compile(r'(\d+)@(\d+)p')
+_CM_HYSTERESIS_RE = re.compile(r'Hysteresis (-?\d+)')
+
+@functools.lru_cache(maxsize=None)
+def _cm_table_row_re(column_count):
+    """Return the regex of a table row of *column_count* integers that _parse_cm_table() can read in bulk."""
+    return re.compile(r'-?[0-9]{1,18}(?:[ \t|]+-?[0-9]{1,18}){%d}' % (column_count - 1))
+
+def _parse_cm_table(rows, col_keys):
+    """Parse the table *rows* (integers separated by spaces, tabs and |) into {key: ndarray} columns."""
+    if not rows:
+        return {key: np.zeros(0, dtype=np.uint8) for key in col_keys}
+
+    # Collapse each run of separators into a comma
+    a = np.frombuffer('\n'.join(rows).encode('ascii'), dtype=np.uint8)
+    is_sep = (a == ord(' ')) | (a == ord('\t')) | (a == ord('|'))
+    keep = ~is_sep
+    keep[1:] |= ~is_sep[:-1]
+    a = a[keep]
+    a[is_sep[keep]] = ord(',')
+    buf = a.tobytes()
+
+    columns = _parse_int_csv(buf, col_keys)
+    if columns is None:
+        # Values with more than 18 digits
+        values = np.array([int(value) for value in buf.replace(b'\n', b',').split(b',')], dtype=np.int64)
+        values = values.reshape(-1, len(col_keys))
+        columns = {key: _compact_int_array(values[:, i]) for i, key in enumerate(col_keys)}
+    return columns
+
+def _cm_sparse_data(sparse, positions_idx):
+    """Build {key: {'index': [...], 'values': [...]}} from the recorded sparse groups.
+
+    *positions_idx* selects the row (0) or iteration (1) positions. Values
+    recorded before the first row/iteration are dropped, all others belong
+    to the row/iteration before their position.
+    """
+    summary_data = {}
+    for group, keys in _CM_SPARSE_GROUPS.items():
+        recorded = sparse[group]
+        positions = np.array(recorded[positions_idx], dtype=np.int64)
+        values = np.array(recorded[2], dtype=np.int64).reshape(-1, len(keys))
+        mask = positions > 0
+        if not mask.any():
+            continue
+        index = (positions[mask] - 1).tolist()
+        values = values[mask]
+        for i, key in enumerate(keys):
+            summary_data[key] = {'index': index, 'values': values[:, i].tolist()}
+    return summary_data
+
 def parse_charge_manager_trace(content):
     """Parse the charge_manager trace section into structured chart data.
 
     Returns a dict with:
       - columns: [{key, label, group}, ...] -> metadata for each column
-      - table_data: {column_key: [values...]} -> dense arrays, one value per table row
-      - summary_data: {column_key: [[row_idx, value], ...]} -> sparse pairs
-      - timestamps: [[row_idx, "YYYY-MM-DD HH:MM:SS,mmm"], ...] -> sparse
-      - events: [[row_idx, "RECV ..."], ...] -> sparse
+      - table_data: {column_key: ndarray} -> dense columns, one value per table row
+      - summary_data: {column_key: {index: [...], values: [...]}} -> sparse
+      - timestamps: {index: [...], values: ["YYYY-MM-DD HH:MM:SS,mmm", ...]} -> sparse
+      - events: {index: [...], values: ["RECV ...", ...]} -> sparse
       - row_count: int -> total number of table rows (or iterations if no table)
 
     When no PM/PV table data is present (e.g. PV excess mode not enabled),
     the parser falls back to an iteration-based mode where each timestamp
     marks a new data point and summary/hysteresis/allocation values are
     plotted against these iterations.
+
+    The trace is read in one pass that dispatches on the start of each line.
+    Table rows are collected as text and parsed in bulk by _parse_int_csv().
     """
     lines = content.split('\n')
 
     has_pv, has_phases, has_bat = _detect_cm_header(lines)
     columns, col_keys, summary_cols, alloc_cols = _build_cm_columns(has_pv, has_phases, has_bat)
     expected_cols = len(col_keys)
-
-    # --- Parse data ---
-    table_data = {k: [] for k in col_keys}
-    summary_data = {k: [] for k in summary_cols + alloc_cols + ['hysteresis']}
-    timestamps = []
-    events = []
-
-    # Iteration-level tracking for table-less traces (no PM/PV table data).
-    # Each timestamp starts a new iteration.
-    iter_count = 0
-    iter_timestamps_list = []
-    iter_summary = {k: [] for k in summary_cols + alloc_cols + ['hysteresis']}
+    row_re = _cm_table_row_re(expected_cols)
+
+    # Sparse values are recorded once with both the table row and the
+    # iteration count at their position: (row positions, iteration
+    # positions, flat values). Each timestamp starts a new iteration.
+    sparse = {group: ([], [], []) for group in _CM_SPARSE_GROUPS}
+    timestamp_rows = []
+    timestamp_values = []
+    event_rows = []
+    event_values = []
+    rows = []
 
     row_idx = 0
+    iter_count = 0
     in_table = False
-    step_line_re = re.compile(r'^-?\d+:')
-    timestamp_re = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})')
-    summary_re = re.compile(r'^([09]): raw\((-?\d+) (-?\d+) (-?\d+) (-?\d+)\) min\((-?\d+) (-?\d+) (-?\d+) (-?\d+)\) spread\((-?\d+) (-?\d+) (-?\d+) (-?\d+)\) max_pv (-?\d+)')
-    alloc_re = re.compile(r'^9: \[(.+)\]')
-    hysteresis_re = re.compile(r'^Hysteresis (-?\d+)')
-
     for line in lines:
         stripped = line.strip()
         if not stripped:
             continue
 
-        # Skip header lines
-        if stripped.startswith('PM') or (stripped.startswith('mtr') and 'avl' in stripped):
-            in_table = True
-            continue
-
-        # Timestamp
-        ts_m = timestamp_re.match(stripped)
-        if ts_m:
+        first = stripped[0]
+        group = None
+        if first == 'P' or first == 'm':
+            # Header lines
+            if stripped.startswith('PM') or (stripped.startswith('mtr') and 'avl' in stripped):
+                in_table = True
+                continue
+        elif stripped[4:5] == '-' and _CM_TIMESTAMP_RE.match(stripped):
             in_table = False
-            if row_idx > 0:
-                timestamps.append([row_idx - 1, ts_m.group(1)])
-            # Track iteration-level timestamps for table-less fallback
-            iter_timestamps_list.append(ts_m.group(1))
+            timestamp_rows.append(row_idx)
+            timestamp_values.append(stripped[:23])
             iter_count += 1
             continue
-
-        # Hysteresis
-        hyst_m = hysteresis_re.match(stripped)
-        if hyst_m:
-            hyst_val = int(hyst_m.group(1))
-            if row_idx > 0:
-                summary_data['hysteresis'].append([row_idx - 1, hyst_val])
-            if iter_count > 0:
-                iter_summary['hysteresis'].append([iter_count - 1, hyst_val])
-            continue
-
-        # Summary lines (0: raw(...) or 9: raw(...))
-        sum_m = summary_re.match(stripped)
-        if sum_m:
-            step = sum_m.group(1)
-            vals = [int(sum_m.group(i)) for i in range(2, 15)]
-            prefix = f's{step}_'
-            if row_idx > 0:
-                for name, val in zip(_CM_SUMMARY_NAMES, vals):
-                    summary_data[prefix + name].append([row_idx - 1, val])
-            if iter_count > 0:
-                for name, val in zip(_CM_SUMMARY_NAMES, vals):
-                    iter_summary[prefix + name].append([iter_count - 1, val])
-            continue
-
-        # Allocation result: 9: [ ... ]
-        alloc_m = alloc_re.match(stripped)
-        if alloc_m:
-            inner = alloc_m.group(1).strip()
-            # Parse "0 32000@3p" or just "0" (no allocation)
-            at_m = re.search(r'(\d+)@(\d+)p', inner)
-            if at_m:
-                alloc_current = int(at_m.group(1))
-                alloc_phases = int(at_m.group(2))
-            else:
-                alloc_current = 0
-                alloc_phases = 0
-            if row_idx > 0:
-                summary_data['alloc_current'].append([row_idx - 1, alloc_current])
-                summary_data['alloc_phases'].append([row_idx - 1, alloc_phases])
-            if iter_count > 0:
-                iter_summary['alloc_current'].append([iter_count - 1, alloc_current])
-                iter_summary['alloc_phases'].append([iter_count - 1, alloc_phases])
-            continue
-
-        # RECV event lines
-        if stripped.startswith('RECV'):
-            events.append([row_idx, stripped])
+        elif first == 'H':
+            hyst_m = _CM_HYSTERESIS_RE.match(stripped)
+            if hyst_m:
+                group = 'hysteresis'
+                values = (int(hyst_m.group(1)),)
+        elif (first == '0' or first == '9') and stripped[1:3] == ': ':
+            # Summary lines (0: raw(...) or 9: raw(...)) and the allocation
+            # result 9: [ ... ], e.g. "0 32000@3p" or just "0" (no allocation)
+            if stripped[3:4] == 'r':
+                sum_m = _CM_SUMMARY_RE.match(stripped)
+                if sum_m:
+                    group = first
+                    values = map(int, sum_m.groups()[1:])
+            elif first == '9' and stripped[3:4] == '[':
+                alloc_m = _CM_ALLOC_RE.match(stripped)
+                if alloc_m:
+                    group = 'alloc'
+                    at_m = _CM_ALLOC_VALUE_RE.search(alloc_m.group(1))
+                    values = (int(at_m.group(1)), int(at_m.group(2))) if at_m else (0, 0)
+        elif first == 'R' and stripped.startswith('RECV'):
+            event_rows.append(row_idx)
+            event_values.append(stripped)
             continue
 
-        # Skip section markers and algorithm step lines
-        if stripped.startswith('__') and stripped.endswith('__'):
-            continue
-        if step_line_re.match(stripped) and '|' not in stripped:
-            continue
-        if stripped.startswith('Wnd') or stripped.startswith('Calc Wnd'):
-            continue
-        # Skip deeply indented algorithm text (5+ leading spaces with non-table content)
-        if len(line) > 0 and len(line) - len(line.lstrip()) >= 5 and '(' in stripped:
+        if group is not None:
+            row_positions, iter_positions, group_values = sparse[group]
+            row_positions.append(row_idx)
+            iter_positions.append(iter_count)
+            group_values.extend(values)
             continue
 
-        # Table data rows, try to parse as numbers separated by | groups
+        # Table data rows: numbers separated by spaces and | groups. Anything
+        # else (section markers, algorithm step lines, Wnd lines, indented
+        # algorithm text) fails to parse as a row and is skipped.
         if in_table:
-            # Remove | separators and split into numbers
+            if row_re.fullmatch(stripped):
+                rows.append(stripped)
+                row_idx += 1
+                continue
+
             parts = stripped.replace('|', ' ').split()
+            if len(parts) != expected_cols:
+                continue
             try:
                 values = [int(p) for p in parts]
             except ValueError:
                 continue
+            rows.append(' '.join(map(str, values)))
+            row_idx += 1
 
-            if len(values) == expected_cols:
-                for key, val in zip(col_keys, values):
-                    table_data[key].append(val)
-                row_idx += 1
+    events = {'index': event_rows, 'values': event_values}
 
     # If we have table data, return the table-based result (existing behavior).
     if row_idx > 0:
+        first_ts = bisect.bisect_right(timestamp_rows, 0)
         return {
             'columns': columns,
-            'table_data': table_data,
-            'summary_data': {k: v for k, v in summary_data.items() if v},
-            'timestamps': timestamps,
+            'table_data': _parse_cm_table(rows, col_keys),
+            'summary_data': _cm_sparse_data(sparse, 0),
+            'timestamps': {'index': [row - 1 for row in timestamp_rows[first_ts:]],
+                           'values': timestamp_values[first_ts:]},
             'events': events,
             'row_count': row_idx,
         }
@@ -871,8 +1991,8 @@ def parse_charge_manager_trace(content):
         return {
             'columns': iter_columns,
             'table_data': {},
-            'summary_data': {k: v for k, v in iter_summary.items() if v},
-            'timestamps': [[i, ts] for i, ts in enumerate(iter_timestamps_list)],
+            'summary_data': _cm_sparse_data(sparse, 1),
+            'timestamps': {'index': list(range(iter_count)), 'values': timestamp_values},
             'events': events,
             'row_count': iter_count,
         }
@@ -880,33 +2000,87 @@ def parse_charge_manager_trace(content):
     # No data at all
     return {
         'columns': columns,
-        'table_data': table_data,
+        'table_data': _parse_cm_table(rows, col_keys),
         'summary_data': {},
-        'timestamps': timestamps,
+        'timestamps': {'index': [], 'values': []},
         'events': events,
         'row_count': 0,
     }
 
 
-def handle_report(data, lang, t):
+# Module sections of the trace log are delimited by __begin_MODULE__ and
+# __end_MODULE__ markers
+_TRACE_MARKER_RE = re.compile(r'__(begin|end)_(\w+?)__')
+
+def split_trace_modules(trace):
+    """Find the module sections of a trace log in one pass over its markers.
+
+    Returns (modules, remaining): a list of (name, start, end) offsets of
+    the module contents and a list of (start, end) offsets of the text
+    outside of modules. A module ends at the first end marker with its name.
+    If there is none (e.g. in a truncated report), it ends at the next begin
+    marker or at the end of the trace.
+    """
+    markers = [(m.group(1) == 'begin', m.group(2), m.start(), m.end()) for m in _TRACE_MARKER_RE.finditer(trace)]
+    begins = []
+    ends = {}
+    for i, (is_begin, name, _, _) in enumerate(markers):
+        if is_begin:
+            begins.append(i)
+        else:
+            ends.setdefault(name, []).append(i)
+
+    modules = []
+    remaining = []
+    last_end = 0
+    i = 0
+    while i < len(markers):
+        is_begin, name, start, content_start = markers[i]
+        if not is_begin:
+            i += 1
+            continue
+
+        name_ends = ends.get(name, [])
+        k = bisect.bisect_right(name_ends, i)
+        if k < len(name_ends):
+            i = name_ends[k]
+            content_end, next_start = markers[i][2], markers[i][3]
+            i += 1
+        else:
+            k = bisect.bisect_right(begins, i)
+            i = begins[k] if k < len(begins) else len(markers)
+            content_end = next_start = markers[i][2] if i < len(markers) else len(trace)
+
+        remaining.append((last_end, start))
+        modules.append((name, content_start, content_end))
+        last_end = next_start
+
+    remaining.append((last_end, len(trace)))
+    return modules, remaining
+
+def parse_report_json(data):
+    """Parse the configuration block of a debug report."""
     try:
         # Fix json syntax error that can happen in report
         data_json     = data[1].replace('": ,', '": {},')
-        report_json   = json.loads(data_json)
+        return json.loads(data_json)
     except (IndexError, KeyError, json.JSONDecodeError, TypeError, ValueError):
-        report_json   = {}
+        return {}
 
-    try:
-        report_log    = data[2]
-    except (IndexError, KeyError):
-        report_log    = ""
+def split_report(data):
+    """Split the blocks of a debug report after the event log into its trace and coredump sections.
 
+    Returns (report_trace, trace_modules, dump_blocks): the trace text that
+    is not part of a module, {module name: text} and the indices of the
+    coredump blocks.
+    """
     inside_trace = False
     report_trace_blocks = []
     inside_dump = False
-    report_dump_blocks = []
+    dump_blocks = []
 
-    for block in data[3:]:
+    for idx in range(3, len(data)):
+        block = data[idx]
         if '___TRACE_LOG_START___' in block:
             inside_trace = True
         elif '___CORE_DUMP_START___' in block:
@@ -915,67 +2089,69 @@ def handle_report(data, lang, t):
         elif inside_trace:
             report_trace_blocks.append(block)
         elif inside_dump:
-            report_dump_blocks.append(block)
-
-    if len(report_dump_blocks) == 0:
-        report_dump_blocks.append('Es befindet sich kein Coredump im Debug-Report')
+            dump_blocks.append(idx)
 
     # Parse module sections from trace log
-    # Sections are delimited by __begin_MODULE__ and __end_MODULE__
-    trace_modules = {}
-    trace_remaining = []
     full_trace = '\n\n'.join(report_trace_blocks)
-
-    # Find all module sections using regex
-    module_pattern = re.compile(r'__begin_(\w+)__(.*?)__end_\1__', re.DOTALL)
-    last_end = 0
-
-    for match in module_pattern.finditer(full_trace):
-        module_name = match.group(1)
-        module_content = match.group(2).strip()
-
-        # Collect text before this module (not part of any module)
-        before_text = full_trace[last_end:match.start()].strip()
-        if before_text:
-            trace_remaining.append(before_text)
-
+    modules, remaining = split_trace_modules(full_trace)
+    trace_modules = {}
+    for module_name, start, end in modules:
+        module_content = full_trace[start:end].strip()
         if module_content:
             trace_modules[module_name] = module_content
-
-        last_end = match.end()
-
-    # Collect any remaining text after the last module
-    after_text = full_trace[last_end:].strip()
-    if after_text:
-        trace_remaining.append(after_text)
+    trace_remaining = [text for text in (full_trace[start:end].strip() for start, end in remaining) if text]
 
     # If no modules found, use the full trace as remaining
     if not trace_modules and not trace_remaining:
         if report_trace_blocks and report_trace_blocks[0] != 'Es befindet sich kein Trace-Log im Debug-Report':
             trace_remaining = [full_trace]
 
-    # Parse coredump for structured display
-    coredump_info = parse_coredump(report_dump_blocks)
+    return '\n\n'.join(trace_remaining), trace_modules, dump_blocks
 
-    # Parse charge_manager trace for structured chart visualization
-    cm_parsed = None
-    if 'charge_manager' in trace_modules:
-        try:
-            cm_parsed = parse_charge_manager_trace(trace_modules['charge_manager'])
-            if cm_parsed['row_count'] == 0:
-                cm_parsed = None
-        except Exception as e:
-            print(f"Warning: Failed to parse charge_manager trace: {e}")
-            cm_parsed = None
+def parse_report_coredump(data, dump_blocks):
+    """Parse the coredump blocks (indices from split_report()) of a debug report for structured display."""
+    report_dump_blocks = [data[idx] for idx in dump_blocks]
+    if len(report_dump_blocks) == 0:
+        report_dump_blocks.append('Es befindet sich kein Coredump im Debug-Report')
+    return parse_coredump(report_dump_blocks)
+
+def parse_report_cm(cm_trace):
+    """Parse the charge_manager trace module for structured chart visualization.
+
+    Returns None if the trace has no data or can't be parsed.
+    """
+    try:
+        cm_parsed = parse_charge_manager_trace(cm_trace)
+    except Exception as e:
+        print(f"Warning: Failed to parse charge_manager trace: {e}")
+        return None
+    if cm_parsed['row_count'] == 0:
+        return None
+    return cm_parsed
+
+def handle_report(uuid, data, lang, t):
+    # Only the configuration tab is shown first, the other sections are
+    # fetched from the report section endpoints when their tab is opened.
+    report = load_report_cache(uuid, sections=())
+    if report is None:
+        report = build_report_cache(uuid, data)
 
     data = {
-        'report_json':  report_json,
-        'report_log':   report_log,
-        'report_trace': '\n\n'.join(trace_remaining) if trace_remaining else '',
-        'trace_modules': trace_modules,
-        'coredump_info': coredump_info,
-        'cm_parsed': cm_parsed,
-        'api_constants': api_constants[lang],
+        'uuid': uuid,
+        'report_json': parse_report_json(data),
+        'has_trace': report['has_trace'],
+        'trace_modules': report['modules'],
+        'has_cm': report['has_cm'],
+        'section_urls': {
+            'log': url_for('api_log_lines', uuid=uuid, section='log'),
+            'trace': url_for('api_log_lines', uuid=uuid, section='trace'),
+            'modules': {name: url_for('api_log_lines', uuid=uuid, section=f'module:{name}')
+                        for name in report['modules']},
+            'cm': url_for('api_report_cm', uuid=uuid),
+            'coredump': url_for('report_coredump', lang=lang, uuid=uuid),
+            'search': url_for('api_search', uuid=uuid),
+        },
+        **page_resource_urls(lang),
     }
 
     # Render the protocol with syntax highlighting
@@ -989,17 +2165,156 @@ def _get_block(data, idx, default, parse_json=False):
     except (IndexError, KeyError, json.JSONDecodeError, TypeError, ValueError):
         return default
 
-def _sanitize_for_json(values):
-    """Replace NaN/inf values with None for JSON serialization."""
-    return [None if not math.isfinite(v) else v for v in values]
+def _column_values(col, edit_func=None):
+    """Return the chart values of a cached column, applying *edit_func* if given."""
+    return edit_func(col) if edit_func else col
+
+def _json_array(values):
+    """Serialize a 1-D numeric ndarray to a compact JSON array, NaN/inf become null.
+
+    Uses the C JSON writer of pandas directly on the NumPy buffer instead of
+    converting every value to a Python object first.
+    """
+    return pd.Series(values, copy=False).to_json(orient='values')
+
+def _change_points(values):
+    """Return the indices of the values that differ from their predecessor, NaNs count as equal."""
+    changed = values[1:] != values[:-1]
+    if values.dtype.kind == 'f':
+        nan = np.isnan(values)
+        changed &= ~(nan[1:] & nan[:-1])
+    return np.flatnonzero(changed) + 1
+
+# Step-like columns (states, flags, configured currents) are sent as runs of
+# equal values if that needs at most 1/RUN_ENCODING_RATIO of the values.
+RUN_ENCODING_RATIO = 8
+
+def _column_runs(values):
+    """Return (starts, values) of the runs of equal consecutive values, or None.
+
+    None is returned if the column changes too often for run-length
+    encoding to pay off. NaNs form runs like any other value.
+    """
+    if len(values) < RUN_ENCODING_RATIO:
+        return None
+
+    changes = _change_points(values)
+    if (len(changes) + 1) * RUN_ENCODING_RATIO > len(values):
+        return None
+
+    starts = np.concatenate(([0], changes))
+    return starts, values[starts]
+
+def _json_column(values):
+    runs = _column_runs(values)
+    if runs is None:
+        return _json_array(values)
+    starts, run_values = runs
+    return f'{{"length":{len(values)},"starts":{_json_array(starts)},"values":{_json_array(run_values)}}}'
+
+def columns_to_json(columns):
+    """Serialize {name: ndarray} to a JSON object that is safe to embed in <script>.
+
+    Each column is either an array or, for step-like columns, an object
+    {length, starts, values} of runs that _expandColumns() in vislog.js
+    turns back into an array.
+    """
+    parts = [f'{htmlsafe_json_dumps(name)}:{_json_column(values)}' for name, values in columns.items()]
+    return Markup('{' + ','.join(parts) + '}')
+
+# Integer types of the binary column format, narrowest first
+_BINARY_INT_TYPES = [('uint8', '<u1'), ('int8', '<i1'), ('uint16', '<u2'), ('int16', '<i2'),
+                     ('uint32', '<u4'), ('int32', '<i4')]
+
+def _binary_int_type(low, high):
+    """Return the narrowest (name, dtype) of the binary format that holds [low, high], or None."""
+    for name, dtype in _BINARY_INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return name, dtype
+    return None
+
+def _binary_array(values):
+    """Pick the compact binary representation of a 1-D numeric ndarray.
+
+    Returns (dtype name, little-endian ndarray, null mask or None). Integer
+    values are sent in the narrowest integer type that holds them (NaNs of
+    float columns go into a null bitmask), other floats as float32 with
+    NaN/inf as NaN. Integers that don't fit into 32 bits (e.g. millis) are
+    sent as float64.
+    """
+    if values.dtype.kind in 'biu':
+        int_type = _binary_int_type(values.min(), values.max()) if len(values) else _BINARY_INT_TYPES[0]
+        if int_type is None:
+            return 'float64', values.astype('<f8'), None
+        return int_type[0], values.astype(int_type[1]), None
+
+    values = values.astype(np.float64, copy=False)
+    finite = np.isfinite(values)
+    valid = values[finite]
+    int_type = _binary_int_type(valid.min(), valid.max()) if len(valid) else _BINARY_INT_TYPES[0]
+    if int_type is not None and np.array_equal(valid, np.floor(valid)):
+        null_mask = None if finite.all() else np.packbits(~finite, bitorder='little')
+        return int_type[0], np.where(finite, values, 0).astype(int_type[1]), null_mask
+    return 'float32', np.where(finite, values, np.nan).astype('<f4'), None
+
+def columns_to_binary(columns, x=None, extra=None):
+    """Serialize {name: ndarray} to the binary format read by _decodeColumnBuffer() in vislog.js.
+
+    Layout: uint32 LE header length, UTF-8 JSON header, then the column
+    buffers, each starting at a multiple of 8 bytes. The header holds *extra*
+    and per column (and for the optional x-axis array *x*) the name, dtype,
+    length and byte offset of the values and, if there are nulls, of the
+    null bitmask (LSB first, bit set = null). Step-like columns instead have
+    ``runs`` with the descriptions of the run starts and values.
+    """
+    buffers = []
+    offset = 0
+
+    def add_buffer(arr):
+        nonlocal offset
+        data = arr.tobytes()
+        position = offset
+        buffers.append(data)
+        offset += len(data)
+        padding = -offset % 8
+        if padding:
+            buffers.append(b'\0' * padding)
+            offset += padding
+        return position
+
+    def describe(name, values):
+        dtype, arr, null_mask = _binary_array(values)
+        desc = {'name': name, 'dtype': dtype, 'length': len(arr), 'offset': add_buffer(arr)}
+        if null_mask is not None:
+            desc['null_offset'] = add_buffer(null_mask)
+        return desc
+
+    def describe_column(name, values):
+        runs = _column_runs(values)
+        if runs is None:
+            return describe(name, values)
+        starts, run_values = runs
+        return {'name': name, 'length': len(values),
+                'runs': {'starts': describe('starts', starts), 'values': describe('values', run_values)}}
+
+    header = dict(extra or {})
+    if x is not None:
+        header['x'] = describe('x', x)
+    header['columns'] = [describe_column(name, values) for name, values in columns.items()]
+
+    # Offsets in the header are relative to the end of the (padded) header
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-(4 + len(header_bytes)) % 8)
+    return b''.join([np.uint32(len(header_bytes)).astype('<u4').tobytes(), header_bytes] + buffers)
 
 _CSV_SECTION_HEADINGS = {
     'STATE', 'HARDWARE CONFIG', 'ENERGY METER', 'ENERGY METER ERRORS',
     'LL-State', 'ADC VALUES', 'VOLTAGES', 'RESISTANCES', 'GPIOs',
 }
 
-def _disambiguate_csv_columns(protocol_csv):
-    """Prefix duplicate column names with their section heading.
+def _disambiguate_csv_header(header):
+    """Prefix duplicate column names of the CSV header line with their section heading.
 
     The CSV uses certain columns (e.g. RESISTANCES, VOLTAGES, ADC VALUES) as
     section headings.  When a column name like ``CP/PE`` appears under multiple
@@ -1009,16 +2324,11 @@ def _disambiguate_csv_columns(protocol_csv):
     and subsequent* occurrences are renamed so that the first occurrence keeps
     its original name for backwards compatibility.
     """
-    lines = protocol_csv.split('\n')
-    if not lines:
-        return protocol_csv
-
-    headers = lines[0].split(',')
     seen = {}          # name -> count of previous occurrences
     current_section = None
     new_headers = []
 
-    for h in headers:
+    for h in header.split(','):
         stripped = h.strip()
         if stripped in _CSV_SECTION_HEADINGS:
             current_section = stripped
@@ -1035,121 +2345,1368 @@ def _disambiguate_csv_columns(protocol_csv):
 
         seen[stripped] = seen.get(stripped, 0) + 1
 
-    lines[0] = ','.join(new_headers)
-    return '\n'.join(lines)
+    return ','.join(new_headers)
+
+class _BufferReader(RawIOBase):
+    """Binary file object reading the given buffers one after another, without copying them."""
+    def __init__(self, *buffers):
+        self.buffers = [memoryview(buf).cast('B') for buf in buffers]
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self.buffers:
+            view = self.buffers[0]
+            if self.pos < len(view):
+                n = min(len(b), len(view) - self.pos)
+                b[:n] = view[self.pos:self.pos + n]
+                self.pos += n
+                return n
+            self.buffers.pop(0)
+            self.pos = 0
+        return 0
+
+_NEWLINE_RE = re.compile(b'\n')
+
+def _read_protocol_csv(buf):
+    """Parse the CSV block *buf* (bytes-like) into a DataFrame.
+
+    Only the header line is rewritten (see _disambiguate_csv_header()), the
+    rows are passed to the parser straight from *buf*.
+    """
+    view = memoryview(buf).cast('B')
+    newline = _NEWLINE_RE.search(view)
+    header_end = newline.start() if newline else len(view)
+    header = _disambiguate_csv_header(str(view[:header_end], 'utf-8'))
+    return pd.read_csv(_BufferReader(header.encode('utf-8'), view[header_end:]))
+
+# The EVSE protocol table only holds integers (states, flags, currents,
+# millis, ...), with the section heading columns left empty. Tables of
+# exactly this shape are parsed vectorized, in chunks of about
+# PROTOCOL_CSV_CHUNK_SIZE bytes, into the narrowest integer type of every
+# column. Everything else is left to pandas.
+PROTOCOL_CSV_CHUNK_SIZE = 256 * 1024
+
+def _compact_int_array(values):
+    """Return the integer ndarray *values* in the narrowest integer type that holds it."""
+    if len(values) == 0:
+        return values.astype(np.uint8)
+    low, high = values.min(), values.max()
+    for dtype in (np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values  # uint64 beyond the range of int64
+
+def _parse_int_csv_chunk(a, column_count, keep):
+    """Parse complete rows of integers (uint8 ndarray *a*, without trailing newline).
+
+    Returns {column index: (values, missing)} for the column indices in
+    *keep*, or None if *a* holds anything but optionally signed integers,
+    empty fields and rows of exactly *column_count* fields.
+    """
+    # Digits of a field are read up to 18 bytes past its start
+    digits = np.zeros(len(a) + 18, dtype=np.uint8)
+    np.subtract(a, ord('0'), out=digits[:len(a)])
+    is_sep = (a == ord(',')) | (a == ord('\n'))
+    minus_pos = np.flatnonzero(a == ord('-'))
+    if np.count_nonzero(digits[:len(a)] < 10) + np.count_nonzero(is_sep) + len(minus_pos) != len(a):
+        return None
+
+    sep_pos = np.flatnonzero(is_sep)
+    field_count = len(sep_pos) + 1
+    rows = field_count // column_count
+    if field_count % column_count != 0:
+        return None
+    # Every column_count-th separator has to be a newline, all others commas
+    newline_pos = np.flatnonzero(a == ord('\n'))
+    if len(newline_pos) != rows - 1 or not np.array_equal(sep_pos[column_count - 1::column_count], newline_pos):
+        return None
+
+    bounds = np.concatenate(([-1], sep_pos, [len(a)]))
+    starts = bounds[:-1] + 1
+    lengths = np.diff(bounds) - 1
+    if column_count == 1 and not lengths.all():
+        return None  # blank lines, which pandas skips
+    negative = np.zeros(0, dtype=np.int64)
+    if len(minus_pos) > 0:
+        negative = np.searchsorted(sep_pos, minus_pos)
+        if (starts[negative] != minus_pos).any() or (lengths[negative] < 2).any():
+            return None  # '-' that is not the sign of a number
+        starts[negative] += 1
+        lengths[negative] -= 1
+    if lengths.max() > 18:
+        return None  # might not fit into int64
+
+    result = {}
+    for i in keep:
+        col_starts = starts[i::column_count]
+        col_lengths = lengths[i::column_count]
+        values = digits[col_starts]
+        max_length = col_lengths.max()
+        if max_length > 1:
+            values = values.astype(np.int64)
+            for k in range(1, max_length):
+                values = np.where(col_lengths > k, values * 10 + digits[col_starts + k], values)
+
+        missing = col_lengths == 0
+        if missing.any():
+            values[missing] = 0
+
+        col_negative = negative[negative % column_count == i] // column_count
+        if len(col_negative) > 0:
+            values = values.astype(np.int64)
+            values[col_negative] = -values[col_negative]
+        result[i] = values, missing
+    return result
+
+def _parse_int_csv(buf, names):
+    """Parse the rows of an integer table (*buf* without the header line) column by column.
+
+    Returns {name: ndarray} of all columns except section headings, or None
+    if the table doesn't have the expected shape (see _parse_int_csv_chunk()).
+    """
+    a = np.frombuffer(buf, dtype=np.uint8)
+    if len(a) > 0 and a[-1] == ord('\n'):
+        a = a[:-1]
+    if len(a) == 0:
+        return None
+
+    keep = [i for i, name in enumerate(names) if name not in _CSV_SECTION_HEADINGS]
+    chunks = {i: [] for i in keep}
+    missing_chunks = {i: [] for i in keep}
+    start = 0
+    while start < len(a):
+        # Chunks end at a row end
+        end = len(a)
+        if start + PROTOCOL_CSV_CHUNK_SIZE < len(a):
+            newline = _NEWLINE_RE.search(buf, start + PROTOCOL_CSV_CHUNK_SIZE, len(a))
+            if newline is not None:
+                end = newline.start()
+        parsed = _parse_int_csv_chunk(a[start:end], len(names), keep)
+        if parsed is None:
+            return None
+        for i, (values, missing) in parsed.items():
+            chunks[i].append(_compact_int_array(values))
+            missing_chunks[i].append(np.packbits(missing) if missing.any() else None)
+        start = end + 1
+
+    columns = {}
+    for i in keep:
+        dtype = np.result_type(*chunks[i])
+        values = np.concatenate([chunk.astype(dtype, copy=False) for chunk in chunks[i]])
+        if any(mask is not None for mask in missing_chunks[i]):
+            missing = np.concatenate([np.zeros(len(chunk), dtype=bool) if mask is None
+                                      else np.unpackbits(mask, count=len(chunk)).astype(bool)
+                                      for chunk, mask in zip(chunks[i], missing_chunks[i])])
+            # Empty fields become NaN, like pandas does. float32 holds
+            # integers exactly up to 2^24.
+            limit = max(abs(int(values.min())), abs(int(values.max()))) if len(values) else 0
+            values = values.astype(np.float32 if limit <= 1 << 24 else np.float64)
+            values[missing] = np.nan
+        columns[names[i]] = values
+    return columns
+
+def parse_protocol_csv(buf):
+    """Parse the CSV block *buf* (bytes-like) into {column name: ndarray}.
+
+    Section heading columns are left out. Duplicate column names are
+    disambiguated (see _disambiguate_csv_header()). Tables of integers are
+    parsed by _parse_int_csv() into compact integer arrays, others with
+    pandas. Raises ValueError (or pandas' EmptyDataError) if there is no table.
+    """
+    view = memoryview(buf).cast('B')
+    newline = _NEWLINE_RE.search(view)
+    header_end = newline.start() if newline else len(view)
+    names = _disambiguate_csv_header(str(view[:header_end], 'utf-8')).split(',')
+    if (header_end < len(view) and '"' not in ''.join(names) and all(names)
+            and len(set(names)) == len(names)):
+        columns = _parse_int_csv(view[header_end + 1:], names)
+        if columns is not None:
+            return columns
+
+    df = _read_protocol_csv(view)
+    columns = {}
+    for name in df.columns:
+        if name in _CSV_SECTION_HEADINGS:
+            continue
+        values = df[name].to_numpy()
+        columns[name] = _compact_int_array(values) if values.dtype.kind in 'iu' else values
+    return columns
+
+def _get_block_buffer(data, idx):
+    """Return block *idx* of *data* undecoded (b'' if there is none)."""
+    try:
+        if isinstance(data, ProtocolBlocks):
+            return data.buffer(idx)
+        return data[idx].encode('utf-8')
+    except (IndexError, AttributeError):
+        return b''
 
 def parse_protocol_data(data):
     # Parse protocol data and extract available columns
     before_protocol_json = _get_block(data, 0, {}, parse_json=True)
     before_protocol_log  = _get_block(data, 1, "")
-    protocol_csv         = _get_block(data, 2, "")
+    protocol_csv         = _get_block_buffer(data, 2)
     after_protocol_json  = _get_block(data, 3, {}, parse_json=True)
     after_protocol_log   = _get_block(data, 4, "")
 
     try:
-        # Disambiguate duplicate column names using section headings
-        protocol_csv = _disambiguate_csv_columns(protocol_csv)
-
-        # Get timestamp data from CSV
-        df = pd.read_csv(StringIO(protocol_csv))
+        # Get timestamp data from CSV, with duplicate column names
+        # disambiguated using section headings
+        columns = parse_protocol_csv(protocol_csv)
 
         # Extract real timestamp info from the log
-        first_millis = df['millis'].iloc[0] if len(df) > 0 else None
+        first_millis = columns['millis'][0] if len(columns['millis']) > 0 else None
         timestamp_info = extract_real_timestamp(before_protocol_log, first_millis)
 
         # Convert millis to real timestamps
-        millis = convert_millis_to_real_time(df['millis'].tolist(), timestamp_info)
+        millis = convert_millis_to_real_time(columns['millis'], timestamp_info)
     except (KeyError, ValueError, TypeError, pd.errors.EmptyDataError):
         millis = []
-        df = None
+        columns = None
         timestamp_info = None
 
-    # Get available columns for dynamic selection
+    # Get available columns for dynamic selection (section heading columns
+    # are already left out)
     available_columns = []
-    if df is not None:
-        # Filter out section heading columns and 'millis' column.
-        # Section headings contain all-NaN data but we exclude them early.
-        available_columns = [col for col in df.columns
-                           if col != 'millis' and col not in _CSV_SECTION_HEADINGS]
+    if columns is not None:
+        available_columns = [col for col in columns if col != 'millis']
 
     return {
         'before_protocol_json': before_protocol_json,
         'before_protocol_log': before_protocol_log,
-        'protocol_csv': protocol_csv,
         'after_protocol_json': after_protocol_json,
         'after_protocol_log': after_protocol_log,
-        'df': df,
+        'columns': columns,
         'millis': millis,
         'available_columns': available_columns,
         'timestamp_info': timestamp_info,
         'has_real_timestamps': timestamp_info is not None
     }
 
-def handle_protocol(data, lang, t, dropped_lines_count=None):
-    """Unified protocol handler: sends ALL column data + metadata to a single template.
+# ---------------------------------------------------------------------------
+# Protocol storage
+# ---------------------------------------------------------------------------
+# Uploads are stored once per content, gzip compressed and named after their
+# SHA-256 digest (protocols/content/<hash[:2]>/<hash>.gz), together with
+# their derived artifacts. Each uuid refers to its content with a small file
+# protocols/<uuid[:2]>/<uuid>.ref holding the digest. Uploads from before
+# are stored uncompressed in protocols/<uuid> until they are moved with
+# "flask --app main migrate-storage".
+
+# Consecutive blocks are compressed together up to this many bytes
+STORAGE_MEMBER_SIZE = 256 * 1024
+
+CONTENT_DIR = os.path.join(PROTOCOL_DIR, 'content')
+
+def _shard_dir(uuid):
+    return os.path.join(PROTOCOL_DIR, uuid[:2])
+
+def _content_dir(content_hash):
+    return os.path.join(CONTENT_DIR, content_hash[:2])
+
+def _ref_path(uuid):
+    return os.path.join(_shard_dir(uuid), f'{uuid}.ref')
+
+def _content_hash(uuid):
+    """Return the content digest the upload *uuid* refers to, or None for older uploads."""
+    try:
+        with open(_ref_path(uuid), 'r') as fh:
+            return fh.read().strip()
+    except FileNotFoundError:
+        return None
+
+def stored_protocol_path(uuid):
+    """Return the path of the stored upload *uuid*, or None if there is none."""
+    content_hash = _content_hash(uuid)
+    if content_hash is not None:
+        file_path = os.path.join(_content_dir(content_hash), f'{content_hash}.gz')
+        return file_path if os.path.exists(file_path) else None
+
+    # Uploads from before the content store
+    file_path = os.path.join(PROTOCOL_DIR, uuid)
+    if os.path.isfile(file_path):
+        return file_path
+    return None
+
+def open_protocol_file(file_path, mode='rb'):
+    """Open a stored upload for reading, decompressing it transparently."""
+    if file_path.endswith('.gz'):
+        return gzip.open(file_path, mode)
+    return open(file_path, mode)
+
+def _member_starts(starts, ends):
+    """Group consecutive blocks into gzip members of up to STORAGE_MEMBER_SIZE bytes.
+
+    Larger blocks get a member of their own, so that reading a small block
+    never decompresses a large one.
+    """
+    member_starts = [0]
+    for start, end in zip(starts, ends):
+        if start > member_starts[-1] and end - member_starts[-1] > STORAGE_MEMBER_SIZE:
+            member_starts.append(start)
+    return member_starts
+
+def _compress_protocol(source_path, file_path, index_path):
+    """Compress the file *source_path* to *file_path* and store its block index at *index_path*.
+
+    The file is written as a sequence of gzip members that start at block
+    boundaries (see _member_starts()), which reads like a single gzip file
+    but also allows decompressing single blocks. Returns the block index
+    like build_block_index().
+    """
+    tmp_path = f'{file_path}.{os.getpid()}.tmp'
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+    with open(source_path, 'rb') as fh, _map_file(fh) as buf:
+        meta, arrays = _index_blocks(source_path, buf)
+        member_starts = _member_starts(arrays['starts'].tolist(), arrays['ends'].tolist()) if meta['seekable'] else [0]
+        member_offsets = []
+        try:
+            with open(tmp_path, 'wb') as out:
+                for start, end in zip(member_starts, member_starts[1:] + [len(buf)]):
+                    member_offsets.append(out.tell())
+                    with gzip.GzipFile(fileobj=out, mode='wb', mtime=0) as gz:
+                        for pos in range(start, end, 1 << 20):
+                            gz.write(buf[pos:min(pos + (1 << 20), end)])
+            os.replace(tmp_path, file_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    if meta['seekable']:
+        arrays['member_starts'] = np.array(member_starts, dtype=np.int64)
+        arrays['member_offsets'] = np.array(member_offsets, dtype=np.int64)
+    _store_artifact(index_path, BLOCK_INDEX_VERSION, meta, arrays)
+    return dict(meta, **arrays)
+
+def _hash_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def store_protocol(uuid, source_path, content_hash):
+    """Store the uncompressed file *source_path* with SHA-256 digest *content_hash* as upload *uuid*.
+
+    Content that was uploaded before is not stored again, *uuid* then
+    refers to the existing file and shares its parse caches.
+    """
+    file_path = os.path.join(_content_dir(content_hash), f'{content_hash}.gz')
+    if not os.path.exists(file_path):
+        index_path = os.path.join(_content_dir(content_hash), f'{content_hash}.blocks.npz')
+        _compress_protocol(source_path, file_path, index_path)
+
+    ref_path = _ref_path(uuid)
+    tmp_path = f'{ref_path}.{os.getpid()}.tmp'
+    os.makedirs(_shard_dir(uuid), exist_ok=True)
+    with open(tmp_path, 'w') as fh:
+        fh.write(content_hash)
+    os.replace(tmp_path, ref_path)
+
+@app.cli.command('migrate-storage')
+def migrate_storage_command():
+    """Move uploads from the flat protocols/ directory into the content store."""
+    uploads = [name for name in os.listdir(PROTOCOL_DIR)
+               if UUID_PATTERN.match(name) and os.path.isfile(os.path.join(PROTOCOL_DIR, name))]
+
+    for i, uuid in enumerate(uploads):
+        # Until the upload refers to its content, its artifacts are kept in
+        # its shard directory, see _artifact_path()
+        shard_dir = _shard_dir(uuid)
+        try:
+            artifacts = [name for name in os.listdir(shard_dir)
+                         if name.startswith(f'{uuid}.') and name.endswith('.npz')]
+        except FileNotFoundError:
+            artifacts = []
+
+        file_path = os.path.join(PROTOCOL_DIR, uuid)
+        store_protocol(uuid, file_path, _hash_file(file_path))
+
+        # Parsed artifacts stay valid (unless the content was stored already),
+        # block indices refer to the old file
+        for name in artifacts:
+            kind = name[len(uuid) + 1:-len('.npz')]
+            artifact_path = _artifact_path(uuid, kind)
+            if kind == 'blocks' or os.path.exists(artifact_path):
+                os.remove(os.path.join(shard_dir, name))
+            else:
+                os.replace(os.path.join(shard_dir, name), artifact_path)
+        os.remove(file_path)
+
+        if (i + 1) % 1000 == 0:
+            print(f"Migrated {i + 1} of {len(uploads)} uploads")
+    print(f"Migrated {len(uploads)} uploads")
+
+# ---------------------------------------------------------------------------
+# Parsed protocol cache
+# ---------------------------------------------------------------------------
+# Bump whenever parse_protocol_data() or the cache layout changes. Cached
+# artifacts carrying a different version are rebuilt on the next view.
+PROTOCOL_CACHE_VERSION = 6
+
+def _artifact_path(uuid, kind):
+    """Path of a derived artifact that is stored next to the raw file."""
+    content_hash = _content_hash(uuid)
+    if content_hash is not None:
+        return os.path.join(_content_dir(content_hash), f'{content_hash}.{kind}.npz')
+    return os.path.join(_shard_dir(uuid), f'{uuid}.{kind}.npz')
+
+def _store_artifact(path, version, meta, arrays):
+    """Write *meta* (JSON-serializable) and *arrays* (name -> ndarray) to an npz file.
+
+    The arrays are compressed, most protocol columns are nearly constant. The
+    file is written to a temporary name first and then renamed, so that
+    concurrent readers never see a half-written artifact.
+    """
+    meta = dict(meta, version=version)
+    payload = {f'a{i}': arr for i, arr in enumerate(arrays.values())}
+    meta['arrays'] = list(arrays.keys())
+    payload['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as fh:
+            np.savez_compressed(fh, **payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not write artifact {path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def _load_artifact(path, version, only=None):
+    """Load an artifact written by _store_artifact().
+
+    If *only* is given, just the arrays with these names are read from disk.
+    Returns (meta, arrays) or None if the artifact does not exist, is
+    unreadable or was written by a different version.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            meta = json.loads(npz['meta'].tobytes().decode('utf-8'))
+            if meta.get('version') != version:
+                return None
+            arrays = {name: npz[f'a{i}'] for i, name in enumerate(meta['arrays'])
+                      if only is None or name in only}
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        print(f"Warning: Ignoring unreadable artifact {path}: {e}")
+        return None
+    return meta, arrays
+
+# Bump whenever the block index layout or the block splitting changes.
+BLOCK_INDEX_VERSION = 2
+
+_DROPPED_LINES_RE = re.compile(_DROPPED_LINES_TEXT_RE.pattern.encode('ascii'))
+
+class ProtocolBlocks(Sequence):
+    """The '\n\n'-separated blocks of an uploaded file, read from disk on access.
+
+    Behaves like the list returned by read_and_preprocess_protocol(), but
+    only the blocks that are actually indexed are read (each access reads
+    the block again). For compressed files, *member_starts* and
+    *member_offsets* give the uncompressed start and the file offset of
+    each gzip member, so that only the member holding a block is
+    decompressed.
+    """
+    def __init__(self, file_path, starts, ends, member_starts=None, member_offsets=None):
+        self.file_path = file_path
+        self.starts = starts
+        self.ends = ends
+        self.member_starts = member_starts
+        self.member_offsets = member_offsets
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _read(self, fh, idx, members):
+        """Return block *idx* as bytes or, for compressed files, a memoryview of its member."""
+        start, end = self.starts[idx], self.ends[idx]
+        if self.member_starts is None:
+            fh.seek(start)
+            return fh.read(end - start)
+
+        # Consecutive small blocks share a member, keep the last one around
+        member = bisect.bisect_right(self.member_starts, start) - 1
+        if member not in members:
+            members.clear()
+            fh.seek(self.member_offsets[member])
+            if member + 1 < len(self.member_offsets):
+                compressed = fh.read(self.member_offsets[member + 1] - self.member_offsets[member])
+            else:
+                compressed = fh.read()
+            members[member] = zlib.decompress(compressed, wbits=31)
+        base = self.member_starts[member]
+        return memoryview(members[member])[start - base:end - base]
+
+    def _index(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError('block index out of range')
+        return idx
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            members = {}
+            with open(self.file_path, 'rb') as fh:
+                return [str(self._read(fh, i, members), 'utf-8') for i in range(*idx.indices(len(self)))]
+
+        idx = self._index(idx)
+        with open(self.file_path, 'rb') as fh:
+            return str(self._read(fh, idx, {}), 'utf-8')
+
+    def buffer(self, idx):
+        """Return block *idx* undecoded, as bytes-like object."""
+        idx = self._index(idx)
+        with open(self.file_path, 'rb') as fh:
+            return self._read(fh, idx, {})
+
+def _scan_blocks(buf):
+    """Find the blocks of *buf* like read_and_preprocess_protocol() does.
+
+    Returns (starts, ends, dropped_lines_count) or None if the file can't
+    be described by byte offsets, i.e. if it has CR line endings (which the
+    text mode read translates) or a dropped lines message that is not a
+    block on its own.
+    """
+    if buf.find(b'\r') != -1:
+        return None
+
+    starts, ends = [], []
+    pos = 0
+    while True:
+        end = buf.find(b'\n\n', pos)
+        starts.append(pos)
+        ends.append(len(buf) if end == -1 else end)
+        if end == -1:
+            break
+        pos = end + 2
+
+    # Dropped lines messages are removed together with the separator in
+    # front of them, which only maps to skipping blocks if they are
+    # blocks on their own.
+    dropped_lines_count = None
+    dropped_blocks = set()
+    block_of_start = {start: i for i, start in enumerate(starts)}
+    for match in _DROPPED_LINES_RE.finditer(buf):
+        block = block_of_start.get(match.start() + 2)
+        if block is None or ends[block] != match.end():
+            return None
+        if dropped_lines_count is None:
+            dropped_lines_count = int(match.group(1))
+        dropped_blocks.add(block)
+
+    if dropped_blocks:
+        starts = [start for i, start in enumerate(starts) if i not in dropped_blocks]
+        ends = [end for i, end in enumerate(ends) if i not in dropped_blocks]
+
+    return starts, ends, dropped_lines_count
+
+def _map_file(fh):
+    """Memory-map an open file for reading (empty files, which can't be mapped, give b'')."""
+    try:
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        return contextlib.nullcontext(b'')
+
+def _index_blocks(file_path, buf):
+    """Return (meta, arrays) of the block index of the uncompressed file *file_path*, mapped as *buf*."""
+    scanned = _scan_blocks(buf)
+    if scanned is not None:
+        starts, ends, dropped_lines_count = scanned
+        # Reports start with a short first block (< 100 characters)
+        first = buf[starts[0]:ends[0]] if ends[0] - starts[0] < 400 else b''
+        data = [first.decode('utf-8', errors='replace')]
+    else:
+        data, dropped_lines_count = read_and_preprocess_protocol(file_path)
+        starts, ends = [], []
+
+    meta = {
+        'file_type': 'report' if _is_report(data) else 'protocol',
+        'dropped_lines_count': dropped_lines_count,
+        'seekable': scanned is not None,
+    }
+    arrays = {
+        'starts': np.array(starts, dtype=np.int64),
+        'ends': np.array(ends, dtype=np.int64),
+        'member_starts': np.zeros(0, dtype=np.int64),
+        'member_offsets': np.zeros(0, dtype=np.int64),
+    }
+    return meta, arrays
+
+def build_block_index(uuid, file_path):
+    """Index the blocks of an uploaded file and store the index next to it.
+
+    Returns the stored meta dict: the file type ('report' or 'protocol'),
+    the number of dropped lines and whether the blocks can be read by byte
+    offset (``seekable``), plus the ``starts`` and ``ends`` arrays and, for
+    compressed files, the ``member_starts`` and ``member_offsets`` arrays.
+    """
+    if file_path.endswith('.gz'):
+        # The member offsets are only known while compressing, so compress
+        # the file again, which indexes it as well.
+        raw_path = f'{file_path}.{os.getpid()}.raw'
+        try:
+            with gzip.open(file_path, 'rb') as src, open(raw_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            return _compress_protocol(raw_path, file_path, _artifact_path(uuid, 'blocks'))
+        finally:
+            os.remove(raw_path)
+
+    with open(file_path, 'rb') as fh, _map_file(fh) as buf:
+        meta, arrays = _index_blocks(file_path, buf)
+    _store_artifact(_artifact_path(uuid, 'blocks'), BLOCK_INDEX_VERSION, meta, arrays)
+    return dict(meta, **arrays)
+
+def open_protocol_blocks(uuid, file_path):
+    """Return (blocks, dropped_lines_count, is_report) of an uploaded file.
+
+    Uses the block index (building it first for files uploaded before it
+    existed), so that only the blocks that are accessed are read. Files the
+    index can't describe are read completely by read_and_preprocess_protocol().
+    """
+    artifact = _load_artifact(_artifact_path(uuid, 'blocks'), BLOCK_INDEX_VERSION)
+    if artifact is None:
+        index = build_block_index(uuid, file_path)
+    else:
+        meta, arrays = artifact
+        index = dict(meta, **arrays)
+
+    is_report = index['file_type'] == 'report'
+    if not index['seekable']:
+        data, dropped_lines_count = read_and_preprocess_protocol(file_path)
+        return data, dropped_lines_count, is_report
+
+    members = {}
+    if len(index['member_starts']) > 0:
+        members = {'member_starts': index['member_starts'].tolist(),
+                   'member_offsets': index['member_offsets'].tolist()}
+    blocks = ProtocolBlocks(file_path, index['starts'].tolist(), index['ends'].tolist(), **members)
+    return blocks, index['dropped_lines_count'], is_report
+
+# Bump whenever split_report() or the report cache layout changes.
+REPORT_CACHE_VERSION = 2
+
+def build_report_cache(uuid, data):
+    """Split a debug report into its sections and persist them for the section endpoints.
+
+    The charge_manager trace is parsed right away, so that the report page
+    knows whether there is a chart to show. Returns the report cache dict
+    with all sections, see load_report_cache().
+    """
+    report_trace, trace_modules, dump_blocks = split_report(data)
+    cm_trace = trace_modules.get('charge_manager')
+    cm_parsed = parse_report_cm(cm_trace) if cm_trace is not None else None
+    if cm_parsed is not None:
+        build_cm_cache(uuid, cm_parsed)
+    meta = {'has_trace': bool(report_trace), 'modules': list(trace_modules), 'dump_blocks': dump_blocks,
+            'has_cm': cm_parsed is not None}
+    sections = {'trace': report_trace}
+    sections.update((f'module:{name}', content) for name, content in trace_modules.items())
+    arrays = {name: np.frombuffer(text.encode('utf-8'), dtype=np.uint8) for name, text in sections.items()}
+    _store_artifact(_artifact_path(uuid, 'report'), REPORT_CACHE_VERSION, meta, arrays)
+    return dict(meta, sections=sections)
+
+def load_report_cache(uuid, sections=None):
+    """Load the section cache of a debug report.
+
+    Returns a dict with ``has_trace``, ``modules`` (trace module names),
+    ``dump_blocks`` (indices of the coredump blocks), ``has_cm`` (whether
+    the charge_manager trace has chart data) and ``sections``
+    (``trace`` and ``module:NAME`` -> text, only *sections* if given), or
+    None if there is no valid cache.
+    """
+    only = None if sections is None else set(sections)
+    artifact = _load_artifact(_artifact_path(uuid, 'report'), REPORT_CACHE_VERSION, only)
+    if artifact is None:
+        return None
+
+    meta, arrays = artifact
+    return {
+        'has_trace': meta['has_trace'],
+        'modules': meta['modules'],
+        'dump_blocks': meta['dump_blocks'],
+        'has_cm': meta['has_cm'],
+        'sections': {name: values.tobytes().decode('utf-8') for name, values in arrays.items()},
+    }
+
+# Bump whenever parse_charge_manager_trace() or the cm cache layout changes.
+CM_CACHE_VERSION = 3
+
+def build_cm_cache(uuid, cm_parsed):
+    """Persist the dense table columns of a parsed charge_manager trace."""
+    meta = {key: value for key, value in cm_parsed.items() if key != 'table_data'}
+    meta['table_columns'] = list(cm_parsed['table_data'])
+    arrays = {f'col:{key}': np.asarray(values) for key, values in cm_parsed['table_data'].items()}
+    _store_artifact(_artifact_path(uuid, 'cm'), CM_CACHE_VERSION, meta, arrays)
+
+def load_cm_cache(uuid, columns=None):
+    """Load the charge_manager trace cache of a debug report.
+
+    Returns the dict of parse_charge_manager_trace() with ``table_data``
+    values as ndarrays (only *columns* if given), or None if there is no
+    valid cache.
+    """
+    only = None if columns is None else {f'col:{key}' for key in columns}
+    artifact = _load_artifact(_artifact_path(uuid, 'cm'), CM_CACHE_VERSION, only)
+    if artifact is None:
+        return None
+
+    meta, arrays = artifact
+    meta = {key: value for key, value in meta.items() if key not in ('version', 'arrays')}
+    return dict(meta, table_data={name[4:]: values for name, values in arrays.items()})
+
+# Logs are stored in chunks of whole lines of about LOG_CHUNK_SIZE bytes, so
+# that a range of lines is read without decompressing the whole log.
+LOG_CHUNK_SIZE = 256 * 1024
+LOG_LINES_DEFAULT = 200
+LOG_LINES_MAX = 5000
+
+# Chunks a LogIndex keeps in memory
+LOG_CACHED_CHUNKS = 16
+
+# Bump whenever the log index layout changes.
+LOG_INDEX_VERSION = 1
+
+def _log_sections(uuid, file_path):
+    """Return {section: bytes} of the logs of an uploaded file."""
+    data, _, is_report = open_protocol_blocks(uuid, file_path)
+    if not is_report:
+        return {'before_log': bytes(_get_block_buffer(data, 1)), 'after_log': bytes(_get_block_buffer(data, 4))}
+
+    sections = {'log': bytes(_get_block_buffer(data, 2))}
+    report = load_report_cache(uuid)
+    if report is None:
+        report = build_report_cache(uuid, data)
+    sections.update((name, text.encode('utf-8')) for name, text in report['sections'].items())
+    return sections
+
+def build_log_index(uuid, file_path):
+    """Split the logs of an uploaded file into chunks of whole lines and store them.
+
+    Protocols have the sections ``before_log`` and ``after_log``, debug
+    reports ``log``, ``trace`` and ``module:NAME`` (see split_report()).
+    Returns (meta, arrays): meta['sections'] maps each section to its
+    ``line_count`` and the ``first_lines`` of its chunks, which are the
+    arrays ``SECTION:INDEX``.
+    """
+    sections = {}
+    arrays = {}
+    for section, text in _log_sections(uuid, file_path).items():
+        first_lines = []
+        line = 0
+        pos = 0
+        while True:
+            end = text.find(b'\n', pos + LOG_CHUNK_SIZE)
+            chunk = text[pos:] if end == -1 else text[pos:end + 1]
+            arrays[f'{section}:{len(first_lines)}'] = np.frombuffer(chunk, dtype=np.uint8)
+            first_lines.append(line)
+            if end == -1:
+                break
+            line += chunk.count(b'\n')
+            pos = end + 1
+        sections[section] = {'line_count': line + chunk.count(b'\n') + 1, 'first_lines': first_lines}
+
+    meta = {'sections': sections}
+    _store_artifact(_artifact_path(uuid, 'log'), LOG_INDEX_VERSION, meta, arrays)
+    return meta, arrays
+
+class LogIndex:
+    """The chunked logs of an uploaded file, see build_log_index().
+
+    The index is built first if necessary. Chunks are read from disk on
+    access, the last LOG_CACHED_CHUNKS of them are kept.
+    """
+    def __init__(self, uuid, file_path):
+        self.path = _artifact_path(uuid, 'log')
+        artifact = _load_artifact(self.path, LOG_INDEX_VERSION, only=())
+        # A freshly built index is kept in memory, it might not have been stored
+        self._built = None
+        if artifact is None:
+            artifact = build_log_index(uuid, file_path)
+            self._built = artifact[1]
+        self.sections = artifact[0]['sections']
+        self._cache = {}
+
+    def section(self, section):
+        """Return the ``line_count`` and ``first_lines`` of *section*, abort with 404 if there is none."""
+        info = self.sections.get(section)
+        if info is None:
+            abort(404)
+        return info
+
+    def chunks(self, section, indices):
+        """Return the chunks *indices* of *section* as bytes."""
+        names = [f'{section}:{i}' for i in indices]
+        arrays = self._built
+        if arrays is None:
+            missing = set(names) - self._cache.keys()
+            if missing:
+                if len(self._cache) + len(missing) > LOG_CACHED_CHUNKS:
+                    self._cache.clear()
+                    missing = set(names)
+                artifact = _load_artifact(self.path, LOG_INDEX_VERSION, only=missing)
+                if artifact is None:
+                    abort(404)
+                self._cache.update(artifact[1])
+            arrays = self._cache
+        return [arrays[name].tobytes() for name in names]
+
+    def lines(self, section, start, count):
+        """Return (line_count, lines) with up to *count* lines of *section* from line *start* on."""
+        info = self.section(section)
+        line_count = info['line_count']
+        start = min(start, line_count)
+        end = min(start + count, line_count)
+        if start == end:
+            return line_count, []
+
+        first_lines = info['first_lines']
+        first_chunk = bisect.bisect_right(first_lines, start) - 1
+        last_chunk = bisect.bisect_right(first_lines, end - 1) - 1
+        text = b''.join(self.chunks(section, range(first_chunk, last_chunk + 1)))
+        offset = start - first_lines[first_chunk]
+        lines = text.split(b'\n')[offset:offset + end - start]
+        return line_count, [line.decode('utf-8', errors='replace') for line in lines]
+
+    def select(self, section, numbers):
+        """Return the lines with the ascending line *numbers* of *section* as bytes."""
+        first_lines = self.section(section)['first_lines']
+        by_chunk = {}
+        for number in numbers:
+            by_chunk.setdefault(bisect.bisect_right(first_lines, number) - 1, []).append(number)
+
+        result = []
+        indices = list(by_chunk)
+        for first in range(0, len(indices), LOG_CACHED_CHUNKS):
+            batch = indices[first:first + LOG_CACHED_CHUNKS]
+            for i, chunk in zip(batch, self.chunks(section, batch)):
+                lines = chunk.split(b'\n')
+                result.extend(lines[number - first_lines[i]] for number in by_chunk[i])
+        return result
+
+def read_log_lines(uuid, file_path, section, start, count):
+    """Return (line_count, lines) with up to *count* lines of a log section from line *start* on.
+
+    Only the chunks that hold the lines are read. Aborts with 404 if there
+    is no such section.
+    """
+    return LogIndex(uuid, file_path).lines(section, start, count)
+
+# ---------------------------------------------------------------------------
+# Log search
+# ---------------------------------------------------------------------------
+# Each chunk of a log is summarized by a bitmap of its case folded trigrams,
+# hashed to SEARCH_FILTER_BITS bits. A search only reads the chunks whose
+# bitmaps contain all trigrams of the text every match has to contain.
+SEARCH_FILTER_BITS = 17
+SEARCH_RESULTS_DEFAULT = 50
+SEARCH_RESULTS_MAX = 500
+SEARCH_CONTEXT_MAX = 10
+SEARCH_QUERY_MAX = 500
+# Seconds a regex search may take, see run_with_deadline().
+SEARCH_REGEX_TIMEOUT = 10
+# Matches are counted up to this number, so that searching a common word
+# doesn't read the whole log.
+SEARCH_MAX_MATCHES = 10000
+
+# Bump whenever the search index layout or LOG_INDEX_VERSION changes.
+SEARCH_INDEX_VERSION = 1
+
+def _trigram_hashes(text):
+    """Return the bitmap positions of the case folded trigrams of the bytes *text*."""
+    a = np.frombuffer(text.lower(), dtype=np.uint8).astype(np.uint32)
+    if len(a) < 3:
+        return np.zeros(0, dtype=np.uint32)
+    codes = (a[:-2] << 16) | (a[1:-1] << 8) | a[2:]
+    return (codes * np.uint32(0x9E3779B1)) >> np.uint32(32 - SEARCH_FILTER_BITS)
+
+def build_search_index(uuid, log):
+    """Build and store the trigram bitmaps of all chunks of the LogIndex *log*.
+
+    Returns {section: array}, one packed bitmap row per chunk.
+    """
+    filters = {}
+    bitmap = np.zeros(1 << SEARCH_FILTER_BITS, dtype=bool)
+    for section, info in log.sections.items():
+        chunk_count = len(info['first_lines'])
+        packed = np.zeros((chunk_count, (1 << SEARCH_FILTER_BITS) // 8), dtype=np.uint8)
+        for first in range(0, chunk_count, LOG_CACHED_CHUNKS):
+            indices = range(first, min(first + LOG_CACHED_CHUNKS, chunk_count))
+            for i, chunk in zip(indices, log.chunks(section, indices)):
+                bitmap[:] = False
+                bitmap[_trigram_hashes(chunk)] = True
+                packed[i] = np.packbits(bitmap)
+        filters[section] = packed
+    _store_artifact(_artifact_path(uuid, 'search'), SEARCH_INDEX_VERSION, {}, filters)
+    return filters
+
+def load_search_index(uuid, log, sections):
+    """Return {section: array} with the trigram bitmaps of *sections*, building them first if necessary."""
+    artifact = _load_artifact(_artifact_path(uuid, 'search'), SEARCH_INDEX_VERSION, only=set(sections))
+    filters = artifact[1] if artifact is not None else {}
+    if any(section not in filters or len(filters[section]) != len(log.sections[section]['first_lines'])
+           for section in sections):
+        filters = build_search_index(uuid, log)
+    return {section: filters[section] for section in sections}
+
+def _literal_chunks(packed, literal):
+    """Return a mask of the chunks whose trigram bitmaps contain all trigrams of *literal*."""
+    # Only ASCII is case folded like re.IGNORECASE does, skip the rest
+    hashes = [_trigram_hashes(part.encode('ascii')) for part in re.split(r'[^\x00-\x7f]+', literal)]
+    hashes = np.concatenate(hashes)
+    bits = (packed[:, hashes >> 3] >> (7 - (hashes & 7)).astype(np.uint8)) & 1
+    return bits.all(axis=1)
+
+def run_with_deadline(func, args, timeout):
+    """Return func(*args) computed in a forked process, or None if that takes longer than *timeout* seconds.
+
+    The result is pickled back to this process. A regex match can't be
+    interrupted in the thread running it, so the process is killed instead.
+    """
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_send_result, args=(sender, func, args), daemon=True)
+    process.start()
+    sender.close()
+    try:
+        return receiver.recv() if receiver.poll(timeout) else None
+    finally:
+        receiver.close()
+        process.kill()
+        process.join()
+
+def _send_result(sender, func, args):
+    sender.send(func(*args))
+
+def _regex_chunks(packed, items):
+    """Return a mask of the chunks that can contain a match of the parsed regex *items*."""
+    # The items follow each other, so every run of literals, group and
+    # mandatory repeat has to be matched and one of the branches.
+    mask = np.ones(len(packed), dtype=bool)
+    literal = ''
+    for op, value in list(items) + [(None, None)]:
+        if op is _regex_parser.LITERAL:
+            literal += chr(value)
+            continue
+        mask &= _literal_chunks(packed, literal)
+        literal = ''
+        if op is _regex_parser.BRANCH:
+            mask &= np.logical_or.reduce([_regex_chunks(packed, branch) for branch in value[1]])
+        elif op is _regex_parser.SUBPATTERN:
+            mask &= _regex_chunks(packed, value[-1])
+        elif op in (_regex_parser.MAX_REPEAT, _regex_parser.MIN_REPEAT) and value[0] > 0:
+            mask &= _regex_chunks(packed, value[2])
+    return mask
+
+def search_chunks(packed, query, regex):
+    """Return the indices of the chunks with the trigram bitmaps *packed* that can contain a match of *query*."""
+    if regex:
+        try:
+            mask = _regex_chunks(packed, _regex_parser.parse(query))
+        except Exception as e:
+            # The parse tree of re is private and may change between versions
+            print(f"Warning: Failed to prune search chunks for regex {query!r}: {e}")
+            mask = np.ones(len(packed), dtype=bool)
+    else:
+        mask = _literal_chunks(packed, query)
+    return np.flatnonzero(mask).tolist()
+
+def search_logs(log, candidates, pattern):
+    """Yield (section, line) of every line that *pattern* matches.
+
+    *candidates* maps the sections to search to the indices of the chunks
+    that can contain matches, see search_chunks().
+    """
+    for section, indices in candidates.items():
+        first_lines = log.section(section)['first_lines']
+        for first in range(0, len(indices), LOG_CACHED_CHUNKS):
+            batch = indices[first:first + LOG_CACHED_CHUNKS]
+            for i, chunk in zip(batch, log.chunks(section, batch)):
+                text = chunk.decode('utf-8', errors='replace')
+                # The line after the final newline starts the next chunk
+                endpos = len(text) - 1 if i + 1 < len(first_lines) else len(text)
+                line = first_lines[i]
+                line_start = 0
+                pos = 0
+                while pos <= endpos:
+                    match = pattern.search(text, pos, endpos)
+                    if match is None:
+                        break
+                    start = text.rfind('\n', 0, match.start()) + 1
+                    line += text.count('\n', line_start, start)
+                    line_start = start
+                    yield section, line
+                    pos = text.find('\n', match.start(), endpos) + 1
+                    if pos == 0:
+                        break
+
+# ---------------------------------------------------------------------------
+# Event index
+# ---------------------------------------------------------------------------
+# Event log lines start with the local time, or with the uptime in seconds
+# as long as the time is unknown, followed by the module if the firmware
+# logs it: "2024-05-10 14:23:45,123  evse | message". The uptime is right
+# aligned, so it is only taken as such if followed by two spaces.
+_EVENT_LINE_RE = re.compile(rb'^(?:(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) +| *(\d{1,10}),(\d{3})  +)'
+                            rb'(?:([\w.-]+) *\| )?', re.MULTILINE)
+EVENT_SECTIONS = ('before_log', 'after_log', 'log')
+EVENT_CLOCK_LOCAL = 0
+EVENT_CLOCK_UPTIME = 1
+EVENTS_DEFAULT = 200
+EVENTS_MAX = 1000
+
+# Bump whenever the event index layout, _EVENT_LINE_RE or LOG_INDEX_VERSION
+# changes.
+EVENT_INDEX_VERSION = 1
+
+def _local_seconds(texts):
+    """Return the 'YYYY-MM-DD HH:MM:SS' *texts* as datetime64[s], NaT for impossible dates."""
+    try:
+        return np.array(texts, dtype='datetime64[s]')
+    except ValueError:
+        seconds = np.full(len(texts), np.datetime64('NaT'), dtype='datetime64[s]')
+        for i, text in enumerate(texts):
+            with contextlib.suppress(ValueError):
+                seconds[i] = np.datetime64(text.decode('ascii'), 's')
+        return seconds
+
+def _parse_event_chunk(chunk, first_line):
+    """Return the event records (see build_event_index()) of the lines of a log chunk."""
+    matches = list(_EVENT_LINE_RE.finditer(chunk))
+    spans = np.array([match.span() for match in matches], dtype=np.int64).reshape(-1, 2)
+    groups = [match.groups() for match in matches]
+    local = np.array([group[0] is not None for group in groups], dtype=bool)
+    newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == ord('\n'))
+
+    seconds = np.zeros(len(groups), dtype=np.int64)
+    seconds[local] = _local_seconds([group[0] for group in groups if group[0] is not None]).astype(np.int64)
+    seconds[~local] = np.array([group[2] for group in groups if group[0] is None], dtype='S').astype(np.int64)
+    millis = np.array([group[1] or group[3] for group in groups], dtype='S').astype(np.int64)
+    valid = seconds != np.iinfo(np.int64).min  # NaT
+
+    return {
+        'line': (first_line + np.searchsorted(newlines, spans[:, 0]))[valid],
+        'module': [group[4] for group, keep in zip(groups, valid) if keep],
+        'message': (spans[:, 1] - spans[:, 0])[valid],
+        'time': (seconds * 1000 + millis)[valid],
+        'clock': np.where(local, EVENT_CLOCK_LOCAL, EVENT_CLOCK_UPTIME)[valid],
+    }
+
+def _event_x(time, clock, local_offset):
+    """Return the x-axis positions of events, see build_event_index()."""
+    return time + np.where(clock == EVENT_CLOCK_LOCAL, local_offset, 0)
+
+def build_event_index(uuid, file_path, log):
+    """Parse the event logs of an uploaded file into records and store them with a time index.
+
+    Every line of the EVENT_SECTIONS of the LogIndex *log* that starts with
+    a time is a record with the arrays ``section`` (index into
+    meta['sections']), ``line``, ``module`` (index into meta['modules'],
+    -1 for none), ``message`` (byte offset of the message in the line),
+    ``time`` and ``clock`` (EVENT_CLOCK_LOCAL: local time in ms since 1970,
+    EVENT_CLOCK_UPTIME: ms since boot). ``order`` is the time index: the
+    records that have a position on the x-axis (see api_events()) sorted by
+    it. meta['local_offset'] maps the local time to the x-axis. Returns
+    (meta, arrays).
+    """
+    sections = [section for section in EVENT_SECTIONS if section in log.sections]
+    parts = []
+    for section_index, section in enumerate(sections):
+        first_lines = log.sections[section]['first_lines']
+        for first in range(0, len(first_lines), LOG_CACHED_CHUNKS):
+            batch = range(first, min(first + LOG_CACHED_CHUNKS, len(first_lines)))
+            for i, chunk in zip(batch, log.chunks(section, batch)):
+                part = _parse_event_chunk(chunk, first_lines[i])
+                part['section'] = np.full(len(part['line']), section_index, dtype=np.uint8)
+                parts.append(part)
+
+    module_names = [module for part in parts for module in part['module']]
+    modules = sorted({module.decode('ascii') for module in module_names if module is not None})
+    module_index = {module.encode('ascii'): i for i, module in enumerate(modules)}
+    arrays = {name: np.concatenate([part[name] for part in parts] or [np.zeros(0, dtype=np.int64)])
+              for name in ('section', 'line', 'message', 'time', 'clock')}
+    arrays['module'] = np.array([module_index.get(module, -1) for module in module_names], dtype=np.int16)
+
+    # Protocols are placed on the millis of the chart. The local time maps to
+    # them through the time of the first CSV row. Debug reports have no
+    # millis, their records are placed on the local time.
+    local_offset = 0
+    clocks = [EVENT_CLOCK_LOCAL]
+    if 'before_log' in log.sections:
+        anchor = _load_protocol_or_404(uuid, file_path, columns=[], axis=False)['real_time_anchor']
+        clocks = [EVENT_CLOCK_UPTIME]
+        if anchor is not None:
+            local_offset = anchor[0] - anchor[1]
+            clocks.append(EVENT_CLOCK_LOCAL)
+    order = np.flatnonzero(np.isin(arrays['clock'], clocks))
+    x = _event_x(arrays['time'][order], arrays['clock'][order], local_offset)
+    arrays['order'] = order[np.argsort(x, kind='stable')]
+    for name in ('line', 'message', 'clock', 'order'):
+        arrays[name] = _compact_int_array(arrays[name])
+
+    meta = {'sections': sections, 'modules': modules, 'local_offset': local_offset}
+    _store_artifact(_artifact_path(uuid, 'events'), EVENT_INDEX_VERSION, meta, arrays)
+    return meta, arrays
+
+# Default and upper limit of the number of points per column that are sent
+# to the chart, independent of the length of the protocol.
+DOWNSAMPLE_POINTS = 2000
+DOWNSAMPLE_POINTS_MAX = 20000
+
+def _monotonic_millis(millis):
+    """Return the millis column as sorted int64 values for the chart x-axis.
+
+    millis is a uint32 on the EVSE and wraps around after ~49.7 days of uptime,
+    this is undone here. Any other backward step is flattened, so that the
+    result can be binary-searched for zoom windows.
+    """
+    millis = np.asarray(millis, dtype=np.int64)
+    if len(millis) > 1:
+        wraps = np.concatenate(([0], np.cumsum(np.diff(millis) < -(1 << 31))))
+        millis = np.maximum.accumulate(millis + (wraps << 32))
+    return millis
+
+def _real_time_anchor(timestamp_info):
+    """Return [millis, local time in ms since 1970] of the first CSV row, None without real timestamps."""
+    if timestamp_info is None:
+        return None
+    real_ms = (timestamp_info['real_timestamp'] - datetime.datetime(1970, 1, 1)) // datetime.timedelta(milliseconds=1)
+    return [int(timestamp_info['first_millis']), real_ms]
+
+# Columns whose changes are indexed as state transitions of a protocol
+TRANSITION_COLUMNS = ('iec61851_state', 'contactor_state', 'contactor_error', 'allowed_charging_current',
+                      'phase_0_active', 'phase_1_active', 'phase_2_active',
+                      'phase_0_connected', 'phase_1_connected', 'phase_2_connected')
+# Rows before and after a transition in the window the chart zooms to
+TRANSITION_CONTEXT_ROWS = 50
+
+def build_protocol_cache(uuid, data, dropped_lines_count=None):
+    """Parse protocol blocks once and persist the result as parse cache.
+
+    Only numeric columns are kept, as everything else is skipped by the chart
+    anyway. The rows at which the TRANSITION_COLUMNS change are stored as
+    well. Returns the same dict as load_protocol_cache().
+    """
+    parsed = parse_protocol_data(data)
+
+    columns = {}
+    x = np.zeros(0, dtype=np.int64)
+    if parsed['columns'] is not None:
+        for col_name in parsed['available_columns']:
+            col = parsed['columns'][col_name]
+            if col.dtype.kind not in 'biuf':
+                continue  # skip non-numeric columns
+            columns[col_name] = col
+
+        try:
+            x = _monotonic_millis(parsed['columns']['millis'])
+        except (ValueError, TypeError):
+            # Broken millis column, fall back to row indices
+            x = np.arange(len(parsed['columns']['millis']), dtype=np.int64)
+
+    transitions = {name: _compact_int_array(_change_points(columns[name]))
+                   for name in TRANSITION_COLUMNS if name in columns}
+
+    meta = {
+        'before_protocol_json': parsed['before_protocol_json'],
+        'after_protocol_json': parsed['after_protocol_json'],
+        'dropped_lines_count': dropped_lines_count,
+        'available_columns': parsed['available_columns'],
+        'has_real_timestamps': parsed['has_real_timestamps'],
+        'real_time_anchor': _real_time_anchor(parsed['timestamp_info']),
+        'transition_counts': {name: len(rows) for name, rows in transitions.items()},
+    }
+    arrays = {
+        'x': x,
+        'labels': np.array(parsed['millis'], dtype=str),
+    }
+    arrays.update({f'col:{name}': values for name, values in columns.items()})
+    arrays.update({f'transitions:{name}': rows for name, rows in transitions.items()})
+    _store_artifact(_artifact_path(uuid, 'parsed'), PROTOCOL_CACHE_VERSION, meta, arrays)
+
+    return dict(meta, x=arrays['x'], labels=arrays['labels'], columns=columns, transitions=transitions)
+
+def load_protocol_cache(uuid, columns=None, axis=True, transitions=()):
+    """Load the parse cache of a protocol.
+
+    Returns a dict with the metadata and JSON/log blocks of the protocol,
+    ``x`` (ndarray of monotonic millis), ``labels`` (ndarray of x-axis
+    labels), ``columns`` (column name -> ndarray, numeric columns only) and
+    ``transitions`` (column name -> ndarray of the rows at which it changes),
+    or None if there is no valid cache. If *columns* is given, only these
+    columns and the transitions of the columns in *transitions* are loaded.
+    ``x`` and ``labels`` are left out if *axis* is False.
+    """
+    only = None
+    if columns is not None:
+        only = {f'col:{name}' for name in columns}
+        only.update(f'transitions:{name}' for name in transitions)
+        if axis:
+            only.update(('x', 'labels'))
+    artifact = _load_artifact(_artifact_path(uuid, 'parsed'), PROTOCOL_CACHE_VERSION, only)
+    if artifact is None:
+        return None
+
+    meta, arrays = artifact
+    columns = {name[4:]: values for name, values in arrays.items() if name.startswith('col:')}
+    transitions = {name[12:]: rows for name, rows in arrays.items() if name.startswith('transitions:')}
+    return dict(meta, x=arrays.get('x'), labels=arrays.get('labels'), columns=columns, transitions=transitions)
+
+def select_protocol_cache(protocol, columns=None, axis=True, transitions=()):
+    """Leave out what load_protocol_cache() would not load of the parse cache dict *protocol*."""
+    if columns is None:
+        return protocol
+    return dict(protocol,
+                x=protocol['x'] if axis else None,
+                labels=protocol['labels'] if axis else None,
+                columns={name: values for name, values in protocol['columns'].items() if name in columns},
+                transitions={name: rows for name, rows in protocol['transitions'].items() if name in transitions})
+
+def _min_max_buckets(values, bucket, count):
+    """Reduce *values* to the minimum and maximum of each *bucket* consecutive values.
+
+    Returns 2 * *count* values: per bucket the minimum and the maximum, in the
+    order in which they occur, so that spikes stay visible. NaNs are ignored
+    unless a bucket contains nothing else.
+    """
+    padded = np.full(count * bucket, np.nan)
+    padded[:len(values)] = values
+    padded = padded.reshape(count, bucket)
+    nan = np.isnan(padded)
+
+    idx = np.arange(count)
+    arg_min = np.where(nan, np.inf, padded).argmin(axis=1)
+    arg_max = np.where(nan, -np.inf, padded).argmax(axis=1)
+    v_min = padded[idx, arg_min]
+    v_max = padded[idx, arg_max]
+    min_first = arg_min <= arg_max
+
+    result = np.empty(2 * count)
+    result[0::2] = np.where(min_first, v_min, v_max)
+    result[1::2] = np.where(min_first, v_max, v_min)
+    return result
+
+def downsample_protocol(protocol, names, start=None, end=None, points=DOWNSAMPLE_POINTS):
+    """Return the chart data of the columns *names* in the millis window [start, end].
+
+    If the window contains more than *points* rows, it is split into
+    points / 2 buckets of equal row count and every column is reduced to the
+    minimum and maximum of each bucket, placed at the first and last row of
+    the bucket. All columns share the same x values.
 
-    The client-side JS handles column selection, chart rendering, and URL hash
+    Returns {'x': ndarray, 'labels': ndarray, 'columns': {name: ndarray},
+    'downsampled': bool}.
+    """
+    x = protocol['x']
+    first = 0 if start is None else int(np.searchsorted(x, start, side='left'))
+    last = len(x) if end is None else int(np.searchsorted(x, end, side='right'))
+    last = max(first, last)
+    count = last - first
+
+    edit_funcs = _chart_edit_funcs()
+    columns = {}
+
+    if count <= points:
+        rows = np.arange(first, last)
+        for name in names:
+            if name in protocol['columns']:
+                columns[name] = _column_values(protocol['columns'][name][first:last], edit_funcs.get(name))
+    else:
+        bucket = -(-count // (points // 2))
+        bucket_count = -(-count // bucket)
+        bucket_starts = first + np.arange(bucket_count) * bucket
+        rows = np.empty(2 * bucket_count, dtype=np.int64)
+        rows[0::2] = bucket_starts
+        rows[1::2] = np.minimum(bucket_starts + bucket, last) - 1
+
+        for name in names:
+            if name not in protocol['columns']:
+                continue
+            col = protocol['columns'][name]
+            values = _min_max_buckets(col[first:last].astype(np.float64), bucket, bucket_count)
+            if col.dtype.kind in 'biu':
+                values = values.astype(col.dtype)  # minima/maxima of integers are exact
+            columns[name] = _column_values(values, edit_funcs.get(name))
+
+    return {
+        'x': x[rows],
+        'labels': protocol['labels'][rows],
+        'columns': columns,
+        'downsampled': count > points,
+    }
+
+def handle_protocol(uuid, protocol, lang, t):
+    """Unified protocol handler: sends metadata of all columns to a single template.
+
+    Only the data of columns that are visible by default is embedded in the
+    page, the client-side JS fetches other columns from ``/api/<uuid>/columns``
+    when they get selected. The JS also handles chart rendering and URL hash
     persistence. Old ``?configuration=`` and ``?selected=`` query params are
     forwarded to the template so the JS can convert them to hash state on load.
     """
-    parsed = parse_protocol_data(data)
     chart_config = get_chart_config(t)
+    columns = protocol['columns']
 
-    # Build column metadata and pre-compute all column data (with transforms)
+    # Carry forward old query params so the client JS can convert them to hash
+    legacy_config = request.args.get('configuration', '')
+    legacy_selected = request.args.get('selected', '')
+    legacy_columns = set((legacy_config or legacy_selected).split(','))
+
+    # Build column metadata and collect the columns embedded in the page
     predefined_columns = {cc['csv_title']: cc for cc in chart_config}
 
     column_metadata = []  # sent to template for checkbox rendering
-    all_column_data = {}  # column_name -> [values...], sent to template for chart
+    embedded_columns = []  # column names whose data is sent to template for chart
 
     # --- Predefined columns first (in chart_config order) ---
     for cc in chart_config:
         col_name = cc['csv_title']
-        if col_name not in parsed['available_columns']:
-            continue
-        if parsed['df'] is None:
+        if col_name not in columns:
             continue
 
         try:
-            col = parsed['df'][col_name]
-            edit_func = cc.get('edit_func')
-            if edit_func:
-                values = edit_func(col)
-            else:
-                values = list(col)
-
-            # Convert NaN/inf to None for JSON serialization
-            values = _sanitize_for_json(values)
+            hidden = cc.get('hidden', False)
+            if not hidden or col_name in legacy_columns:
+                embedded_columns.append(col_name)
 
             column_metadata.append({
                 'name': col_name,
                 'label': cc.get('label', col_name),
                 'predefined': True,
-                'hidden_by_default': cc.get('hidden', False),
+                'hidden_by_default': hidden,
                 'group': t['group_predefined'],
                 'group_order': 0,
             })
-            all_column_data[col_name] = values
         except Exception as e:
             print(f"Warning: Failed to process predefined column {col_name}: {e}")
 
     # --- Non-predefined columns ---
-    for col_name in parsed['available_columns']:
+    for col_name in protocol['available_columns']:
         if col_name in predefined_columns:
             continue
-        if parsed['df'] is None:
-            continue
+        if col_name not in columns:
+            continue  # skip non-numeric
 
         try:
-            col = parsed['df'][col_name]
-            if col.dtype in ['object', 'string']:
-                continue  # skip non-numeric
+            col = columns[col_name]
 
             # Skip all-NaN columns (section headings like GPIOs, VOLTAGES, etc.)
-            if col.isna().all():
+            if col.dtype.kind == 'f' and np.isnan(col).all():
                 continue
 
-            values = list(col)
-            values = _sanitize_for_json(values)
+            if col_name in legacy_columns:
+                embedded_columns.append(col_name)
 
             # Assign group based on column name patterns.
             # Check gpio_ and slot_ prefixes first (more specific), then
@@ -1176,7 +3733,6 @@ def handle_protocol(data, lang, t, dropped_lines_count=None):
                 'group': group,
                 'group_order': group_order,
             })
-            all_column_data[col_name] = values
         except Exception as e:
             print(f"Warning: Failed to process column {col_name}: {e}")
 
@@ -1188,25 +3744,40 @@ def handle_protocol(data, lang, t, dropped_lines_count=None):
             for i in indices[mid:]:
                 column_metadata[i]['group_order'] = order + 0.5
 
-    # Carry forward old query params so the client JS can convert them to hash
-    legacy_config = request.args.get('configuration', '')
-    legacy_selected = request.args.get('selected', '')
+    # Overview of the whole protocol, the client requests more detail when zooming
+    overview = downsample_protocol(protocol, embedded_columns)
+    x = protocol['x']
+
+    # Columns to navigate through the state transitions of
+    transition_columns = [{'name': name, 'label': predefined_columns[name]['label'], 'count': count}
+                          for name, count in protocol['transition_counts'].items() if count > 0]
 
     protocol_data = {
+        'uuid': uuid,
         'column_metadata': column_metadata,
-        'all_column_data': all_column_data,
-        'labels': parsed['millis'],
-        'before_protocol_json': parsed['before_protocol_json'],
-        'after_protocol_json': parsed['after_protocol_json'],
-        'before_protocol_log': parsed['before_protocol_log'],
-        'after_protocol_log': parsed['after_protocol_log'],
-        'dropped_lines_count': dropped_lines_count,
-        'api_constants': api_constants[lang],
+        'x': overview['x'].tolist(),
+        'labels': overview['labels'].tolist(),
+        'downsampled': overview['downsampled'],
+        'row_count': len(x),
+        'x_range': [int(x[0]), int(x[-1])] if len(x) > 0 else None,
+        'downsample_points': DOWNSAMPLE_POINTS,
+        'before_protocol_json': protocol['before_protocol_json'],
+        'after_protocol_json': protocol['after_protocol_json'],
+        'log_urls': {section: url_for('api_log_lines', uuid=uuid, section=section)
+                     for section in ('before_log', 'after_log')},
+        'search_url': url_for('api_search', uuid=uuid),
+        'events_url': url_for('api_events', uuid=uuid),
+        'transitions_url': url_for('api_transitions', uuid=uuid),
+        'transition_columns': transition_columns,
+        'dropped_lines_count': protocol['dropped_lines_count'],
+        **page_resource_urls(lang),
         'legacy_config': legacy_config,
         'legacy_selected': legacy_selected,
     }
 
-    return render_template('protocol.html', data=protocol_data, t=t, lang=lang)
+    # The column data is serialized separately, straight from the arrays
+    return render_template('protocol.html', data=protocol_data, column_data=columns_to_json(overview['columns']),
+                           t=t, lang=lang)
 
 logging.basicConfig(filename='debug.log', level=logging.DEBUG, format="[%(asctime)s %(levelname)-8s%(filename)s:%(lineno)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S')
 port = int(os.environ.get('PORT', DEFAULT_PORT))
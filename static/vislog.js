@@ -60,6 +60,36 @@ document.addEventListener('click', function(e) {
     header.setAttribute('aria-expanded', String(!expanded));
 });
 
+// ---------------------------------------------------------------------------
+// Translations and API constants – referenced by the page data through
+// fingerprinted URLs that the browser caches for good, so they are only
+// downloaded once per browser instead of being inlined into every page.
+// ---------------------------------------------------------------------------
+let T = {};
+const _jsonRequests = new Map();
+
+function _loadJsonOnce(url) {
+    if (!_jsonRequests.has(url)) {
+        _jsonRequests.set(url, fetch(url)
+            .then(response => response.ok ? response.json() : Promise.reject(response.status)));
+    }
+    return _jsonRequests.get(url);
+}
+
+// Resolve once T and data.api_constants are available. Without the API
+// constants the JSON views are simply shown without annotations.
+function loadPageResources(data) {
+    const translations = _loadJsonOnce(data.translations_url)
+        .catch(e => { console.error('Could not load translations:', e); return {}; });
+    const constants = data.api_constants_url
+        ? _loadJsonOnce(data.api_constants_url).catch(() => null)
+        : Promise.resolve(null);
+    return Promise.all([translations, constants]).then(([t, apiConstants]) => {
+        T = t;
+        data.api_constants = apiConstants;
+    });
+}
+
 // ---------------------------------------------------------------------------
 // Shared URL hash helpers – read/modify/write individual params without
 // clobbering unrelated ones (e.g. tab, cols, cm, log all coexist).
@@ -178,6 +208,266 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 
+// Call load() once, when the tab button with id *tabId* is shown the first
+// time. The tab might already be shown, e.g. restored from the URL hash.
+function _onFirstTabShown(tabId, load) {
+    const tabEl = document.getElementById(tabId);
+    if (!tabEl) return;
+    if (tabEl.classList.contains('active')) {
+        load();
+    } else {
+        tabEl.addEventListener('shown.bs.tab', load, { once: true });
+    }
+}
+
+function _fetchText(url) {
+    return fetch(url).then(response => response.ok ? response.text() : Promise.reject(response.status));
+}
+
+// ---------------------------------------------------------------------------
+// Log viewer – virtual scrolling over a log of which only the visible lines
+// are rendered. Lines are fetched in pages from /api/<uuid>/lines/<section>.
+// ---------------------------------------------------------------------------
+const LOG_PAGE_LINES = 500;
+// Pages kept per log, the least recently loaded ones are dropped first
+const LOG_MAX_PAGES = 100;
+// Browsers limit the height of elements. Logs that would be higher scroll
+// proportionally instead of pixel by pixel.
+const LOG_MAX_HEIGHT = 5000000;
+
+function initLogViewer(container, url) {
+    const spacer = document.createElement('div');
+    const pre = document.createElement('pre');
+    pre.className = 'log-viewer-lines';
+    container.append(spacer, pre);
+
+    const pages = new Map();  // page -> lines, null while loading
+    let lineCount = null;
+    let lineHeight = 0;
+    let padding = 0;
+    let height = 0;
+    let framePending = false;
+    let highlight = null;
+    let pendingLine = null;  // scrollToLine() before the log could be measured
+
+    function measure() {
+        pre.textContent = 'x';
+        const oneLine = pre.offsetHeight;
+        pre.textContent = 'x\nx';
+        lineHeight = pre.offsetHeight - oneLine;
+        padding = oneLine - lineHeight;
+        pre.textContent = '';
+    }
+
+    function loadPage(page) {
+        if (pages.has(page)) return;
+        pages.set(page, null);
+        fetch(`${url}?start=${page * LOG_PAGE_LINES}&count=${LOG_PAGE_LINES}`)
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(result => {
+                pages.delete(page);
+                pages.set(page, result.lines);
+                if (pages.size > LOG_MAX_PAGES) pages.delete(pages.keys().next().value);
+                if (lineCount === null) {
+                    lineCount = result.line_count;
+                    container.querySelectorAll(':scope > .text-body-secondary').forEach(el => el.remove());
+                }
+                schedule();
+            })
+            .catch(err => {
+                // Keep the page empty instead of retrying on every scroll
+                pages.set(page, []);
+                console.log(`Failed to load ${url}:`, err);
+            });
+    }
+
+    function render() {
+        framePending = false;
+        if (lineCount === null) return;
+        if (lineHeight === 0) {
+            if (container.offsetParent === null) return;  // hidden, can't measure yet
+            measure();
+            height = Math.min(lineCount * lineHeight + padding, LOG_MAX_HEIGHT);
+            spacer.style.height = height + 'px';
+            if (pendingLine !== null) {
+                scrollToLine(pendingLine);
+                return;
+            }
+        }
+
+        const scrollTop = container.scrollTop;
+        const visible = Math.ceil(container.clientHeight / lineHeight) + 1;
+        let first;
+        let top;
+        if (height < LOG_MAX_HEIGHT) {
+            first = Math.floor(scrollTop / lineHeight);
+            top = first * lineHeight;
+        } else {
+            const maxScroll = Math.max(height - container.clientHeight, 1);
+            first = Math.round(scrollTop / maxScroll * Math.max(lineCount - visible + 1, 0));
+            top = scrollTop;
+        }
+        first = Math.max(0, Math.min(first, lineCount - 1));
+        const last = Math.min(first + visible, lineCount);
+
+        const lines = [];
+        for (let page = Math.floor(first / LOG_PAGE_LINES); page * LOG_PAGE_LINES < last; page++) {
+            loadPage(page);
+            const pageLines = pages.get(page);
+            const pageStart = page * LOG_PAGE_LINES;
+            const end = Math.min(last, pageStart + LOG_PAGE_LINES);
+            for (let i = Math.max(first, pageStart); i < end; i++) {
+                lines.push(pageLines ? (pageLines[i - pageStart] ?? '') : '');
+            }
+        }
+        if (highlight !== null && highlight >= first && highlight < last) {
+            const mark = document.createElement('mark');
+            mark.textContent = lines[highlight - first];
+            pre.replaceChildren(lines.slice(0, highlight - first).map(line => line + '\n').join(''), mark,
+                                lines.slice(highlight - first + 1).map(line => '\n' + line).join(''));
+        } else {
+            pre.textContent = lines.join('\n');
+        }
+        // Don't let the lines grow the scroll height beyond the spacer
+        top = Math.max(0, Math.min(top, height - pre.offsetHeight));
+        pre.style.transform = `translateY(${top}px)`;
+    }
+
+    function schedule() {
+        if (framePending) return;
+        framePending = true;
+        requestAnimationFrame(render);
+    }
+
+    // Scroll *line* into the upper third of the viewer and highlight it
+    function scrollToLine(line) {
+        highlight = line;
+        if (lineHeight === 0) {
+            pendingLine = line;
+            schedule();
+            return;
+        }
+        pendingLine = null;
+        const offset = Math.floor(container.clientHeight / lineHeight / 3);
+        const visible = Math.ceil(container.clientHeight / lineHeight) + 1;
+        const maxScroll = height - container.clientHeight;
+        if (height < LOG_MAX_HEIGHT) {
+            container.scrollTop = (line - offset) * lineHeight;
+        } else {
+            container.scrollTop = Math.max(line - offset, 0) / Math.max(lineCount - visible + 1, 1) * maxScroll;
+        }
+        schedule();
+    }
+
+    container.addEventListener('scroll', schedule, { passive: true });
+    new ResizeObserver(schedule).observe(container);
+    loadPage(0);
+    return { scrollToLine };
+}
+
+// ---------------------------------------------------------------------------
+// Log search – the form rendered by the log_search macro searches *section*
+// via /api/<uuid>/search and jumps to the clicked match in the log viewer.
+// ---------------------------------------------------------------------------
+const LOG_SEARCH_RESULTS = 50;
+
+function initLogSearch(form, viewer, url, section) {
+    const results = document.getElementById(form.id + '-results');
+    let params = null;
+
+    function showPage(start) {
+        const query = new URLSearchParams(params);
+        query.set('start', start);
+        query.set('count', LOG_SEARCH_RESULTS);
+        fetch(`${url}?${query}`)
+            .then(response => response.json().then(result => response.ok ? result : Promise.reject(result.error)))
+            .then(result => {
+                if (start === 0) {
+                    results.innerHTML = '';
+                    const summary = document.createElement('div');
+                    summary.className = 'small text-body-secondary mb-1';
+                    const text = result.complete ? T.search_matches : T.search_matches_more;
+                    summary.textContent = text.replace('${count}', result.total);
+                    results.appendChild(summary);
+                    results.appendChild(document.createElement('div')).className = 'list-group log-search-list';
+                }
+                results.querySelector('.log-search-more')?.remove();
+                const list = results.querySelector('.log-search-list');
+                result.matches.forEach(match => {
+                    const item = document.createElement('button');
+                    item.type = 'button';
+                    item.className = 'list-group-item list-group-item-action log-search-match';
+                    const number = document.createElement('span');
+                    number.className = 'text-body-secondary me-2';
+                    number.textContent = match.line + 1;
+                    item.append(number, match.lines[match.line - match.first]);
+                    item.addEventListener('click', () => {
+                        list.querySelector('.active')?.classList.remove('active');
+                        item.classList.add('active');
+                        viewer.scrollToLine(match.line);
+                    });
+                    list.appendChild(item);
+                });
+                if (start + result.matches.length < result.total) {
+                    const more = document.createElement('button');
+                    more.type = 'button';
+                    more.className = 'btn btn-sm btn-link log-search-more';
+                    more.textContent = T.search_more;
+                    more.addEventListener('click', () => showPage(start + LOG_SEARCH_RESULTS));
+                    results.appendChild(more);
+                }
+            })
+            .catch(err => {
+                results.innerHTML = '';
+                const error = document.createElement('div');
+                error.className = 'small text-danger';
+                error.textContent = err;
+                results.appendChild(error);
+            });
+    }
+
+    form.addEventListener('submit', e => {
+        e.preventDefault();
+        params = {
+            q: form.elements.q.value,
+            section: section,
+            regex: form.elements.regex.checked ? '1' : '0',
+            case: form.elements.case.checked ? '1' : '0',
+        };
+        showPage(0);
+    });
+}
+
+// Tab ids and viewers of the logs by section, see _initLogTab()
+const _logTabs = {};
+
+// Show a log viewer with a search form in the tab with id *tabId* once it
+// is opened.
+function _initLogTab(tabId, viewerId, linesUrl, searchUrl, section) {
+    const logTab = { tabId: tabId, viewer: null };
+    _logTabs[section] = logTab;
+    _onFirstTabShown(tabId, () => {
+        logTab.viewer = initLogViewer(document.getElementById(viewerId), linesUrl);
+        const form = document.getElementById(viewerId + '-search');
+        if (form) initLogSearch(form, logTab.viewer, searchUrl, section);
+    });
+}
+
+// Open the tab of the log *section* and scroll its viewer to *line*
+function showLogLine(section, line) {
+    const logTab = _logTabs[section];
+    const tabEl = logTab && document.getElementById(logTab.tabId);
+    if (!tabEl) return;
+    if (tabEl.classList.contains('active')) {
+        logTab.viewer.scrollToLine(line);
+        return;
+    }
+    // Registered after _initLogTab()'s listener, so the viewer exists by then
+    tabEl.addEventListener('shown.bs.tab', () => logTab.viewer.scrollToLine(line), { once: true });
+    bootstrap.Tab.getOrCreateInstance(tabEl).show();
+}
+
+
 // ---------------------------------------------------------------------------
 // Shared chart infrastructure – colors, factory, helpers
 // ---------------------------------------------------------------------------
@@ -205,6 +495,9 @@ const CHART_COLORS = [
  * @param {number}        [cfg.xMaxTicksLimit]   - max x-axis tick count
  * @param {string}        [cfg.zoomXKey]         - URL hash key for x-axis zoom (enables zoom persistence)
  * @param {string}        [cfg.zoomYKey]         - URL hash key for y-axis zoom
+ * @param {boolean}       [cfg.xLinear]          - numeric x-axis, labels are x values instead of categories
+ * @param {Function}      [cfg.onViewChanged]    - called with the chart after zooming or panning
+ * @param {Object[]}      [cfg.plugins]          - inline Chart.js plugins of this chart
  * @returns {Chart}       the new Chart instance
  */
 function _createTimeSeriesChart(cfg) {
@@ -232,6 +525,16 @@ function _createTimeSeriesChart(cfg) {
     if (cfg.xTickCallback) xTicks.callback = cfg.xTickCallback;
     if (cfg.xMaxTicksLimit) xTicks.maxTicksLimit = cfg.xMaxTicksLimit;
 
+    const xScale = {
+        display: true,
+        ticks: xTicks,
+        grid: { color: gridColor }
+    };
+    if (cfg.xLinear) {
+        xScale.type = 'linear';
+        xScale.bounds = 'data';
+    }
+
     const tooltipCallbacks = {};
     if (cfg.tooltipTitleCallback) {
         tooltipCallbacks.title = cfg.tooltipTitleCallback;
@@ -240,6 +543,7 @@ function _createTimeSeriesChart(cfg) {
     const chart = new Chart(canvas, {
         type: 'line',
         data: { labels: cfg.labels, datasets: cfg.datasets },
+        plugins: cfg.plugins || [],
         options: {
             animation: false,
             maintainAspectRatio: false,
@@ -273,6 +577,7 @@ function _createTimeSeriesChart(cfg) {
                         mode: 'xy',
                         onZoomComplete: function({chart}) {
                             if (cfg.zoomXKey) _saveZoomToHash(chart, cfg.zoomXKey, cfg.zoomYKey);
+                            if (cfg.onViewChanged) cfg.onViewChanged(chart);
                         },
                     },
                     pan: {
@@ -282,16 +587,13 @@ function _createTimeSeriesChart(cfg) {
                         threshold: 5,
                         onPanComplete: function({chart}) {
                             if (cfg.zoomXKey) _saveZoomToHash(chart, cfg.zoomXKey, cfg.zoomYKey);
+                            if (cfg.onViewChanged) cfg.onViewChanged(chart);
                         },
                     }
                 }
             },
             scales: {
-                x: {
-                    display: true,
-                    ticks: xTicks,
-                    grid: { color: gridColor }
-                },
+                x: xScale,
                 y: yScale
             }
         }
@@ -322,6 +624,110 @@ function _chartDataset(label, data, colorIdx) {
     };
 }
 
+// Return the index of the first of the sorted *values* that is >= *target*
+function _lowerBound(values, target) {
+    let lo = 0, hi = values.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (values[mid] < target) lo = mid + 1;
+        else hi = mid;
+    }
+    return lo;
+}
+
+/**
+ * Return the index of the value in the sorted array *values* that is
+ * closest to *target* (binary search), or -1 if the array is empty.
+ */
+function _nearestIndex(values, target) {
+    if (values.length === 0) return -1;
+    let lo = Math.min(_lowerBound(values, target), values.length - 1);
+    // lo is the first entry >= target (or the last one); compare with lo-1
+    if (lo > 0 && Math.abs(values[lo - 1] - target) <= Math.abs(values[lo] - target)) {
+        lo = lo - 1;
+    }
+    return lo;
+}
+
+const _BINARY_ARRAY_TYPES = {
+    uint8: Uint8Array,
+    int8: Int8Array,
+    uint16: Uint16Array,
+    int16: Int16Array,
+    uint32: Uint32Array,
+    int32: Int32Array,
+    float32: Float32Array,
+    float64: Float64Array,
+};
+
+function _decodeBinaryArray(buffer, base, desc) {
+    const values = new _BINARY_ARRAY_TYPES[desc.dtype](buffer, base + desc.offset, desc.length);
+    if (desc.null_offset === undefined) return values;
+
+    // Nulls become NaN, which Chart.js shows as gaps like null in JSON
+    const mask = new Uint8Array(buffer, base + desc.null_offset, Math.ceil(desc.length / 8));
+    const result = Float64Array.from(values);
+    for (let i = 0; i < desc.length; i++) {
+        if (mask[i >> 3] & (1 << (i & 7))) result[i] = NaN;
+    }
+    return result;
+}
+
+// Expand run-length encoded step columns (run starts and their values) into
+// one value per point. Nulls become NaN.
+function _expandRuns(length, starts, values) {
+    const result = new Float64Array(length);
+    for (let run = 0; run < starts.length; run++) {
+        const value = values[run] === null ? NaN : values[run];
+        result.fill(value, starts[run], run + 1 < starts.length ? starts[run + 1] : length);
+    }
+    return result;
+}
+
+/**
+ * Expand the step columns ({length, starts, values} objects) of a column
+ * object as sent by columns_to_json() in main.py, in place.
+ */
+function _expandColumns(columns) {
+    for (const [name, values] of Object.entries(columns)) {
+        if (values && values.starts) {
+            columns[name] = _expandRuns(values.length, values.starts, values.values);
+        }
+    }
+    return columns;
+}
+
+/**
+ * Decode a response of the binary column format (see columns_to_binary() in
+ * main.py) into the same shape as the JSON responses: the header fields plus
+ * ``columns`` (and ``x`` if present) as typed arrays. The buffers are
+ * little-endian, like the typed arrays on all platforms browsers run on.
+ */
+function _decodeColumnBuffer(buffer) {
+    const headerLength = new DataView(buffer).getUint32(0, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+    const base = 4 + headerLength;
+
+    const result = Object.assign({}, header, { columns: {} });
+    if (header.x) result.x = _decodeBinaryArray(buffer, base, header.x);
+    header.columns.forEach(desc => {
+        result.columns[desc.name] = desc.runs
+            ? _expandRuns(desc.length,
+                          _decodeBinaryArray(buffer, base, desc.runs.starts),
+                          _decodeBinaryArray(buffer, base, desc.runs.values))
+            : _decodeBinaryArray(buffer, base, desc);
+    });
+    return result;
+}
+
+// Fetch column data from one of the column endpoints in binary form.
+function _fetchColumns(url) {
+    url += (url.includes('?') ? '&' : '?') + 'format=bin';
+    return fetch(url)
+        .then(response => response.ok ? response.arrayBuffer() : Promise.reject(response.status))
+        .then(_decodeColumnBuffer);
+}
+
 /**
  * Select/deselect all checkboxes in a container and re-render the chart.
  */
@@ -777,10 +1183,26 @@ function collapseAllJson(selector) {
 // ---------------------------------------------------------------------------
 let protoChart = null;
 let protoData = null;
+let protoPendingColumns = new Set();
+// Millis window [start, end] the loaded data belongs to, null = whole protocol
+let protoWindow = null;
+let protoWindowRequest = 0;
+// Events of the event logs in the visible window, drawn as markers
+const PROTO_EVENTS_MAX = 200;
+let protoEvents = [];
+let protoEventsWindow = null;
+// State transitions by column ('' = all), see protoJumpTransition()
+const protoTransitions = new Map();
+// The transition the chart was last zoomed to, with the zoom window it got
+let protoTransition = null;
 
 function initProtocolChart(data) {
     protoData = data;
     if (!protoData || !protoData.column_metadata) return;
+    _expandColumns(protoData.all_column_data);
+
+    // --- Backward compatibility: old zoom links stored row indices in zx ---
+    _protoConvertLegacyZoom();
 
     // --- Backward compatibility: convert old ?configuration= or ?selected= to hash ---
     const urlParams = new URLSearchParams(window.location.search);
@@ -821,7 +1243,7 @@ function initProtocolChart(data) {
         }
     }
 
-    // Initialize JSON viewers and log textareas
+    // Initialize JSON viewers, the logs are loaded when their tab is opened
     const protocolJson = data.before_protocol_json || data.after_protocol_json || {};
     const hwVersion = _detectHwVersion(protocolJson);
     const jsonviewOpts = data.api_constants
@@ -830,11 +1252,250 @@ function initProtocolChart(data) {
     make_jsonview(data.before_protocol_json, '#before-protocol-json', jsonviewOpts);
     make_jsonview(data.after_protocol_json, '#after-protocol-json', jsonviewOpts);
 
-    document.getElementById('before-protocol-log-text').value = data.before_protocol_log;
-    document.getElementById('after-protocol-log-text').value = data.after_protocol_log;
+    _initLogTab('before-log-tab', 'before-protocol-log-text', data.log_urls.before_log, data.search_url, 'before_log');
+    _initLogTab('after-log-tab', 'after-protocol-log-text', data.log_urls.after_log, data.search_url, 'after_log');
+
+    _initProtoEventMarkers();
 
     // Render chart with initial selection
     protoRenderChart();
+
+    // A zoom restored from the URL hash needs more detail than the overview
+    _protoViewChanged(protoChart);
+}
+
+function _protoConvertLegacyZoom() {
+    const params = _hashParams();
+    const legacyZoom = params.get('zx');
+    if (!legacyZoom) return;
+    _hashSet('zx', null);
+
+    const parts = legacyZoom.split(',').map(Number);
+    if (!protoData.x_range || protoData.row_count < 2 || params.get('zt')) return;
+    if (parts.length !== 2 || isNaN(parts[0]) || isNaN(parts[1])) return;
+
+    // Rows are logged at a fixed interval, so interpolate linearly
+    const [first, last] = protoData.x_range;
+    const toMillis = idx => Math.round(first + idx * (last - first) / (protoData.row_count - 1));
+    _hashSet('zt', toMillis(parts[0]) + ',' + toMillis(parts[1]));
+}
+
+function _protoDownsampleUrl(names, window) {
+    let url = `/api/${protoData.uuid}/downsample?names=${encodeURIComponent(names.join(','))}`;
+    if (window) url += `&start=${window[0]}&end=${window[1]}`;
+    return url + `&points=${protoData.downsample_points}`;
+}
+
+// Called after zooming or panning: load the visible window in more detail
+// (or the overview again after the zoom was reset).
+function _protoViewChanged(chart) {
+    if (!chart) return;
+    _protoLoadEvents(chart);
+    const xScale = chart.scales.x;
+    let window = [Math.floor(xScale.min), Math.ceil(xScale.max)];
+    const range = protoData.x_range;
+    if (!range || (window[0] <= range[0] && window[1] >= range[1])) {
+        window = null;
+    }
+
+    // Already fully detailed data for a window that contains the new one
+    if (window && protoWindow && !protoData.downsampled
+        && window[0] >= protoWindow[0] && window[1] <= protoWindow[1]) {
+        return;
+    }
+    if (window === null && protoWindow === null) return;
+
+    _protoLoadWindow(window);
+}
+
+function _protoLoadWindow(window) {
+    const selected = _protoSelectedColumns();
+    const request = ++protoWindowRequest;
+
+    _fetchColumns(_protoDownsampleUrl(selected, window))
+        .then(result => {
+            if (request !== protoWindowRequest) return;  // superseded by a newer zoom
+
+            protoWindow = window;
+            protoPendingColumns = new Set();
+            protoData.x = result.x;
+            protoData.labels = result.labels;
+            protoData.downsampled = result.downsampled;
+            protoData.all_column_data = result.columns;
+            protoRenderChart();
+        })
+        .catch(err => console.log('Failed to load chart data:', err));
+}
+
+// Load the events in the visible window of *chart* and draw them
+function _protoLoadEvents(chart) {
+    if (!protoData.events_url) return;
+    const xScale = chart.scales.x;
+    const window = [Math.floor(xScale.min), Math.ceil(xScale.max)];
+    const key = window.join(',');
+    if (key === protoEventsWindow) return;
+    protoEventsWindow = key;
+
+    fetch(`${protoData.events_url}?start=${window[0]}&end=${window[1]}&count=${PROTO_EVENTS_MAX}`)
+        .then(response => response.ok ? response.json() : Promise.reject(response.status))
+        .then(result => {
+            if (key !== protoEventsWindow) return;  // zoom changed in the meantime
+            protoEvents = result.events;
+            if (protoChart) protoChart.draw();
+        })
+        .catch(err => console.log('Failed to load events:', err));
+}
+
+// Dashed vertical line with a small triangle on top per event, and a
+// solid line at the state transition jumped to
+const _protoEventsPlugin = {
+    id: 'protoEvents',
+    afterDatasetsDraw(chart) {
+        const { ctx, chartArea, scales: { x } } = chart;
+        const inArea = px => px >= chartArea.left && px <= chartArea.right;
+        const positions = protoEvents.map(event => x.getPixelForValue(event.x)).filter(inArea);
+
+        ctx.save();
+        ctx.lineWidth = 1;
+        if (positions.length > 0) {
+            ctx.strokeStyle = 'rgba(220, 53, 69, 0.4)';
+            ctx.fillStyle = 'rgba(220, 53, 69, 0.8)';
+            ctx.setLineDash([3, 3]);
+            ctx.beginPath();
+            positions.forEach(px => {
+                ctx.moveTo(px, chartArea.top);
+                ctx.lineTo(px, chartArea.bottom);
+            });
+            ctx.stroke();
+            ctx.setLineDash([]);
+            ctx.beginPath();
+            positions.forEach(px => {
+                ctx.moveTo(px - 4, chartArea.top);
+                ctx.lineTo(px + 4, chartArea.top);
+                ctx.lineTo(px, chartArea.top + 6);
+                ctx.closePath();
+            });
+            ctx.fill();
+        }
+        if (protoTransition) {
+            const px = x.getPixelForValue(protoTransition.x);
+            if (inArea(px)) {
+                ctx.strokeStyle = 'rgba(13, 110, 253, 0.7)';
+                ctx.beginPath();
+                ctx.moveTo(px, chartArea.top);
+                ctx.lineTo(px, chartArea.bottom);
+                ctx.stroke();
+            }
+        }
+        ctx.restore();
+    },
+};
+
+// Return the event whose marker is closest to the mouse event *e*, if it
+// is within a few pixels
+function _protoEventAt(e) {
+    if (!protoChart) return null;
+    const { chartArea, scales: { x } } = protoChart;
+    if (e.offsetY < chartArea.top || e.offsetY > chartArea.bottom) return null;
+    let closest = null;
+    let closestDist = 4;
+    protoEvents.forEach(event => {
+        const dist = Math.abs(x.getPixelForValue(event.x) - e.offsetX);
+        if (dist <= closestDist) {
+            closest = event;
+            closestDist = dist;
+        }
+    });
+    return closest;
+}
+
+// Hovering a marker shows its log line, clicking it opens the log there
+function _initProtoEventMarkers() {
+    const canvas = document.getElementById('proto-chart');
+    if (!canvas) return;
+    canvas.addEventListener('mousemove', e => {
+        const event = _protoEventAt(e);
+        canvas.title = event ? event.text : '';
+        canvas.style.cursor = event ? 'pointer' : '';
+    });
+    canvas.addEventListener('click', e => {
+        const event = _protoEventAt(e);
+        if (event) showLogLine(event.section, event.line);
+    });
+}
+
+// Load the transitions of the column selected in the navigation ('' = all)
+function _protoLoadTransitions(column) {
+    if (!protoTransitions.has(column)) {
+        const url = column ? `${protoData.transitions_url}?names=${encodeURIComponent(column)}`
+                           : protoData.transitions_url;
+        protoTransitions.set(column, fetch(url)
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(result => ({ list: result.transitions, x: result.transitions.map(t => t.x) }))
+            .catch(err => {
+                protoTransitions.delete(column);
+                throw err;
+            }));
+    }
+    return protoTransitions.get(column);
+}
+
+// Zoom the chart to the next (*direction* 1) or previous (-1) state
+// transition. Continues from the last transition jumped to while the chart
+// still shows it, otherwise starts at the first (last) transition in view.
+function protoJumpTransition(direction) {
+    const select = document.getElementById('proto-transition-column');
+    if (!protoChart || !select) return;
+    const column = select.value;
+
+    _protoLoadTransitions(column).then(transitions => {
+        const xScale = protoChart.scales.x;
+        const shown = protoTransition && protoTransition.column === column
+            && xScale.min === protoTransition.window[0] && xScale.max === protoTransition.window[1];
+        let idx;
+        if (shown) {
+            idx = protoTransition.idx + direction;
+        } else if (direction > 0) {
+            idx = _lowerBound(transitions.x, xScale.min);
+        } else {
+            idx = _lowerBound(transitions.x, xScale.max);
+            while (idx < transitions.x.length && transitions.x[idx] === xScale.max) idx++;
+            idx--;
+        }
+
+        const info = document.getElementById('proto-transition-info');
+        if (idx < 0 || idx >= transitions.list.length) {
+            info.textContent = T.transition_none || 'No further state changes';
+            return;
+        }
+
+        const transition = transitions.list[idx];
+        const col = protoData.column_metadata.find(c => c.name === transition.column);
+        info.textContent = `${idx + 1} / ${transitions.list.length}: ${col ? col.label : transition.column} `
+            + `${transition.from} \u2192 ${transition.to} (${transition.label})`;
+
+        // Reset a y zoom that could hide the values around the transition
+        protoChart.resetZoom('none');
+        const [start, end] = transition.window;
+        protoChart.zoomScale('x', {min: start, max: Math.max(end, start + 1)}, 'none');
+        protoTransition = {
+            column: column,
+            idx: idx,
+            x: transition.x,
+            window: [protoChart.scales.x.min, protoChart.scales.x.max],
+        };
+        _hashSet('zt', protoTransition.window.join(','));
+        _hashSet('zy', null);
+        _protoViewChanged(protoChart);
+    }).catch(err => console.log('Failed to load state transitions:', err));
+}
+
+function _protoSelectedColumns() {
+    const selected = [];
+    document.querySelectorAll('#proto-column-checkboxes input[type="checkbox"]:checked').forEach(cb => {
+        selected.push(cb.dataset.column);
+    });
+    return selected;
 }
 
 function _protoParseHash() {
@@ -845,14 +1506,34 @@ function _protoUpdateHash() {
     _updateChartHash('#proto-column-checkboxes input[type="checkbox"]', 'proto-log-axis', 'cols', 'log');
 }
 
+// Only columns visible by default are embedded in the page. Fetch the data
+// of other selected columns for the current window from the server and
+// re-render once it arrived.
+function _protoFetchMissingColumns(selected) {
+    const missing = selected.filter(name =>
+        !(name in protoData.all_column_data) && !protoPendingColumns.has(name));
+    if (missing.length === 0) return;
+
+    const window = protoWindow;
+    const pending = protoPendingColumns;
+    missing.forEach(name => pending.add(name));
+    _fetchColumns(_protoDownsampleUrl(missing, window))
+        .then(result => {
+            if (window !== protoWindow) return;  // zoom changed in the meantime
+
+            Object.assign(protoData.all_column_data, result.columns);
+            // Columns the server does not know stay pending, so they are not requested again
+            Object.keys(result.columns).forEach(name => pending.delete(name));
+            protoRenderChart();
+        })
+        .catch(err => console.log('Failed to load columns:', err));
+}
+
 function protoRenderChart() {
     if (!protoData) return;
 
-    // Gather selected columns
-    const selected = [];
-    document.querySelectorAll('#proto-column-checkboxes input[type="checkbox"]:checked').forEach(cb => {
-        selected.push(cb.dataset.column);
-    });
+    const selected = _protoSelectedColumns();
+    _protoFetchMissingColumns(selected);
 
     // Build column label lookup from metadata
     const labelLookup = {};
@@ -874,22 +1555,40 @@ function protoRenderChart() {
 
         // For log view: replace 0 with 0.01 (Chart.js can't show 0 on log scale)
         // See https://github.com/chartjs/Chart.js/issues/9629
-        const chartData = useLog ? rawData.map(v => (v === 0 ? 0.01 : v)) : rawData;
+        // (Array.from, as mapping an integer typed array would truncate 0.01 to 0 again)
+        const chartData = useLog ? Array.from(rawData, v => (v === 0 ? 0.01 : v)) : rawData;
 
         datasets.push(_chartDataset(labelLookup[colName] || colName, chartData, colorIdx++));
     });
 
+    // The x-axis is numeric (millis), show the label of the nearest point
+    const xValues = protoData.x;
+    const labels = protoData.labels;
+
     protoChart = _createTimeSeriesChart({
         canvasId: 'proto-chart',
         prevChart: protoChart,
-        labels: protoData.labels,
+        labels: xValues,
         datasets: datasets,
         titleText: T.chart_title || 'Charge Log',
         useLog: useLog,
-        zoomXKey: 'zx',
+        xLinear: true,
+        zoomXKey: 'zt',
         zoomYKey: 'zy',
+        onViewChanged: _protoViewChanged,
+        plugins: [_protoEventsPlugin],
+        xTickCallback: function(value) {
+            const idx = _nearestIndex(xValues, value);
+            return idx >= 0 ? labels[idx] : '';
+        },
+        tooltipTitleCallback: function(items) {
+            if (!items.length) return '';
+            return labels[items[0].dataIndex];
+        },
     });
 
+    if (protoChart) _protoLoadEvents(protoChart);
+
     // Persist selection in URL hash for sharing
     _protoUpdateHash();
 }
@@ -899,7 +1598,10 @@ function protoSelectAll(checked) {
 }
 
 function protoResetZoom() {
-    chartResetZoom(protoChart, 'zx', 'zy');
+    chartResetZoom(protoChart, 'zt', 'zy');
+    // The reset chart only spans the loaded window, go back to the overview
+    if (protoWindow !== null) _protoLoadWindow(null);
+    else if (protoChart) _protoLoadEvents(protoChart);
 }
 
 function vislog_report(data) {
@@ -909,30 +1611,32 @@ function vislog_report(data) {
         : {};
     make_jsonview(data.report_json, '#report-json', jsonviewOpts);
 
-    document.getElementById('report-log-text').value = data.report_log;
-
-    // Only set trace text if the element exists (might not if no remaining trace content)
-    const traceText = document.getElementById('report-trace-text');
-    if (traceText) {
-        traceText.value = data.report_trace;
-    }
-
-    // Populate module trace textareas (filled via JS to avoid HTML injection in <textarea>)
-    if (data.trace_modules) {
-        for (const [moduleName, moduleContent] of Object.entries(data.trace_modules)) {
-            const el = document.getElementById('trace-' + moduleName + '-text');
-            if (el) {
-                el.value = moduleContent;
-            }
+    // All other sections are fetched when their tab is opened
+    const urls = data.section_urls;
+    _initLogTab('log-tab', 'report-log-text', urls.log, urls.search, 'log');
+    _initLogTab('trace-tab', 'report-trace-text', urls.trace, urls.search, 'trace');
+
+    for (const [moduleName, url] of Object.entries(urls.modules)) {
+        const tabId = 'trace-' + moduleName + '-tab';
+        _initLogTab(tabId, 'trace-' + moduleName + '-text', url, urls.search, 'module:' + moduleName);
+        if (moduleName === 'charge_manager' && data.has_cm) {
+            _onFirstTabShown(tabId, () => {
+                _loadJsonOnce(urls.cm)
+                    .then(cm => initCmChart(cm, data.uuid))
+                    .catch(err => {
+                        document.querySelectorAll('.cm-chart-container').forEach(el => el.remove());
+                        console.log('Failed to load charge manager chart data:', err);
+                    });
+            });
         }
     }
 
-    // Initialize charge manager chart if parsed data is available
-    if (data.cm_parsed) {
-        initCmChart(data.cm_parsed);
-    }
-
-    // Coredump is now rendered server-side, no JS needed
+    // The coredump is rendered server-side
+    _onFirstTabShown('dump-tab', () => {
+        _fetchText(urls.coredump)
+            .then(html => { document.getElementById('report-dump').innerHTML = html; })
+            .catch(err => console.log('Failed to load coredump:', err));
+    });
 }
 
 // ---------------------------------------------------------------------------
@@ -941,10 +1645,21 @@ function vislog_report(data) {
 let cmChart = null;
 let cmData = null;
 
-function initCmChart(data) {
+function initCmChart(data, uuid) {
     cmData = data;
     if (!cmData || !cmData.columns) return;
 
+    // The dense table columns are not embedded in the page, fetch them in
+    // binary form and render again once they arrived
+    if (uuid && cmData.table_columns && cmData.table_columns.length > 0) {
+        _fetchColumns(`/api/${uuid}/cm_table`)
+            .then(result => {
+                cmData.table_data = result.columns;
+                renderCmChart();
+            })
+            .catch(err => console.log('Failed to load charge manager table:', err));
+    }
+
     const container = document.getElementById('cm-column-groups');
     if (!container) return;
 
@@ -1069,28 +1784,29 @@ function renderCmChart() {
         selected.push(cb.dataset.column);
     });
 
-    // Build timestamp lookup: sorted array of [row_idx, timestamp_string]
+    // Build timestamp lookup: sorted row indices and their timestamp strings
     // for nearest-match lookups on the x-axis
-    const tsEntries = cmData.timestamps || [];
+    const tsIndex = (cmData.timestamps && cmData.timestamps.index) || [];
+    const tsValues = (cmData.timestamps && cmData.timestamps.values) || [];
     const tsMap = {};
-    tsEntries.forEach(([idx, ts]) => { tsMap[idx] = ts; });
+    tsIndex.forEach((idx, i) => { tsMap[idx] = tsValues[i]; });
 
     // Find the nearest timestamp for a given row index
     function nearestTimestamp(rowIdx) {
-        if (tsEntries.length === 0) return null;
+        if (tsIndex.length === 0) return null;
         // Binary search for closest entry
-        let lo = 0, hi = tsEntries.length - 1;
+        let lo = 0, hi = tsIndex.length - 1;
         while (lo < hi) {
             const mid = (lo + hi) >> 1;
-            if (tsEntries[mid][0] < rowIdx) lo = mid + 1;
+            if (tsIndex[mid] < rowIdx) lo = mid + 1;
             else hi = mid;
         }
         // lo is the first entry >= rowIdx; compare with lo-1
-        if (lo > 0 && (lo >= tsEntries.length ||
-            Math.abs(tsEntries[lo - 1][0] - rowIdx) <= Math.abs(tsEntries[lo][0] - rowIdx))) {
+        if (lo > 0 && (lo >= tsIndex.length ||
+            Math.abs(tsIndex[lo - 1] - rowIdx) <= Math.abs(tsIndex[lo] - rowIdx))) {
             lo = lo - 1;
         }
-        return tsEntries[lo][1];
+        return tsValues[lo];
     }
 
     // Build x-axis labels (row indices)
@@ -1116,7 +1832,8 @@ function renderCmChart() {
             data = cmData.table_data[key];
         } else if (cmData.summary_data && cmData.summary_data[key]) {
             // Sparse summary data, convert to {x, y} points
-            data = cmData.summary_data[key].map(([idx, val]) => ({ x: idx, y: val }));
+            const sparse = cmData.summary_data[key];
+            data = sparse.index.map((idx, i) => ({ x: idx, y: sparse.values[i] }));
         } else {
             return;
         }
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Importing main.py creates protocols/ and debug.log in the working
+directory, so the tests run in scratch directories."""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_START_DIR = os.getcwd()
+_WORK_DIR = tempfile.mkdtemp(prefix='vislog-tests-')
+os.chdir(_WORK_DIR)
+
+
+def pytest_unconfigure(config):
+    os.chdir(_START_DIR)
+    shutil.rmtree(_WORK_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    """Give every test an empty protocols/ directory of its own."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('protocols')
+    return tmp_path
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""Straightforward implementations of what the parsers in main.py compute.
+
+Most of them are the previous, slower versions of the optimized code. The
+tests check main.py against them, benchmark.py measures the speedup.
+"""
+
+import re
+import datetime
+
+import main
+
+
+def read_protocol_whole(file_path):
+    """Previous reader: read everything, re.sub() the message, split the blocks."""
+    with open(file_path, 'r') as fh:
+        content = fh.read()
+    match = re.search(r'\n\n(\d+) lines have been dropped from the following table\.', content)
+    if match:
+        content = re.sub(r'\n\n\d+ lines have been dropped from the following table\.', '', content)
+    return content.split('\n\n'), int(match.group(1)) if match else None
+
+
+def parse_csv_pandas(buf):
+    """Previous CSV parsing: pd.read_csv() with inferred int64/float64 columns."""
+    df = main._read_protocol_csv(buf)
+    return {name: df[name].to_numpy() for name in df.columns if name not in main._CSV_SECTION_HEADINGS}
+
+
+def parse_charge_manager_trace_regex(content):
+    """Previous charge_manager parser: up to five regexes per line, [row_idx, value] pairs."""
+    lines = content.split('\n')
+
+    has_pv, has_phases, has_bat = main._detect_cm_header(lines)
+    columns, col_keys, summary_cols, alloc_cols = main._build_cm_columns(has_pv, has_phases, has_bat)
+    expected_cols = len(col_keys)
+
+    # --- Parse data ---
+    table_data = {k: [] for k in col_keys}
+    summary_data = {k: [] for k in summary_cols + alloc_cols + ['hysteresis']}
+    timestamps = []
+    events = []
+
+    # Iteration-level tracking for table-less traces (no PM/PV table data).
+    # Each timestamp starts a new iteration.
+    iter_count = 0
+    iter_timestamps_list = []
+    iter_summary = {k: [] for k in summary_cols + alloc_cols + ['hysteresis']}
+
+    row_idx = 0
+    in_table = False
+    step_line_re = re.compile(r'^-?\d+:')
+    timestamp_re = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})')
+    summary_re = re.compile(r'^([09]): raw\((-?\d+) (-?\d+) (-?\d+) (-?\d+)\) min\((-?\d+) (-?\d+) (-?\d+) (-?\d+)\) spread\((-?\d+) (-?\d+) (-?\d+) (-?\d+)\) max_pv (-?\d+)')
+    alloc_re = re.compile(r'^9: \[(.+)\]')
+    hysteresis_re = re.compile(r'^Hysteresis (-?\d+)')
+
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        # Skip header lines
+        if stripped.startswith('PM') or (stripped.startswith('mtr') and 'avl' in stripped):
+            in_table = True
+            continue
+
+        # Timestamp
+        ts_m = timestamp_re.match(stripped)
+        if ts_m:
+            in_table = False
+            if row_idx > 0:
+                timestamps.append([row_idx - 1, ts_m.group(1)])
+            # Track iteration-level timestamps for table-less fallback
+            iter_timestamps_list.append(ts_m.group(1))
+            iter_count += 1
+            continue
+
+        # Hysteresis
+        hyst_m = hysteresis_re.match(stripped)
+        if hyst_m:
+            hyst_val = int(hyst_m.group(1))
+            if row_idx > 0:
+                summary_data['hysteresis'].append([row_idx - 1, hyst_val])
+            if iter_count > 0:
+                iter_summary['hysteresis'].append([iter_count - 1, hyst_val])
+            continue
+
+        # Summary lines (0: raw(...) or 9: raw(...))
+        sum_m = summary_re.match(stripped)
+        if sum_m:
+            step = sum_m.group(1)
+            vals = [int(sum_m.group(i)) for i in range(2, 15)]
+            prefix = f's{step}_'
+            if row_idx > 0:
+                for name, val in zip(main._CM_SUMMARY_NAMES, vals):
+                    summary_data[prefix + name].append([row_idx - 1, val])
+            if iter_count > 0:
+                for name, val in zip(main._CM_SUMMARY_NAMES, vals):
+                    iter_summary[prefix + name].append([iter_count - 1, val])
+            continue
+
+        # Allocation result: 9: [ ... ]
+        alloc_m = alloc_re.match(stripped)
+        if alloc_m:
+            inner = alloc_m.group(1).strip()
+            # Parse "0 32000@3p" or just "0" (no allocation)
+            at_m = re.search(r'(\d+)@(\d+)p', inner)
+            if at_m:
+                alloc_current = int(at_m.group(1))
+                alloc_phases = int(at_m.group(2))
+            else:
+                alloc_current = 0
+                alloc_phases = 0
+            if row_idx > 0:
+                summary_data['alloc_current'].append([row_idx - 1, alloc_current])
+                summary_data['alloc_phases'].append([row_idx - 1, alloc_phases])
+            if iter_count > 0:
+                iter_summary['alloc_current'].append([iter_count - 1, alloc_current])
+                iter_summary['alloc_phases'].append([iter_count - 1, alloc_phases])
+            continue
+
+        # RECV event lines
+        if stripped.startswith('RECV'):
+            events.append([row_idx, stripped])
+            continue
+
+        # Skip section markers and algorithm step lines
+        if stripped.startswith('__') and stripped.endswith('__'):
+            continue
+        if step_line_re.match(stripped) and '|' not in stripped:
+            continue
+        if stripped.startswith('Wnd') or stripped.startswith('Calc Wnd'):
+            continue
+        # Skip deeply indented algorithm text (5+ leading spaces with non-table content)
+        if len(line) > 0 and len(line) - len(line.lstrip()) >= 5 and '(' in stripped:
+            continue
+
+        # Table data rows, try to parse as numbers separated by | groups
+        if in_table:
+            # Remove | separators and split into numbers
+            parts = stripped.replace('|', ' ').split()
+            try:
+                values = [int(p) for p in parts]
+            except ValueError:
+                continue
+
+            if len(values) == expected_cols:
+                for key, val in zip(col_keys, values):
+                    table_data[key].append(val)
+                row_idx += 1
+
+    # If we have table data, return the table-based result (existing behavior).
+    if row_idx > 0:
+        return {
+            'columns': columns,
+            'table_data': table_data,
+            'summary_data': {k: v for k, v in summary_data.items() if v},
+            'timestamps': timestamps,
+            'events': events,
+            'row_count': row_idx,
+        }
+
+    # Fallback: no table data (e.g. PV excess mode not enabled).
+    # Use iteration-based indexing where each timestamp is one data point.
+    if iter_count > 0:
+        # Exclude PM/PV/phase table columns since they have no data
+        table_col_keys = set(col_keys)
+        iter_columns = [c for c in columns if c['key'] not in table_col_keys]
+
+        return {
+            'columns': iter_columns,
+            'table_data': {},
+            'summary_data': {k: v for k, v in iter_summary.items() if v},
+            'timestamps': [[i, ts] for i, ts in enumerate(iter_timestamps_list)],
+            'events': events,
+            'row_count': iter_count,
+        }
+
+    # No data at all
+    return {
+        'columns': columns,
+        'table_data': table_data,
+        'summary_data': {},
+        'timestamps': timestamps,
+        'events': events,
+        'row_count': 0,
+    }
+
+
+def cm_trace_pairs(cm_parsed):
+    """Convert the columnar result of parse_charge_manager_trace() to the previous [idx, value] pairs."""
+    def pairs(series):
+        return [[idx, value] for idx, value in zip(series['index'], series['values'])]
+    return dict(cm_parsed,
+                table_data={key: values.tolist() for key, values in cm_parsed['table_data'].items()},
+                summary_data={key: pairs(series) for key, series in cm_parsed['summary_data'].items()},
+                timestamps=pairs(cm_parsed['timestamps']), events=pairs(cm_parsed['events']))
+
+
+def split_trace_modules_regex(full_trace):
+    """Previous splitter: DOTALL regex with a backreference, returns copied substrings."""
+    trace_modules = {}
+    trace_remaining = []
+    last_end = 0
+    for match in re.finditer(r'__begin_(\w+)__(.*?)__end_\1__', full_trace, re.DOTALL):
+        before_text = full_trace[last_end:match.start()].strip()
+        if before_text:
+            trace_remaining.append(before_text)
+        if match.group(2).strip():
+            trace_modules[match.group(1)] = match.group(2).strip()
+        last_end = match.end()
+    after_text = full_trace[last_end:].strip()
+    if after_text:
+        trace_remaining.append(after_text)
+    return trace_modules, trace_remaining
+
+
+def split_trace_modules_text(full_trace):
+    """Copy the texts out of the offsets of split_trace_modules()."""
+    modules, remaining = main.split_trace_modules(full_trace)
+    trace_modules = {name: full_trace[start:end].strip() for name, start, end in modules
+                     if full_trace[start:end].strip()}
+    return trace_modules, [text for text in (full_trace[start:end].strip() for start, end in remaining) if text]
+
+
+def search_log_whole(blocks, pattern):
+    """Search without an index: match every line of the decoded event log."""
+    return [line for line, text in enumerate(blocks[2].split('\n')) if pattern.search(text)]
+
+
+_EVENT_LINE_RE = re.compile(r'^(?:(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) +| *(\d{1,10}),(\d{3})  +)'
+                            r'(?:([\w.-]+) *\| )?')
+
+
+def log_events(texts, real_time_anchor, is_protocol):
+    """Parse the events of the logs {section: text} line by line.
+
+    Returns (x, section, line, module, message, text) tuples ordered by x,
+    like api_events() returns them.
+    """
+    events = []
+    for section in main.EVENT_SECTIONS:
+        if section not in texts:
+            continue
+        for line, text in enumerate(texts[section].split('\n')):
+            match = _EVENT_LINE_RE.match(text)
+            if not match or not match.group(0).isascii():
+                continue
+            if match.group(1):
+                try:
+                    local = datetime.datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S')
+                except ValueError:
+                    continue
+                x = int((local - datetime.datetime(1970, 1, 1)).total_seconds()) * 1000 + int(match.group(2))
+                if is_protocol:
+                    if real_time_anchor is None:
+                        continue
+                    x += real_time_anchor[0] - real_time_anchor[1]
+            elif is_protocol:
+                x = int(match.group(3)) * 1000 + int(match.group(4))
+            else:
+                continue
+            events.append((x, section, line, match.group(5), text[match.end():], text))
+    events.sort(key=lambda event: event[0])
+    return events
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""Check the parsers and indices of main.py against the implementations in reference.py."""
+
+import io
+import os
+import re
+import json
+
+import numpy as np
+import pytest
+
+import main
+from tests import reference
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as fh:
+        return fh.read()
+
+
+def _upload(name):
+    """Upload a fixture like a browser does, return (uuid, path of the stored file)."""
+    client = main.app.test_client()
+    response = client.post('/en/', data={'file': (io.BytesIO(_fixture(name)), name)},
+                           content_type='multipart/form-data')
+    assert response.status_code == 302
+    uuid = response.headers['Location'].rstrip('/').split('/')[-1]
+    return uuid, main._protocol_file_path(uuid)
+
+
+def _assert_columns_equal(expected, columns):
+    assert list(columns) == list(expected)
+    for name, values in expected.items():
+        if values.dtype.kind == 'O':
+            assert columns[name].tolist() == values.tolist(), name
+        else:
+            assert np.array_equal(columns[name], values, equal_nan=values.dtype.kind == 'f'), name
+
+
+def _report_trace():
+    content = _fixture('report.txt').decode('utf-8')
+    return content.split('___TRACE_LOG_START___\n\n')[1].split('\n\n___CORE_DUMP_START___')[0]
+
+
+# ---------------------------------------------------------------------------
+# Protocol blocks
+# ---------------------------------------------------------------------------
+
+def test_read_protocol(work_dir):
+    path = os.path.join(FIXTURES, 'protocol.txt')
+    expected = reference.read_protocol_whole(path)
+    assert expected[1] == 4711
+    assert main.read_and_preprocess_protocol(path) == expected
+
+
+def test_block_index(monkeypatch):
+    # Several gzip members, so that blocks are read from the middle of the file
+    monkeypatch.setattr(main, 'STORAGE_MEMBER_SIZE', 4096)
+    expected_blocks, expected_dropped = reference.read_protocol_whole(os.path.join(FIXTURES, 'protocol.txt'))
+
+    uuid, file_path = _upload('protocol.txt')
+    blocks, dropped, is_report = main.open_protocol_blocks(uuid, file_path)
+    assert not is_report
+    assert dropped == expected_dropped
+    assert list(blocks) == expected_blocks
+    assert [blocks[i] for i in (4, 1, 3)] == [expected_blocks[i] for i in (4, 1, 3)]
+
+
+def test_migrate_storage():
+    # An upload from before the content store, viewed once so that it has artifacts
+    uuid = 'cSlegacyUpload0000000000'
+    with open(os.path.join(main.PROTOCOL_DIR, uuid), 'wb') as fh:
+        fh.write(_fixture('protocol.txt'))
+    client = main.app.test_client()
+    assert client.get(f'/en/{uuid}').status_code == 200
+    shard_dir = main._shard_dir(uuid)
+    artifacts = sorted(name for name in os.listdir(shard_dir) if name.endswith('.npz'))
+    assert f'{uuid}.parsed.npz' in artifacts and f'{uuid}.blocks.npz' in artifacts
+
+    result = main.app.test_cli_runner().invoke(args=['migrate-storage'])
+    assert result.exit_code == 0, result.output
+    assert not os.path.exists(os.path.join(main.PROTOCOL_DIR, uuid))
+    assert not [name for name in os.listdir(shard_dir) if name.startswith(f'{uuid}.') and name.endswith('.npz')]
+    # The parse cache was carried over, the block index was built for the new file
+    assert main.load_protocol_cache(uuid) is not None
+    blocks, _, _ = main.open_protocol_blocks(uuid, main._protocol_file_path(uuid))
+    assert list(blocks) == reference.read_protocol_whole(os.path.join(FIXTURES, 'protocol.txt'))[0]
+
+
+# ---------------------------------------------------------------------------
+# Protocol CSV
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize('chunk_size', [256 * 1024, 1000])
+def test_protocol_csv(monkeypatch, chunk_size):
+    monkeypatch.setattr(main, 'PROTOCOL_CSV_CHUNK_SIZE', chunk_size)
+    blocks, _ = reference.read_protocol_whole(os.path.join(FIXTURES, 'protocol.txt'))
+    buf = blocks[2].encode('utf-8')
+    columns = main.parse_protocol_csv(buf)
+    _assert_columns_equal(reference.parse_csv_pandas(buf), columns)
+    assert all(values.dtype.itemsize <= 4 for values in columns.values())
+
+
+@pytest.mark.parametrize('buf', [
+    b'a,b,c\n1,-2,3\n-40,5,\n7,,9\n',                          # signs and empty fields
+    b'a,STATE,b\n1,,2\n3,,4\n',                                # section heading
+    b'a,b\n1,2.5\n3,4\n',                                      # floats, parsed by pandas
+    b'a\n1\n\n2\n',                                            # blank lines
+    b'a,b\n1,18446744073709551615\n2,9223372036854775808\n',   # beyond int64
+    b'a,b\n1,x\n2,y\n',                                        # text
+])
+def test_protocol_csv_edge_cases(buf):
+    _assert_columns_equal(reference.parse_csv_pandas(buf), main.parse_protocol_csv(buf))
+
+
+def test_cold_parse_cache_selection():
+    uuid, _ = _upload('protocol.txt')
+    assert main.load_protocol_cache(uuid) is None
+    client = main.app.test_client()
+    # The first request parses the protocol and has to leave out the other columns just the same
+    cold = client.get(f'/api/{uuid}/transitions', query_string={'names': 'iec61851_state'}).get_json()
+    everything = client.get(f'/api/{uuid}/transitions').get_json()
+    assert {transition['column'] for transition in everything['transitions']} > {'iec61851_state'}
+    assert cold['transitions'] == [transition for transition in everything['transitions']
+                                   if transition['column'] == 'iec61851_state']
+
+    uuid, _ = _upload('protocol.txt')
+    columns = client.get(f'/api/{uuid}/columns', query_string={'names': 'power,iec61851_state'}).get_json()
+    assert sorted(columns['columns']) == ['iec61851_state', 'power']
+
+
+# ---------------------------------------------------------------------------
+# Debug report traces
+# ---------------------------------------------------------------------------
+
+def test_split_trace_modules():
+    trace = _report_trace()
+    modules, remaining = reference.split_trace_modules_regex(trace)
+    assert sorted(modules) == ['charge_manager', 'evse']
+    assert reference.split_trace_modules_text(trace) == (modules, remaining)
+
+
+@pytest.mark.parametrize('table', [True, False])
+def test_charge_manager_trace(table):
+    trace = reference.split_trace_modules_regex(_report_trace())[0]['charge_manager']
+    if not table:
+        # Table-less traces (PV excess charging disabled) are indexed by iteration
+        trace = '\n'.join(line for line in trace.split('\n') if '|' not in line)
+    expected = reference.parse_charge_manager_trace_regex(trace)
+    assert expected['row_count'] > 0
+    assert reference.cm_trace_pairs(main.parse_charge_manager_trace(trace)) == expected
+
+
+@pytest.mark.parametrize('has_cm', [True, False])
+def test_report_cm_chart(has_cm):
+    content = _fixture('report.txt')
+    if not has_cm:
+        begin, end = content.index(b'__begin_charge_manager__\n'), content.index(b'__end_charge_manager__')
+        content = content[:begin] + b'__begin_charge_manager__\nno data\n' + content[end:]
+    client = main.app.test_client()
+    response = client.post('/en/', data={'file': (io.BytesIO(content), 'report.txt')},
+                           content_type='multipart/form-data')
+    page = client.get(response.headers['Location']).get_data(as_text=True)
+    assert 'id="trace-charge_manager"' in page
+    assert ('chart.js' in page) == has_cm
+    assert ('cm-chart-container' in page) == has_cm
+
+    uuid = response.headers['Location'].rstrip('/').split('/')[-1]
+    assert client.get(f'/api/{uuid}/report/cm').status_code == (200 if has_cm else 404)
+
+
+# ---------------------------------------------------------------------------
+# Log search
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize('name, section, block', [
+    ('report.txt', 'log', 2),
+    ('protocol.txt', 'before_log', 1),
+    ('protocol.txt', 'after_log', 4),
+])
+@pytest.mark.parametrize('query, regex, case', [
+    ('watchdog timeout', False, False),
+    ('WATCHDOG', False, True),
+    ('äöü message', False, False),
+    (r'uptime \d+ brownout', True, False),
+    ('timeout|brownout', True, False),
+    (r'(meters|evse_v2) +\| (state change|uptime) 1\d\b', True, False),
+    ('x{300} long', True, False),
+])
+def test_log_search(monkeypatch, name, section, block, query, regex, case):
+    # Many small chunks, so that the trigram filter has something to skip
+    monkeypatch.setattr(main, 'LOG_CHUNK_SIZE', 1024)
+    uuid, file_path = _upload(name)
+    blocks, _, _ = main.open_protocol_blocks(uuid, file_path)
+    flags = 0 if case else re.IGNORECASE
+    expected = reference.search_log_whole({2: blocks[block]}, re.compile(query if regex else re.escape(query), flags))
+
+    params = {'q': query, 'section': section, 'count': main.SEARCH_RESULTS_MAX, 'context': 0}
+    if regex:
+        params['regex'] = '1'
+    if case:
+        params['case'] = '1'
+    result = main.app.test_client().get(f'/api/{uuid}/search', query_string=params).get_json()
+    assert result['total'] == len(expected)
+    assert [match['line'] for match in result['matches']] == expected
+
+
+def test_log_search_errors():
+    uuid, _ = _upload('report.txt')
+    client = main.app.test_client()
+    assert client.get(f'/api/{uuid}/search', query_string={'q': '('}).status_code == 200
+    assert client.get(f'/api/{uuid}/search', query_string={'q': '(', 'regex': '1'}).status_code == 400
+    assert client.get(f'/api/{uuid}/search', query_string={'q': ''}).status_code == 400
+    assert client.get(f'/api/{uuid}/search', query_string={'q': 'x', 'section': 'nope'}).status_code == 404
+    assert client.get(f'/api/{uuid}/search', query_string={'q': 'x' * (main.SEARCH_QUERY_MAX + 1)}).status_code == 400
+
+
+def test_log_search_timeout(monkeypatch):
+    monkeypatch.setattr(main, 'SEARCH_REGEX_TIMEOUT', 1)
+    uuid, _ = _upload('report.txt')
+    client = main.app.test_client()
+    # Backtracks exponentially on the lines of 300 x
+    response = client.get(f'/api/{uuid}/search', query_string={'q': '(x+x+)+y', 'regex': '1'})
+    assert response.status_code == 408
+    response = client.get(f'/api/{uuid}/search', query_string={'q': 'x+ long', 'regex': '1'})
+    assert response.status_code == 200 and response.get_json()['total'] > 0
+
+
+def test_log_search_without_pruning(monkeypatch):
+    # Regex searches read all chunks if the parse tree of re is not understood
+    monkeypatch.setattr(main, 'LOG_CHUNK_SIZE', 1024)
+    monkeypatch.setattr(main, '_regex_parser', None)
+    uuid, file_path = _upload('report.txt')
+    blocks, _, _ = main.open_protocol_blocks(uuid, file_path)
+    query = r'uptime \d+ brownout'
+    expected = reference.search_log_whole({2: blocks[2]}, re.compile(query, re.IGNORECASE))
+    params = {'q': query, 'regex': '1', 'section': 'log', 'count': main.SEARCH_RESULTS_MAX}
+    result = main.app.test_client().get(f'/api/{uuid}/search', query_string=params).get_json()
+    assert len(expected) > 0
+    assert [match['line'] for match in result['matches']] == expected
+
+
+# ---------------------------------------------------------------------------
+# Event index
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize('name', ['report.txt', 'protocol.txt'])
+def test_log_events(monkeypatch, name):
+    monkeypatch.setattr(main, 'LOG_CHUNK_SIZE', 1024)
+    uuid, file_path = _upload(name)
+    log = main.LogIndex(uuid, file_path)
+    texts = {section: '\n'.join(log.lines(section, 0, 1 << 30)[1]) for section in log.sections}
+    is_protocol = 'before_log' in texts
+    anchor = main._load_protocol_or_404(uuid, file_path)['real_time_anchor'] if is_protocol else None
+    if is_protocol:
+        assert anchor is not None
+    expected = reference.log_events(texts, anchor, is_protocol)
+    assert len(expected) > 100
+
+    client = main.app.test_client()
+    result = client.get(f'/api/{uuid}/events', query_string={'count': main.EVENTS_MAX}).get_json()
+    assert result['total'] == len(expected)
+    assert [(event['x'], event['section'], event['line'], event['module'], event['message'], event['text'])
+            for event in result['events']] == expected
+
+    # Windows, with and without sampling
+    start, end = expected[len(expected) // 4][0], expected[len(expected) // 2][0]
+    in_window = [event[:3] for event in expected if start <= event[0] <= end]
+    for count in (len(in_window), 10):
+        result = client.get(f'/api/{uuid}/events', query_string={'start': start, 'end': end, 'count': count})
+        result = json.loads(result.data)
+        events = [(event['x'], event['section'], event['line']) for event in result['events']]
+        assert result['total'] == len(in_window)
+        assert len(events) == count
+        assert set(events) <= set(in_window)
+        assert events == sorted(events, key=lambda event: event[0])